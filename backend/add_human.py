@@ -1,14 +1,25 @@
 import pandas as pd
 import sqlite3
 import csv  
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from entities.Human import Human
+from utils.ingest_session import IngestSession
 from dataparsers.HumanFromWikidata import HumanFromWikidata
+from dataparsers.wikidata_sparql import resolve_human_qids
 import numpy
 
 
 OUTPUT_CSV = "StoryofArt_report_02.csv"
 DB_PATH = "birdview.db"
 
+# pipeline defaults for add_humans_concurrently
+CONCURRENCY = 8          # Wikidata requests in flight
+QUEUE_SIZE = 200         # rows buffered between two stages
+COMMIT_EVERY = 50        # rows per transaction in the writer
+CSV_CHUNK_SIZE = 5000    # rows read from the CSV at a time
+
 
 def log_results(w, constituent_id, name, qid, is_human):
     w.writerow([constituent_id, name, qid,is_human])
@@ -16,12 +27,8 @@ def log_results(w, constituent_id, name, qid, is_human):
 
 def add_humans(file_path):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    cursor = conn.cursor()
-
-    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+    with IngestSession(DB_PATH) as session, open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+        cursor = session.cursor
         writer = csv.writer(file)
         writer.writerow(["constituent_id", "name", "qid","is_human"])
 
@@ -42,39 +49,210 @@ def add_humans(file_path):
                 continue
             
 
-            human = Human(name=name, cursor=cursor, w=writer)
-            print(human.name,human.id)
+            try:
+                # lookups and fetches first, with the pending rows committed: only
+                # the writes below run in the row's transaction
+                human = Human(name=name, cursor=cursor, w=writer)
+                print(human.name,human.id)
 
-            if human.id is None: 
-                print(qid)
-                if qid is None:
-                    qid = human.get_wikidata_qid_by_langs()
+                if human.id is None: 
+                    print(qid)
                     if qid is None:
-                        log_results(writer, constituent_id, name, "", 2)
+                        session.commit()
+                        qid = human.get_wikidata_qid_by_langs()
+                        if qid is None:
+                            log_results(writer, constituent_id, name, "", 2)
+                            continue
+
+                    human = Human(qid=qid, cursor=cursor, w=writer)
+
+                human_wiki_entity = None
+                if human.id is None:
+                    session.commit()
+                    human_wiki_entity = _fetch_human(qid)
+
+                with session.row():
+                    if human.id is not None: 
+
+                        log_results(writer, constituent_id, human.name, human.qid, 1)
+                        human.add_collection(7, constituent_id)  
                         continue
 
-                human = Human(qid=qid, cursor=cursor, w=writer)
-            
-            if human.id is not None: 
+                    human.save_from_wikidata(qid, human_wiki_entity=human_wiki_entity)
+                    if human.id is None:
+                        log_results(writer, constituent_id, name, qid, 0)
+                        continue
+                    
+                    human.add_collection(7, constituent_id)
+                    log_results(writer, constituent_id, human.name, human.qid, 1)
+                    # log_results(writer, qid, name, "Added successfully")
+            except Exception as e:
+                print(f"❌ Error writing {constituent_id}: {e}")
+                log_results(writer, constituent_id, name, qid, 0)
 
-                log_results(writer, constituent_id, human.name, human.qid, 1)
-                human.add_collection(7, constituent_id)  
-                conn.commit()
+
+_DONE = object()
+
+
+def _fetch_human(qid):
+    human_wiki_entity = HumanFromWikidata(qid)
+    if human_wiki_entity.instance_qid == "Q5":
+        # warm the caches so the writer does not wait on the network
+        Human.prefetch_from_wikidata(human_wiki_entity)
+    return human_wiki_entity
+
+
+async def add_humans_concurrently(
+    file_path,
+    concurrency=CONCURRENCY,
+    queue_size=QUEUE_SIZE,
+    commit_every=COMMIT_EVERY,
+    chunk_size=CSV_CHUNK_SIZE,
+):
+    """
+    Same result as add_humans, as a pipeline of three stages joined by bounded queues:
+    resolve (name -> QID, skip people already in the DB), fetch (Wikidata entity and
+    everything save_from_wikidata reads for it, `concurrency` at a time) and a single
+    writer that owns an IngestSession, committing every `commit_every` rows. Names
+    without a QID are resolved per CSV chunk with batched SPARQL queries.
+
+    The writer is served from the caches the fetch stage filled; it only goes to
+    Wikidata for an entity evicted from memory with the on-disk cache turned off.
+    """
+    resolve_queue = asyncio.Queue(maxsize=queue_size)
+    fetch_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    limit = asyncio.Semaphore(concurrency)
+
+    # readers get their own connection; the writer's connection lives on one thread
+    read_conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
+    read_conn.row_factory = sqlite3.Row
+    read_lock = threading.Lock()
+    write_executor = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+
+    def find_human(**kwargs):
+        with read_lock:
+            return Human(cursor=read_conn.cursor(), **kwargs).id
+
+    def known_names(names):
+        with read_lock:
+            return set(Human.get_many("name", names, read_conn.cursor()))
+
+    async def resolve_chunk(rows):
+        """QIDs for the chunk's unknown names, in as few SPARQL requests as possible."""
+        names = [row.name for row in rows if row.is_human == 2 and row.qid is None and row.name]
+        if not names:
+            return rows
+        names = [n for n in names if n not in await asyncio.to_thread(known_names, names)]
+        async with limit:
+            qids = await asyncio.to_thread(resolve_human_qids, names)
+        return [row._replace(qid=qids.get(row.name)) if row.qid is None and row.name in qids else row for row in rows]
+
+    async def read_rows():
+        reader = pd.read_csv(file_path, low_memory=False, chunksize=chunk_size)
+        for chunk in reader:
+            chunk = chunk.astype(object).where(pd.notna(chunk), None)
+            for row in await resolve_chunk(list(chunk.itertuples(index=False, name="HumanRow"))):
+                await resolve_queue.put(row)
+        for _ in range(concurrency):
+            await resolve_queue.put(_DONE)
+
+    async def resolve():
+        while (row := await resolve_queue.get()) is not _DONE:
+            qid, name, constituent_id = row.qid, row.name, row.constituent_id
+
+            if row.is_human != 2:
+                await write_queue.put(("log", constituent_id, name, qid, row.is_human))
                 continue
 
-            
+            human_id = await asyncio.to_thread(find_human, name=name)
+            if human_id is None:
+                if qid is None:
+                    # resolve_chunk found no QID for this name
+                    await write_queue.put(("log", constituent_id, name, "", 2))
+                    continue
+                human_id = await asyncio.to_thread(find_human, qid=qid)
+
+            if human_id is not None:
+                await write_queue.put(("existing", constituent_id, human_id))
+            else:
+                await fetch_queue.put((constituent_id, name, qid))
+        await fetch_queue.put(_DONE)
+
+    async def fetch():
+        while (item := await fetch_queue.get()) is not _DONE:
+            constituent_id, name, qid = item
+            try:
+                async with limit:
+                    human_wiki_entity = await asyncio.to_thread(_fetch_human, qid)
+            except Exception as e:
+                print(f"❌ Error fetching {qid}: {e}")
+                await write_queue.put(("log", constituent_id, name, qid, 0))
+                continue
+            await write_queue.put(("new", constituent_id, name, qid, human_wiki_entity))
+        await write_queue.put(_DONE)
+
+    def write(session, writer, item):
+        kind = item[0]
 
-            human.save_from_wikidata(qid)
+        if kind == "log":
+            log_results(writer, *item[1:])
+            return
+
+        with session.row() as cursor:
+            if kind == "existing":
+                _, constituent_id, human_id = item
+                human = Human(id=human_id, cursor=cursor, w=writer)
+                log_results(writer, constituent_id, human.name, human.qid, 1)
+                human.add_collection(7, constituent_id)
+                return
+
+            _, constituent_id, name, qid, human_wiki_entity = item
+            # another row may have added the same person since it was resolved
+            human = Human(qid=qid, cursor=cursor, w=writer)
+            if human.id is None:
+                human.save_from_wikidata(qid, human_wiki_entity=human_wiki_entity)
             if human.id is None:
                 log_results(writer, constituent_id, name, qid, 0)
-                continue
-            
+                return
             human.add_collection(7, constituent_id)
             log_results(writer, constituent_id, human.name, human.qid, 1)
-            # log_results(writer, qid, name, "Added successfully")
-            conn.commit()
 
-        conn.close()
+    async def write_rows(session, writer):
+        finished = 0
+        while finished < concurrency:
+            if write_queue.empty():
+                # nothing to write until a fetch finishes: don't hold the lock meanwhile
+                await loop.run_in_executor(write_executor, session.commit)
+            item = await write_queue.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            try:
+                await loop.run_in_executor(write_executor, write, session, writer, item)
+            except Exception as e:
+                print(f"❌ Error writing {item[1]}: {e}")
+
+    # the session (and its connection) is created, used and closed on the writer thread
+    session = await loop.run_in_executor(write_executor, lambda: IngestSession(DB_PATH, commit_every=commit_every))
+
+    try:
+        with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["constituent_id", "name", "qid","is_human"])
+
+            await asyncio.gather(
+                read_rows(),
+                *(resolve() for _ in range(concurrency)),
+                *(fetch() for _ in range(concurrency)),
+                write_rows(session, writer),
+            )
+    finally:
+        await loop.run_in_executor(write_executor, session.close)
+        write_executor.shutdown()
+        read_conn.close()
+
 
 # def add_human_location
 
@@ -142,6 +320,8 @@ if __name__ == "__main__":
     
     add_relatives("Q83229")
 
+    # asyncio.run(add_humans_concurrently("constituents.csv"))
+
     # add_to_collection(591,2,5490)
     # delete_human(7127)
     
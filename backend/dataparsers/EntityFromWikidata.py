@@ -1,30 +1,15 @@
-import requests
+from dataparsers.WikidataParser import WikidataParser
 
-HEADERS = {"User-Agent": "AliveThen-HumanFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
 
-
-class EntityFromWikidata:
-    def __init__(self, qid):
+class EntityFromWikidata(WikidataParser):
+    def __init__(self, qid, entity=None, label_resolver=None):
         self.qid = qid
         self.name = ""
+        self.description = ""
         
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            return response.json()["entities"][self.qid]
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
-
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        if not entity:
-            return
+        self._load(entity, label_resolver)
 
+    def _parse(self, entity, label_resolver):
         self.name = entity.get("labels", {}).get("en", {}).get("value", "unknown")
         self.description = (
             entity.get("descriptions", {}).get("en", {}).get("value", "") or ""
@@ -1,25 +1,13 @@
-import requests
 from urllib.parse import quote
 from utils.date_utils import year_from_time
-HEADERS = {"User-Agent": "BirdView-HumanFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
+from dataparsers.WikidataParser import WikidataParser
 
 
-def _safe_pick_entity(data: dict, requested_qid: str):
-    """EntityData JSON'undan güvenli şekilde entity seçer (redirect/missing handle)."""
-    entities = data.get("entities", {}) or {}
-    # 1) Tam istenen QID varsa ve missing değilse onu döndür
-    ent = entities.get(requested_qid)
-    if isinstance(ent, dict) and "missing" not in ent:
-        return ent
-    # 2) Yoksa ilk missing olmayanı döndür (redirect hedefi genelde burada olur)
-    for e in entities.values():
-        if isinstance(e, dict) and "missing" not in e:
-            return e
-    return None  # gerçekten bulunamadı
+class HumanFromWikidata(WikidataParser):
+    # gender and nationality labels
+    LABEL_PROPS = ("P21", "P27")
 
-
-class HumanFromWikidata:
-    def __init__(self, qid):
+    def __init__(self, qid, entity=None, label_resolver=None):
         self.qid = qid
         self.name = None
         self.description = ""
@@ -43,35 +31,9 @@ class HumanFromWikidata:
         self.num_of_identifiers = 0
         self.notable_works = []
         self.instance_qid=None
+        self.lastrevid = None
 
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            r = requests.get(url, headers=HEADERS, timeout=15)
-            r.raise_for_status()
-            data = r.json()
-            ent = _safe_pick_entity(data, self.qid)
-            if not ent:
-                raise KeyError(self.qid)
-            return ent
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
-
-    def _fetch_label(self, qid: str, lang: str = "en"):
-        """QID için etiket döndürür; redirect/missing güvenli."""
-        try:
-            url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
-            r = requests.get(url, headers=HEADERS, timeout=15)
-            r.raise_for_status()
-            ent = _safe_pick_entity(r.json(), qid)
-            if not ent:
-                return None
-            return ent.get("labels", {}).get(lang, {}).get("value")
-        except Exception:
-            return None
+        self._load(entity, label_resolver)
 
     def _parse_location_claims(self, claims, relation_type):
         results = []
@@ -148,13 +110,10 @@ class HumanFromWikidata:
 
         return None
 
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        print("entity")
-        if not entity:
-            return
-
+    def _parse(self, entity, label_resolver):
+        self.lastrevid = entity.get("lastrevid")
         claims = entity.get("claims", {}) or {}
+
         self.description = (
             entity.get("descriptions", {}).get("en", {}).get("value", "") or ""
         )
@@ -187,7 +146,7 @@ class HumanFromWikidata:
             if isinstance(gval, dict):
                 self.gender_qid = gval.get("id")
                 if self.gender_qid:
-                    self.gender = self._fetch_label(self.gender_qid, "en")
+                    self.gender = label_resolver.label(self.gender_qid, "en")
 
         # Nationality P27
         if "P27" in claims:
@@ -200,7 +159,7 @@ class HumanFromWikidata:
             if isinstance(nval, dict):
                 self.nationality_qid = nval.get("id")
                 if self.nationality_qid:
-                    self.nationality = self._fetch_label(self.nationality_qid, "en")
+                    self.nationality = label_resolver.label(self.nationality_qid, "en")
 
         # Signature P109
         if "P109" in claims:
@@ -366,7 +325,8 @@ class HumanFromWikidata:
             "movements": self.movements,
             "num_of_identifiers": self.num_of_identifiers,
             "notable_works": self.notable_works,
-            "instance_qid":self.instance_qid
+            "instance_qid":self.instance_qid,
+            "lastrevid": self.lastrevid,
         }
     
     
@@ -1,18 +1,21 @@
-import requests
 from urllib.parse import quote
 from utils.date_utils import year_from_time
+from dataparsers.WikidataParser import WikidataParser
+from dataparsers.coordinate_resolver import default_coordinate_resolver
 
-HEADERS = {"User-Agent": "AliveThen-HumanFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
 
+class LocationFromWikidata(WikidataParser):
+    # country and instance-of labels
+    LABEL_PROPS = ("P17", "P31")
 
-class LocationFromWikidata:
-    def __init__(self, qid):
+    def __init__(self, qid, entity=None, label_resolver=None, coordinate_resolver=None):
         self.qid = qid
         self.name = ""
         self.description = ""
         self.image_url = ""
         self.lat = None
         self.lon = None
+        self.coordinate_source = None
         self.instance_label = ""
         self.instance_qid = None
         self.logo_url = ""
@@ -20,23 +23,11 @@ class LocationFromWikidata:
         self.country_qid = None
         self.country_label = ""
 
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            return response.json()["entities"][self.qid]
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
-
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        if not entity:
-            return
+        # where _parse borrows coordinates when the place has no P625
+        self._coordinate_resolver = coordinate_resolver or default_coordinate_resolver()
+        self._load(entity, label_resolver)
 
+    def _parse(self, entity, label_resolver):
         claims = entity.get("claims", {})
 
         self.name = entity.get("labels", {}).get("en", {}).get("value", "unknown")
@@ -91,72 +82,18 @@ class LocationFromWikidata:
                     self.country_qid = val.get("id")  # None olabilir, sorun değil
 
             # Ülke adını da çek
-            country_url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.country_qid}.json"
-            try:
-                country_data = requests.get(country_url, headers=HEADERS).json()
-                self.country_label = country_data["entities"][self.country_qid][
-                    "labels"
-                ]["en"]["value"]
-            except:
-                pass
-
-        # coordinates (P625)
-        coords = None
-        if "P625" in claims:
-            snak = claims["P625"][0].get("mainsnak", {})
-            if snak.get("datatype") == "globe-coordinate":
-                coords = snak.get("datavalue", {}).get("value")
-
-                self.lat = coords.get("latitude") if coords else None
-                self.lon = coords.get("longitude") if coords else None
-                
-        elif "P131" in claims:
-            # Eğer koordinatlar yoksa, idari bölgeye bak
-            admin_qid = claims["P131"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            admin_entity = LocationFromWikidata(admin_qid)
-            self.lat = admin_entity.lat
-            self.lon = admin_entity.lon
-
-        elif "P361" in claims:
-            # Eğer koordinatlar yoksa, bağlı olduğu yere bak
-            partof_qid = claims["P361"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            partof_entity = LocationFromWikidata(partof_qid)
-            self.lat = partof_entity.lat
-            self.lon = partof_entity.lon
-
-        elif "P36" in claims:
-            # Eğer koordinatlar yoksa, başkent bilgisine bak
-            capital_qid = claims["P36"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            capital_entity = LocationFromWikidata(capital_qid)
-            self.lat = capital_entity.lat
-            self.lon = capital_entity.lon
-        elif "P17" in claims:
-            # Eğer koordinatlar yoksa, ülkeye bak
-            country_qid = claims["P17"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            country_entity = LocationFromWikidata(country_qid)
-            self.lat = country_entity.lat
-            self.lon = country_entity.lon
-        elif "P749" in claims:
-            # Eğer koordinatlar yoksa, kıtaya bak
-            continent_qid = claims["P749"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            continent_entity = LocationFromWikidata(continent_qid)
-            self.lat = continent_entity.lat
-            self.lon = continent_entity.lon
-        elif "P276" in claims:
-            # Eğer koordinatlar yoksa, locationa bak
-            ocean_qid = claims["P276"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            ocean_entity = LocationFromWikidata(ocean_qid)
-            self.lat = ocean_entity.lat
-            self.lon = ocean_entity.lon
+            self.country_label = label_resolver.label(self.country_qid, "en") or self.country_label
+
+        # coordinates (P625); without them, borrow the nearest ancestor's
+        # (P131 / P361 / P36 / P17 / P749 / P276) from the coordinate resolver
+        resolved = self._coordinate_resolver.resolve(self.qid, claims)
+        if resolved:
+            self.lat = resolved.lat
+            self.lon = resolved.lon
+            self.coordinate_source = resolved.source_chain[-1]
 
         if self.instance_qid:
-            label_url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.instance_qid}.json"
-            label_r = requests.get(label_url, headers=HEADERS)
-            label_r.raise_for_status()
-            label_data = label_r.json()
-            self.instance_label = label_data["entities"][self.instance_qid]["labels"][
-                "en"
-            ]["value"]
+            self.instance_label = label_resolver.label(self.instance_qid, "en") or self.instance_label
 
     def to_dict(self):
         return {
@@ -1,11 +1,12 @@
-import requests
 from urllib.parse import quote
+from dataparsers.WikidataParser import WikidataParser
 
-HEADERS = {"User-Agent": "AliveThen-MovementFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
 
+class MovementFromWikidata(WikidataParser):
+    # instance-of label
+    LABEL_PROPS = ("P31",)
 
-class MovementFromWikidata:
-    def __init__(self, qid):
+    def __init__(self, qid, entity=None, label_resolver=None):
         self.qid = qid
         self.name = ""
         self.description = ""
@@ -15,17 +16,7 @@ class MovementFromWikidata:
         self.start_date = None
         self.end_date = None
 
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            return response.json()["entities"][self.qid]
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
+        self._load(entity, label_resolver)
 
     def _parse_time(self, claim):
         """Helper: extracts a year from a Wikidata time string like '+1880-00-00T00:00:00Z'"""
@@ -37,11 +28,7 @@ class MovementFromWikidata:
         )
         return time_str.lstrip("+")[:4] if time_str else None
 
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        if not entity:
-            return
-
+    def _parse(self, entity, label_resolver):
         claims = entity.get("claims", {})
 
         self.name = entity.get("labels", {}).get("en", {}).get("value", "unknown")
@@ -57,14 +44,7 @@ class MovementFromWikidata:
         # Instance of (P31) label
         if "P31" in claims:
             instance_qid = claims["P31"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            try:
-                label_url = f"https://www.wikidata.org/wiki/Special:EntityData/{instance_qid}.json"
-                label_data = requests.get(label_url, headers=HEADERS).json()
-                self.instance_label = label_data["entities"][instance_qid]["labels"][
-                    "en"
-                ]["value"]
-            except:
-                pass
+            self.instance_label = label_resolver.label(instance_qid, "en") or self.instance_label
 
         # Inception (P571)
         if "P571" in claims:
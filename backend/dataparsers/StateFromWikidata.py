@@ -1,12 +1,11 @@
-import requests
-from urllib.parse import quote
-from dataparsers.EntityFromWikidata import EntityFromWikidata
+from dataparsers.WikidataParser import WikidataParser
 
-HEADERS = {"User-Agent": "AliveThen-HumanFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
 
+class StateFromWikidata(WikidataParser):
+    # type (instance-of) label
+    LABEL_PROPS = ("P31",)
 
-class StateFromWikidata:
-    def __init__(self, qid):
+    def __init__(self, qid, entity=None, label_resolver=None):
         self.qid = qid
         self.name = ""
         self.inception = None
@@ -14,23 +13,9 @@ class StateFromWikidata:
         self.type = None
        
 
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            return response.json()["entities"][self.qid]
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
-
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        if not entity:
-            return
+        self._load(entity, label_resolver)
 
+    def _parse(self, entity, label_resolver):
         claims = entity.get("claims", {})
 
         self.name = entity.get("labels", {}).get("en", {}).get("value", "unknown")
@@ -52,8 +37,7 @@ class StateFromWikidata:
         # Type (P31)
         if "P31" in claims:
             type_qid = claims["P31"][0]["mainsnak"]["datavalue"]["value"]["id"]
-            type_entity = EntityFromWikidata(type_qid)
-            self.type = type_entity.name
+            self.type = label_resolver.label(type_qid, "en") or "unknown"
 
        
 
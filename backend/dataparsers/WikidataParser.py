@@ -0,0 +1,55 @@
+from dataparsers.label_resolver import default_label_resolver
+from dataparsers.wikidata_api import fetch_entity
+from dataparsers.wikidata_api import first_claim_id
+
+
+class WikidataParser:
+    """
+    Shared shape of the *FromWikidata parsers. `_parse(entity, label_resolver)` turns
+    entity JSON into attributes and does no I/O of its own: the labels of the
+    items it refers to come from a LabelResolver, a place's borrowed coordinates
+    from the CoordinateResolver it was given (LocationFromWikidata).
+
+        HumanFromWikidata(qid)                          # fetch, then parse
+        HumanFromWikidata.from_entity_json(entity)      # parse JSON already at hand
+        HumanFromWikidata.from_entities_json(entities)  # one label prefetch for all
+
+    With DictLabelResolver / DictCoordinateResolver, parsing JSON at hand never
+    goes online.
+    """
+
+    # properties whose first value's label _parse asks for
+    LABEL_PROPS = ()
+
+    def _load(self, entity, label_resolver):
+        if entity is None:
+            entity = self._fetch_entity()
+        if entity:
+            label_resolver = label_resolver or default_label_resolver()
+            label_resolver.prefetch(self.label_qids(entity))
+            self._parse(entity, label_resolver)
+
+    def _fetch_entity(self):
+        return fetch_entity(self.qid)
+
+    def _parse(self, entity, label_resolver):
+        raise NotImplementedError
+
+    @classmethod
+    def label_qids(cls, entity) -> list:
+        claims = entity.get("claims", {}) or {}
+        return [q for q in (first_claim_id(claims, pid) for pid in cls.LABEL_PROPS) if q]
+
+    @classmethod
+    def from_entity_json(cls, entity, label_resolver=None, qid=None, **resolvers):
+        """
+        Parser for `entity`; `qid` is the id it was asked for, if that was a
+        redirect. `resolvers` go to the parser, e.g. coordinate_resolver.
+        """
+        return cls(qid or entity.get("id"), entity=entity, label_resolver=label_resolver, **resolvers)
+
+    @classmethod
+    def from_entities_json(cls, entities, label_resolver=None, **resolvers) -> list:
+        label_resolver = label_resolver or default_label_resolver()
+        label_resolver.prefetch([q for entity in entities for q in cls.label_qids(entity)])
+        return [cls(entity.get("id"), entity=entity, label_resolver=label_resolver, **resolvers) for entity in entities]
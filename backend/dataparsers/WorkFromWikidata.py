@@ -1,11 +1,12 @@
-import requests
 from urllib.parse import quote
+from dataparsers.WikidataParser import WikidataParser
 
-HEADERS = {"User-Agent": "AliveThen-HumanFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
 
+class WorkFromWikidata(WikidataParser):
+    # instance-of label
+    LABEL_PROPS = ("P31",)
 
-class WorkFromWikidata:
-    def __init__(self, qid):
+    def __init__(self, qid, entity=None, label_resolver=None):
         self.qid = qid
         self.title = ""
         self.description = ""
@@ -15,23 +16,9 @@ class WorkFromWikidata:
         self.instance_qid = None
         
 
-        self._fetch_and_parse()
-
-    def _fetch_entity(self):
-        url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.qid}.json"
-        try:
-            response = requests.get(url, headers=HEADERS)
-            response.raise_for_status()
-            return response.json()["entities"][self.qid]
-        except Exception as e:
-            print(f"❌ Error fetching {self.qid}: {e}")
-            return None
-
-    def _fetch_and_parse(self):
-        entity = self._fetch_entity()
-        if not entity:
-            return
+        self._load(entity, label_resolver)
 
+    def _parse(self, entity, label_resolver):
         claims = entity.get("claims", {})
 
         self.name = entity.get("labels", {}).get("en", {}).get("value", "unknown")
@@ -73,13 +60,7 @@ class WorkFromWikidata:
 
         
         if self.instance_qid:
-            label_url = f"https://www.wikidata.org/wiki/Special:EntityData/{self.instance_qid}.json"
-            label_r = requests.get(label_url, headers=HEADERS)
-            label_r.raise_for_status()
-            label_data = label_r.json()
-            self.instance_label = label_data["entities"][self.instance_qid]["labels"][
-                "en"
-            ]["value"]
+            self.instance_label = label_resolver.label(self.instance_qid, "en") or self.instance_label
 
     def to_dict(self):
         return {
@@ -0,0 +1,163 @@
+from typing import NamedTuple
+
+from dataparsers.wikidata_api import fetch_entities
+from dataparsers.wikidata_api import first_claim_id
+from utils.lru_cache import LRUCache
+
+# where to borrow coordinates from when a place has no P625, in order: located in
+# the administrative entity, part of, capital, country, parent organization, location
+FALLBACK_PROPS = ("P131", "P361", "P36", "P17", "P749", "P276")
+
+# longest chain followed from a place to the ancestor whose coordinates it takes
+MAX_DEPTH = 6
+
+
+class ResolvedCoordinates(NamedTuple):
+    lat: float
+    lon: float
+    source_chain: tuple  # QIDs from the place itself to the one holding P625
+
+
+def own_coordinates(claims):
+    """(lat, lon) from the first P625 statement, or None."""
+    for statement in claims.get("P625") or []:
+        snak = statement.get("mainsnak") or {}
+        if snak.get("datatype", "globe-coordinate") != "globe-coordinate":
+            continue
+        value = (snak.get("datavalue") or {}).get("value")
+        if isinstance(value, dict) and value.get("latitude") is not None and value.get("longitude") is not None:
+            return value["latitude"], value["longitude"]
+        break
+    return None
+
+
+class CoordinateResolver:
+    """
+    Coordinates of Wikidata places, following FALLBACK_PROPS up the hierarchy
+    when a place has none of its own. Results (and dead ends) are memoized per
+    QID, so thousands of places under the same country cost one fetch of that
+    country; cycles and chains longer than `max_depth` are cut off.
+    """
+
+    def __init__(self, max_depth=MAX_DEPTH, maxsize=50_000):
+        self.max_depth = max_depth
+        self._memo = LRUCache(maxsize=maxsize)  # qid -> ResolvedCoordinates | None
+
+    def _entities(self, qids) -> dict:
+        """{qid: entity JSON} of the places and ancestors to walk through."""
+        return fetch_entities(qids)
+
+    def _claims(self, qid, fetched):
+        if qid in fetched:
+            return fetched[qid]
+        entity = self._entities([qid]).get(qid)
+        return entity.get("claims", {}) if entity else None
+
+    def _resolve(self, qid, path, fetched):
+        """
+        (result, complete); an incomplete None was cut short and is not memoized.
+        `fetched` maps QIDs already at hand to their claims (None: no such entity).
+        """
+        hit = self._memo.get(qid, False)
+        if hit is not False:
+            return hit, True
+        if qid in path or len(path) >= self.max_depth:
+            return None, False
+
+        claims = self._claims(qid, fetched)
+        if claims is None:
+            self._memo.put(qid, None)
+            return None, True
+
+        coordinates = own_coordinates(claims)
+        if coordinates:
+            result = ResolvedCoordinates(coordinates[0], coordinates[1], (qid,))
+            self._memo.put(qid, result)
+            return result, True
+
+        complete = True
+        path = path + (qid,)
+        for pid in FALLBACK_PROPS:
+            parent = first_claim_id(claims, pid)
+            if not parent:
+                continue
+            found, parent_complete = self._resolve(parent, path, fetched)
+            if found:
+                result = ResolvedCoordinates(found.lat, found.lon, (qid,) + found.source_chain)
+                self._memo.put(qid, result)
+                return result, True
+            complete = complete and parent_complete
+
+        if complete:
+            self._memo.put(qid, None)
+        return None, complete
+
+    def _resolve_root(self, qid, fetched):
+        result, complete = self._resolve(qid, (), fetched)
+        if not complete:
+            # cut short below, but final for a walk that starts here
+            self._memo.put(qid, result)
+        return result
+
+    def resolve(self, qid, claims=None) -> ResolvedCoordinates | None:
+        """Coordinates for `qid`; pass `claims` when the entity is already at hand."""
+        if not qid:
+            return None
+        return self._resolve_root(qid, {qid: claims} if claims is not None else {})
+
+    def resolve_many(self, qids) -> dict:
+        """
+        {qid: ResolvedCoordinates | None}. Each level of ancestors is fetched in
+        batches before resolving, rather than one request per place.
+        """
+        qids = [q for q in dict.fromkeys(qids) if q]
+        frontier = [q for q in qids if self._memo.get(q, False) is False]
+        seen = set(frontier)
+        fetched = {}
+
+        for _ in range(self.max_depth):
+            if not frontier:
+                break
+            entities = self._entities(frontier)
+            parents = []
+            for qid in frontier:
+                entity = entities.get(qid)
+                claims = fetched[qid] = entity.get("claims", {}) if entity else None
+                if not claims or own_coordinates(claims):
+                    continue
+                parent = next(filter(None, (first_claim_id(claims, pid) for pid in FALLBACK_PROPS)), None)
+                if parent and parent not in seen and self._memo.get(parent, False) is False:
+                    seen.add(parent)
+                    parents.append(parent)
+            frontier = parents
+
+        return {qid: self._resolve_root(qid, fetched) for qid in qids}
+
+
+class DictCoordinateResolver(CoordinateResolver):
+    """
+    Coordinates from a mapping of {qid: entity JSON} (e.g. read from a dump),
+    without I/O: an ancestor missing from it is a dead end.
+    """
+
+    def __init__(self, entities=None, **kwargs):
+        super().__init__(**kwargs)
+        self.entities = dict(entities or {})
+
+    def _entities(self, qids) -> dict:
+        return {qid: self.entities[qid] for qid in qids if qid in self.entities}
+
+
+_resolver = CoordinateResolver()
+
+
+def default_coordinate_resolver() -> CoordinateResolver:
+    return _resolver
+
+
+def resolve_coordinates(qid, claims=None) -> ResolvedCoordinates | None:
+    return _resolver.resolve(qid, claims)
+
+
+def resolve_coordinates_many(qids) -> dict:
+    return _resolver.resolve_many(qids)
@@ -0,0 +1,50 @@
+from dataparsers.wikidata_api import fetch_label
+from dataparsers.wikidata_api import prefetch_labels
+
+
+class LabelResolver:
+    """
+    Where parsers get the labels of the items they refer to (gender, nationality,
+    instance of, country). `prefetch` is called with every QID a batch of
+    entities will ask about before any `label` call, so an implementation can
+    answer them with one lookup.
+    """
+
+    def prefetch(self, qids):
+        pass
+
+    def label(self, qid, lang="en"):
+        raise NotImplementedError
+
+
+class WikidataLabelResolver(LabelResolver):
+    """Labels through wikidata_api: memory, the entity cache, then wbgetentities."""
+
+    def prefetch(self, qids):
+        prefetch_labels(qids)
+
+    def label(self, qid, lang="en"):
+        return fetch_label(qid, lang)
+
+
+class DictLabelResolver(LabelResolver):
+    """
+    Labels from a mapping, without I/O: {qid: label} or {qid: entity JSON} (e.g.
+    read from a dump). For benchmarks and for workers handed their labels.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {})
+
+    def label(self, qid, lang="en"):
+        value = self.labels.get(qid)
+        if isinstance(value, dict):
+            return value.get("labels", {}).get(lang, {}).get("value")
+        return value if lang == "en" else None
+
+
+_default = WikidataLabelResolver()
+
+
+def default_label_resolver() -> LabelResolver:
+    return _default
@@ -0,0 +1,215 @@
+import os
+import time
+
+from utils.entity_cache import EntityCache
+from utils.http_client import get_client
+from utils.lru_cache import LRUCache
+
+HEADERS = {"User-Agent": "BirdView-WikidataFetcher/1.0 (gulsenyilmaz9@gmail.com)"}
+
+WIKIDATA_API_URL = os.getenv("WIKIDATA_API_URL", "https://www.wikidata.org/w/api.php")
+
+# languages of the label-only lookups (fetch_label / prefetch_labels). Full entities
+# keep every language: the parsers fall back to any label when there is no English one.
+WIKIDATA_LANGUAGES = os.getenv("WIKIDATA_LANGUAGES", "en|mul|tr|fr|de|es|it|nl|pt|ru|ja|zh")
+
+# empty WIKIDATA_CACHE_PATH turns the on-disk cache off
+WIKIDATA_CACHE_PATH = os.getenv("WIKIDATA_CACHE_PATH", "wikidata_cache.db")
+WIKIDATA_CACHE_TTL = float(os.getenv("WIKIDATA_CACHE_TTL", str(7 * 24 * 3600)))
+
+# with WIKIDATA_OFFLINE set, entities come only from the caches (e.g. filled from a
+# dump by ingest_dump.py); anything not cached is treated as missing
+WIKIDATA_OFFLINE = os.getenv("WIKIDATA_OFFLINE", "") not in ("", "0", "false")
+
+# wbgetentities accepts at most 50 ids per call
+BATCH_SIZE = 50
+REQUEST_TIMEOUT = 30
+
+FULL_PROPS = "labels|descriptions|claims|info"
+LABEL_PROPS = "labels|descriptions|info"
+
+_cache = None
+_memory = LRUCache(maxsize=4096)  # recently used entities of this process: key -> (fetched_at, entity)
+
+
+def set_offline(offline=True):
+    global WIKIDATA_OFFLINE
+    WIKIDATA_OFFLINE = offline
+
+
+def reset_process_state():
+    """Drops the cache connection and in-memory entities, e.g. in a forked worker."""
+    global _cache
+    _cache = None
+    _memory.clear()
+
+
+def get_cache() -> EntityCache | None:
+    global _cache
+    if _cache is None and WIKIDATA_CACHE_PATH:
+        _cache = EntityCache(WIKIDATA_CACHE_PATH, ttl_seconds=WIKIDATA_CACHE_TTL)
+    return _cache
+
+
+def _cache_key(qid, full):
+    # label-only entities are much smaller (no claims) and cached apart from full ones
+    return qid if full else f"{qid}/labels"
+
+
+def _remembered(key):
+    hit = _memory.get(key)
+    if hit is None or time.time() - hit[0] >= WIKIDATA_CACHE_TTL:
+        return None
+    return hit[1]
+
+
+def _remember(key, entity):
+    _memory.put(key, (time.time(), entity))
+
+
+def first_claim_id(claims: dict, pid: str):
+    """QID of the first item value of `pid`, or None."""
+    statements = claims.get(pid) or []
+    if not statements:
+        return None
+    value = (statements[0].get("mainsnak", {}).get("datavalue") or {}).get("value")
+    return value.get("id") if isinstance(value, dict) else None
+
+
+def _wbgetentities(qids, props, languages=None) -> dict:
+    """{requested qid: entity} for up to BATCH_SIZE ids in one request."""
+    params = {"action": "wbgetentities", "ids": "|".join(qids), "props": props, "format": "json"}
+    if languages:
+        params["languages"] = languages
+
+    r = get_client().get(WIKIDATA_API_URL, params=params, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    r.raise_for_status()
+    data = r.json()
+    if "error" in data:
+        raise RuntimeError(data["error"].get("info") or data["error"])
+
+    found = {}
+    for key, ent in (data.get("entities") or {}).items():
+        if not isinstance(ent, dict) or "missing" in ent:
+            continue
+        # a redirected id comes back under its target, with the id that was asked for
+        requested = (ent.get("redirects") or {}).get("from", key)
+        found[requested] = ent
+    return found
+
+
+def latest_revisions(qids) -> dict:
+    """{qid: lastrevid}, BATCH_SIZE ids per props=info call."""
+    qids = list(dict.fromkeys(qids))
+    revisions = {}
+    for start in range(0, len(qids), BATCH_SIZE):
+        for qid, ent in _wbgetentities(qids[start:start + BATCH_SIZE], "info").items():
+            revisions[qid] = ent.get("lastrevid")
+    return revisions
+
+
+def fetch_entities(qids, full=True, revisions=None) -> dict:
+    """
+    {qid: entity} for every qid that exists, following redirects. Entities come
+    from memory or the on-disk cache while fresh; stale ones are revalidated in
+    one props=info call and the rest are downloaded BATCH_SIZE per request. With
+    full=False only labels and descriptions in WIKIDATA_LANGUAGES are fetched
+    (enough for label lookups); full entities carry every language.
+    `revisions` ({qid: lastrevid}, e.g. from latest_revisions) makes cached copies
+    of any other revision count as missing.
+    """
+    qids = [q for q in dict.fromkeys(qids) if q]
+    cache = get_cache()
+    props = FULL_PROPS if full else LABEL_PROPS
+    revisions = revisions or {}
+
+    def current(qid, entity):
+        return revisions.get(qid) is None or entity.get("lastrevid") == revisions[qid]
+
+    found = {}
+    stale = {}
+    missing = []
+    for qid in qids:
+        entity = _remembered(_cache_key(qid, full))
+        if entity is None and not full:
+            # a full entity has the labels too
+            entity = _remembered(_cache_key(qid, True))
+        if entity is not None and current(qid, entity):
+            found[qid] = entity
+            continue
+
+        cached = cache.get(_cache_key(qid, full)) if cache else None
+        if cached is None and cache and not full:
+            cached = cache.get(_cache_key(qid, True))
+        if cached and WIKIDATA_OFFLINE:
+            found[qid] = cached.entity
+            _remember(_cache_key(qid, full), cached.entity)
+        elif cached and not current(qid, cached.entity):
+            missing.append(qid)
+        elif cached and cached.fresh:
+            found[qid] = cached.entity
+            _remember(_cache_key(qid, full), cached.entity)
+        elif cached and cached.lastrevid is not None:
+            stale[qid] = cached
+        else:
+            missing.append(qid)
+
+    if WIKIDATA_OFFLINE:
+        return found
+
+    if stale:
+        try:
+            revisions = latest_revisions(list(stale))
+        except Exception as e:
+            print(f"❌ Error checking revisions of {len(stale)} entities: {e}")
+            revisions = {}
+
+        unchanged = [qid for qid, cached in stale.items() if revisions.get(qid) == cached.lastrevid]
+        if unchanged:
+            cache.touch([_cache_key(qid, full) for qid in unchanged])
+        for qid in unchanged:
+            found[qid] = stale[qid].entity
+            _remember(_cache_key(qid, full), stale[qid].entity)
+        missing += [qid for qid in stale if qid not in found]
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        try:
+            downloaded = _wbgetentities(batch, props, None if full else WIKIDATA_LANGUAGES)
+        except Exception as e:
+            print(f"❌ Error fetching {', '.join(batch)}: {e}")
+            downloaded = {}
+            # keep serving what we had rather than nothing
+            for qid in batch:
+                if qid in stale:
+                    found[qid] = stale[qid].entity
+
+        for qid, entity in downloaded.items():
+            found[qid] = entity
+            _remember(_cache_key(qid, full), entity)
+            if cache:
+                cache.put(_cache_key(qid, full), entity)
+
+    return found
+
+
+def prefetch_labels(qids):
+    """Loads the labels of `qids` in as few requests as possible, ahead of fetch_label calls."""
+    fetch_entities([q for q in qids if q], full=False)
+
+
+def fetch_entity(qid):
+    """Entity JSON (labels, descriptions, claims, lastrevid) for `qid`, or None."""
+    if not qid:
+        return None
+    return fetch_entities([qid]).get(qid)
+
+
+def fetch_label(qid, lang="en"):
+    """QID için etiket döndürür; redirect/missing güvenli."""
+    if not qid:
+        return None
+    entity = fetch_entities([qid], full=False).get(qid)
+    if not entity:
+        return None
+    return entity.get("labels", {}).get(lang, {}).get("value")
@@ -0,0 +1,94 @@
+import os
+
+from utils.http_client import get_client
+
+WIKIDATA_SPARQL_URL = os.getenv("WIKIDATA_SPARQL_URL", "https://query.wikidata.org/sparql")
+
+HEADERS = {
+    "User-Agent": "AliveThen-WikidataLookup/1.0 (gulsenyilmaz9@gmail.com)",
+    "Accept": "application/sparql-results+json",
+}
+
+# label languages in order of preference: a match in an earlier language wins
+HUMAN_LABEL_LANGS = [
+    "en", "tr", "it", "fr", "de", "es", "pt", "nl", "ru", "ar", "fa", "el", "pl", "sv", "no",
+    "da", "fi", "cs", "hu", "ro", "bg", "uk", "he", "ja", "zh", "ko", "sq", "sr", "hr", "bs",
+]
+
+# names per query; every name is looked up in every language, so this keeps a
+# query well inside the endpoint's 60s budget
+NAME_BATCH_SIZE = 100
+REQUEST_TIMEOUT = 60
+
+
+def sparql_string(s: str) -> str:
+    """`s` as a quoted SPARQL string literal."""
+    escaped = (
+        s.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+    return f'"{escaped}"'
+
+
+def build_human_qid_query(names, langs) -> str:
+    names_values = " ".join(sparql_string(name) for name in names)
+    lang_values = " ".join(f'("{lang}" {rank})' for rank, lang in enumerate(langs))
+    return f"""
+        SELECT ?name ?qid ?rank ?alt WHERE {{
+            VALUES ?name {{ {names_values} }}
+            VALUES (?lang ?rank) {{ {lang_values} }}
+            BIND(STRLANG(?name, ?lang) AS ?label)
+
+            {{ ?person rdfs:label ?label . BIND(0 AS ?alt) }}
+            UNION
+            {{ ?person skos:altLabel ?label . BIND(1 AS ?alt) }}
+
+            ?person wdt:P31 wd:Q5 .
+            BIND(STRAFTER(STR(?person), "entity/") AS ?qid)
+        }}
+    """
+
+
+def _run_query(query) -> list:
+    # POST: a batch of names does not fit in a URL
+    try:
+        response = get_client().post(WIKIDATA_SPARQL_URL, data={"query": query}, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        print(f"❌ SPARQL name lookup failed: {e}")
+        return []
+    if response.status_code != 200:
+        print(f"❌ HTTP error {response.status_code} for SPARQL name lookup")
+        return []
+    try:
+        return response.json().get("results", {}).get("bindings", [])
+    except Exception as e:
+        print("❌ JSON decode failed:", e)
+        return []
+
+
+def resolve_human_qids(names, langs=HUMAN_LABEL_LANGS, batch_size=NAME_BATCH_SIZE) -> dict:
+    """
+    {name: QID or None} for people (P31 = Q5) whose label or alias is `name`,
+    NAME_BATCH_SIZE names and every language per request. When a name matches
+    in several languages the first language in `langs` wins, and a label beats
+    an alias in the same language.
+    """
+    names = list(dict.fromkeys(n for n in names if isinstance(n, str) and n.strip()))
+    resolved = dict.fromkeys(names)
+    best = {}
+
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        for binding in _run_query(build_human_qid_query(batch, langs)):
+            name = binding["name"]["value"]
+            rank = (int(binding["rank"]["value"]), int(binding["alt"]["value"]))
+            if name in resolved and (name not in best or rank < best[name]):
+                best[name] = rank
+                resolved[name] = binding["qid"]["value"]
+
+    found = sum(1 for qid in resolved.values() if qid)
+    print(f"✅ Found {found} QIDs for {len(names)} names")
+    return resolved
@@ -1,5 +1,9 @@
 import sqlite3
-import requests
+import time
+import weakref
+
+from utils.db_schema import MIGRATE_COMMAND
+from utils.http_client import get_client
 
 DB_PATH = "birdview.db"
 
@@ -9,8 +13,27 @@ HEADERS = {
     "User-Agent": "AliveThen-WikidataLookup/1.0 (gulsenyilmaz9@gmail.com)",
     "Accept": "application/sparql-results+json",
 }
+# sqlite's default SQLITE_MAX_VARIABLE_NUMBER is 999 on older builds
+MAX_IN_PARAMS = 900
+
+BULK_BATCH_SIZE = 500
+
+# cursor -> {(TABLE_NAME, ((field, value), ...)): row dict}; dropped with the cursor
+_identity_maps = weakref.WeakKeyDictionary()
+
+
+# cursors whose transactions roll a failed row back (IngestSession): a write error
+# on them is logged and re-raised instead of only logged
+_strict_cursors = weakref.WeakSet()
 
 
+def _identity_map(cursor):
+    if cursor is None:
+        return None
+    try:
+        return _identity_maps.setdefault(cursor, {})
+    except TypeError:
+        return None
 
 
 class BaseEntity:
@@ -18,9 +41,17 @@ class BaseEntity:
     TABLE_NAME = None
     FIELDS = ["id", "name"]  # subclasses should override
 
+    # small lookup tables (genders, occupations, ...) that ingest resolves by name
+    # over and over: rows found are remembered per cursor and reused
+    CACHE_LOOKUPS = False
+
+    # natural key of a row, the default conflict target of bulk_upsert()
+    UNIQUE_KEYS = None
+
     def __init__(self, **kwargs):
         self.cursor = kwargs.get("cursor")
         self.w = kwargs.get("w")
+        self._lookup_key = None
 
         # Dinamik alan oluşturma
         for field in self.FIELDS:
@@ -29,8 +60,36 @@ class BaseEntity:
         if self.TABLE_NAME is None:
             raise NotImplementedError("Subclass must define TABLE_NAME")
 
+        # rows already read by get_many() are not looked up again
+        row = kwargs.get("_row")
+        if row is not None:
+            for field in self.FIELDS:
+                setattr(self, field, row[field])
+            return
+
         self._get_from_table()
 
+    def _cache_key(self):
+        return (
+            self.TABLE_NAME,
+            tuple((field, getattr(self, field)) for field in self.FIELDS if getattr(self, field, None) is not None),
+        )
+
+    def _remember(self, key):
+        cache = _identity_map(self.cursor) if self.CACHE_LOOKUPS else None
+        if cache is not None and key is not None and getattr(self, "id", None) is not None:
+            cache[key] = {field: getattr(self, field, None) for field in self.FIELDS}
+
+    @classmethod
+    def _forget_rows(cls, cursor):
+        cache = _identity_map(cursor) if cls.CACHE_LOOKUPS else None
+        if cache:
+            for key in [k for k in cache if k[0] == cls.TABLE_NAME]:
+                del cache[key]
+
+    def _forget_table(self):
+        self._forget_rows(self.cursor)
+
     def _get_from_table(self):
         conn = None
         conditions = []
@@ -45,6 +104,15 @@ class BaseEntity:
         if not conditions:
             return
 
+        if self.CACHE_LOOKUPS:
+            self._lookup_key = self._cache_key()
+            cache = _identity_map(self.cursor)
+            row = cache.get(self._lookup_key) if cache is not None else None
+            if row is not None:
+                for field in self.FIELDS:
+                    setattr(self, field, row[field])
+                return
+
         if self.cursor is None:
             conn = sqlite3.connect(DB_PATH)
             conn.row_factory = sqlite3.Row
@@ -61,6 +129,7 @@ class BaseEntity:
             if row:
                 for field in self.FIELDS:
                     setattr(self, field, row[field])
+                self._remember(self._lookup_key)
 
                 # field_updates = ", ".join([f"{col}={repr(getattr(self, col, None))}" for col in self.FIELDS])
 
@@ -99,6 +168,7 @@ class BaseEntity:
             self.id = self.cursor.lastrowid
             for key in columns:
                 setattr(self, key, data[key])
+            self._remember(self._lookup_key)
             
             field_updates = ", ".join([f"{col}={repr(data[col])}" for col in columns])
 
@@ -110,6 +180,8 @@ class BaseEntity:
             self.log_results(
                 f"❌ Error in {self.TABLE_NAME} table: {e}",
             )
+            if self.cursor in _strict_cursors:
+                raise
 
         if conn:
             conn.commit()
@@ -142,6 +214,7 @@ class BaseEntity:
                 WHERE id = ?
             """
             self.cursor.execute(query, values)
+            self._forget_table()
              # güncel değerleri nesne üzerine de yaz
             for col in columns:
                 setattr(self, col, data[col])
@@ -157,6 +230,8 @@ class BaseEntity:
             self.log_results(
                 f"❌ error in {self.TABLE_NAME} table: {e}",
             )
+            if self.cursor in _strict_cursors:
+                raise
 
         if conn:
             conn.commit()
@@ -177,6 +252,7 @@ class BaseEntity:
         try:
             query = f"DELETE FROM {self.TABLE_NAME} WHERE id = ?"
             self.cursor.execute(query, (self.id,))  # ✅ kritik düzeltme
+            self._forget_table()
 
             self.log_results(f"✅ DELETED from {self.TABLE_NAME}")
 
@@ -185,6 +261,8 @@ class BaseEntity:
 
         except Exception as e:
             self.log_results(f"❌ error deleting from {self.TABLE_NAME}: {str(e)}")
+            if self.cursor in _strict_cursors:
+                raise
 
         if conn:
             conn.commit()
@@ -192,11 +270,199 @@ class BaseEntity:
 
     
 
+    @staticmethod
+    def raise_errors_on(cursor):
+        """set_data, update and delete on `cursor` re-raise SQL errors after logging them."""
+        _strict_cursors.add(cursor)
+
+    @staticmethod
+    def forget_cursor(cursor):
+        """Drops what the identity map remembers for `cursor`, e.g. after a rollback."""
+        _identity_maps.pop(cursor, None)
+
+    @classmethod
+    def get_many(cls, field, values, cursor, w=None):
+        """
+        {value: entity} for every row whose `field` is one of `values`, read with
+        one IN query per chunk instead of one SELECT per entity. Values with no
+        row are missing from the result; duplicates keep the first row.
+        """
+        if field not in cls.FIELDS:
+            raise ValueError(f"{field} is not a field of {cls.TABLE_NAME}")
+
+        wanted = list(dict.fromkeys(v for v in values if v is not None))
+        found = {}
+
+        for start in range(0, len(wanted), MAX_IN_PARAMS):
+            chunk = wanted[start:start + MAX_IN_PARAMS]
+            placeholders = ", ".join(["?"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT {", ".join(cls.FIELDS)} FROM {cls.TABLE_NAME}
+                WHERE {field} IN ({placeholders})
+                ORDER BY rowid
+                """,
+                chunk,
+            )
+            for row in cursor.fetchall():
+                row = {f: row[i] for i, f in enumerate(cls.FIELDS)}
+                if row[field] in found:
+                    continue
+                entity = cls(cursor=cursor, w=w, _row=row)
+                entity._remember((cls.TABLE_NAME, ((field, row[field]),)))
+                found[row[field]] = entity
+
+        return found
+
+    @classmethod
+    def _log_batch(cls, w, message):
+        print("-------------------------------------------------")
+        if w:
+            w.writerow(["", "", message])
+        print(f"{message}")
+
+    @classmethod
+    def _ids_by_key(cls, cursor, rows, keys):
+        """{key tuple: id} for the rows already stored under the keys of `rows`."""
+        wanted = list(dict.fromkeys(tuple(row[k] for k in keys) for row in rows))
+        found = {}
+        per_chunk = max(1, MAX_IN_PARAMS // len(keys))
+        key_list = ", ".join(keys)
+
+        for start in range(0, len(wanted), per_chunk):
+            chunk = wanted[start:start + per_chunk]
+            tuples = ", ".join(["(" + ", ".join(["?"] * len(keys)) + ")"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT id, {key_list} FROM {cls.TABLE_NAME}
+                WHERE ({key_list}) IN (VALUES {tuples})
+                ORDER BY id
+                """,
+                [value for key in chunk for value in key],
+            )
+            for row in cursor.fetchall():
+                found.setdefault(tuple(row[1:]), row[0])
+        return found
+
+    @classmethod
+    def _has_unique_index(cls, cursor, keys):
+        for index in cursor.execute(f"PRAGMA index_list({cls.TABLE_NAME})").fetchall():
+            if not index[2]:
+                continue
+            columns = [row[2] for row in cursor.execute(f"PRAGMA index_info({index[1]})").fetchall()]
+            if sorted(columns) == sorted(keys):
+                return True
+        return False
+
+    @classmethod
+    def bulk_upsert(cls, rows, conflict_keys=None, update_columns=None, cursor=None, w=None, batch_size=BULK_BATCH_SIZE):
+        """
+        Writes many rows with executemany + INSERT ... ON CONFLICT(conflict_keys),
+        against the unique index utils/db_schema.ensure_schema() creates on them.
+        Rows that already exist get `update_columns` overwritten (default: every
+        non-key column; pass [] to leave them untouched). Rows with a NULL key are
+        skipped (a unique index never conflicts on NULL). Returns the row ids in
+        the order of `rows`, None for a skipped row. Logs one line per batch.
+
+        Each batch runs in a savepoint: a failing batch is rolled back and the
+        error raised, earlier batches stay in the caller's transaction. Without
+        the unique index (a database not migrated yet) nothing is written and a
+        RuntimeError raised.
+        """
+        keys = tuple(conflict_keys or cls.UNIQUE_KEYS or ())
+        if not keys:
+            raise ValueError(f"bulk_upsert on {cls.TABLE_NAME} needs conflict_keys")
+
+        rows = [{k: v for k, v in row.items() if k in cls.FIELDS and k != "id"} for row in rows]
+        if not rows:
+            return []
+
+        columns = list(rows[0])
+        if any(set(row) != set(columns) for row in rows):
+            raise ValueError(f"bulk_upsert on {cls.TABLE_NAME} needs rows with the same columns")
+        if any(k not in columns for k in keys):
+            raise ValueError(f"bulk_upsert on {cls.TABLE_NAME}: every row needs {keys}")
+
+        skipped = {i for i, row in enumerate(rows) if any(row[k] is None for k in keys)}
+        if skipped:
+            cls._log_batch(w, f"❌ {cls.TABLE_NAME}: skipped {len(skipped)} rows with a NULL in {keys}")
+
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in keys]
+        update_columns = [c for c in update_columns if c in columns and c not in keys]
+
+        conn = None
+        if cursor is None:
+            conn = sqlite3.connect(DB_PATH)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+        if update_columns:
+            on_conflict = "DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+        else:
+            on_conflict = "DO NOTHING"
+        upsert_query = f"""
+            INSERT INTO {cls.TABLE_NAME} ({", ".join(columns)})
+            VALUES ({", ".join(["?"] * len(columns))})
+            ON CONFLICT ({", ".join(keys)}) {on_conflict}
+        """
+        try:
+            if not cls._has_unique_index(cursor, keys):
+                raise RuntimeError(
+                    f"bulk_upsert on {cls.TABLE_NAME}: no unique index on ({', '.join(keys)}), "
+                    f"run {MIGRATE_COMMAND}"
+                )
+            if not cursor.connection.in_transaction:
+                # the savepoints below must not open (and commit) transactions of their own
+                cursor.execute("BEGIN")
+
+            upserted = [row for i, row in enumerate(rows) if i not in skipped]
+            by_key = {}
+            for batch_no, start in enumerate(range(0, len(upserted), batch_size), 1):
+                batch = upserted[start:start + batch_size]
+                started = time.perf_counter()
+                cursor.execute("SAVEPOINT bulk_upsert")
+                try:
+                    last_id = cursor.execute(f"SELECT MAX(id) FROM {cls.TABLE_NAME}").fetchone()[0] or 0
+                    cursor.executemany(upsert_query, [[row[c] for c in columns] for row in batch])
+                    batch_ids = cls._ids_by_key(cursor, batch, keys)
+                except BaseException as e:
+                    cursor.execute("ROLLBACK TO bulk_upsert")
+                    cursor.execute("RELEASE bulk_upsert")
+                    cls._forget_rows(cursor)
+                    cls._log_batch(w, f"❌ Error in {cls.TABLE_NAME} table: batch={batch_no} rows={len(batch)}: {e}")
+                    raise
+                cursor.execute("RELEASE bulk_upsert")
+
+                inserted = len({i for i in batch_ids.values() if i > last_id})
+                by_key.update(batch_ids)
+                cls._log_batch(
+                    w,
+                    f"✅ UPSERTED in {cls.TABLE_NAME} table: batch={batch_no} rows={len(batch)} "
+                    f"inserted={inserted} existing={len(batch_ids) - inserted} "
+                    f"ms={(time.perf_counter() - started) * 1000:.1f}",
+                )
+
+            ids = [None if i in skipped else by_key.get(tuple(row[k] for k in keys)) for i, row in enumerate(rows)]
+
+            cls._forget_rows(cursor)
+            if conn:
+                conn.commit()
+        finally:
+            if conn:
+                conn.close()
+
+        return ids
+
     def get_wikidata_qid(self):
 
         # print(f"Executing SPARQL query for {self.TABLE_NAME}:\n{self.SPARQL_QUERY}\n")
         
-        response = requests.get(WIKIDATA_ENDPOINT, headers=HEADERS, params={"query": self.SPARQL_QUERY})
+        try:
+            response = get_client().get(WIKIDATA_ENDPOINT, headers=HEADERS, params={"query": self.SPARQL_QUERY})
+        except Exception as e:
+            print(f"❌ Request failed for {self.TABLE_NAME}: {e}")
+            return None
        
         if response.status_code != 200:
             print(f"❌ HTTP error {response.status_code} for query:\n{self.SPARQL_QUERY}\n")
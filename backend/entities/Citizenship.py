@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class Citizenship(BaseEntity):
     TABLE_NAME = "citizenships"
+    UNIQUE_KEYS = ("human_id", "state_id")
     FIELDS = [
         "id",
         "human_id",
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class EventType(BaseEntity):
     TABLE_NAME = "event_types"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "name", 
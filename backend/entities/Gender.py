@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class Gender(BaseEntity):
     TABLE_NAME = "genders"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "name"
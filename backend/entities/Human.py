@@ -1,8 +1,13 @@
 from dataparsers.StateFromWikidata import StateFromWikidata
 from dataparsers.LocationFromWikidata import LocationFromWikidata
+from dataparsers.coordinate_resolver import resolve_coordinates_many
 from dataparsers.EntityFromWikidata import EntityFromWikidata
 from dataparsers.MovementFromWikidata import MovementFromWikidata
 from dataparsers.HumanFromWikidata import HumanFromWikidata
+from dataparsers.wikidata_api import fetch_entities
+from dataparsers.wikidata_api import prefetch_labels
+from dataparsers.wikidata_api import latest_revisions
+from dataparsers.wikidata_sparql import resolve_human_qids
 from fastapi import HTTPException
 
 from entities.HumanLocation import HumanLocation
@@ -38,6 +43,7 @@ class Human(BaseEntity):
         "description",
         "img_url",
         "signature_url",
+        "lastrevid",
     ]
 
     def __init__(self, **kwargs):
@@ -71,16 +77,12 @@ class Human(BaseEntity):
         return s.replace("\\", "\\\\").replace('"', '\\"')
     
     def get_wikidata_qid_by_langs(self):
-        langs = ["en","tr","it","fr","de","es","pt","nl","ru","ar","fa","el","pl","sv","no","da","fi","cs","hu","ro","bg","uk","he","ja","zh","ko","sq","sr", "hr", "bs"]
-        safe_name = self.sparql_escape(self.name)
-        for lang in langs:
-            print("looking for qid---------------------------", lang)
-            self.SPARQL_QUERY = self.build_label_query(safe_name, lang)
-            qid = self.get_wikidata_qid()   
-            if qid:
-                print("found a qid---------------------------", qid)
-                return qid
-        return None
+        # every language in one query instead of one request per language
+        print("looking for qid---------------------------", self.name)
+        qid = resolve_human_qids([self.name]).get(self.name)
+        if qid:
+            print("found a qid---------------------------", qid)
+        return qid
 
     def update_gender(self, gender):
         gender_str = "NOT_FOUND"
@@ -169,6 +171,7 @@ class Human(BaseEntity):
             self.log_results("ℹ️ no occupations")
             return
         
+        human_occupations = []
         for occupation in occupations:
 
             if not occupation:
@@ -181,14 +184,31 @@ class Human(BaseEntity):
             if occupation_wiki_entity.name in description:
                 is_primary = 1
 
-            self.add_occupation(occupation_wiki_entity.name,is_primary)
+            occupation_database_entity = self.get_occupation(occupation_wiki_entity.name)
+            if occupation_database_entity is None:
+                continue
 
-                        
-    def add_occupation(self, occupation_name, is_primary=False):
+            human_occupations.append(
+                {
+                    "human_id": self.id,
+                    "occupation_id": occupation_database_entity.id,
+                    "is_primary": is_primary
+                }
+            )
+
+        HumanOccupation.bulk_upsert(
+            human_occupations,
+            update_columns=["is_primary"],
+            cursor=self.cursor,
+            w=self.w
+        )
+
+
+    def get_occupation(self, occupation_name):
 
         if not occupation_name:
             self.log_results("❌ Failed to fetch occupation_name")
-            return
+            return None
         
         for key in Occupation.TO_CHANGE.keys():
             if key in occupation_name:
@@ -209,6 +229,15 @@ class Human(BaseEntity):
                     "name": occupation_name
                 }
             )   
+
+        return occupation_database_entity
+
+                        
+    def add_occupation(self, occupation_name, is_primary=False):
+
+        occupation_database_entity = self.get_occupation(occupation_name)
+        if occupation_database_entity is None:
+            return
            
         human_occupation_database_entity = HumanOccupation(
             human_id=self.id,
@@ -238,6 +267,7 @@ class Human(BaseEntity):
             self.log_results("ℹ️ no movements")
             return
 
+        human_movements = []
         for movement in movements:
 
             if not movement:
@@ -255,21 +285,19 @@ class Human(BaseEntity):
 
                 movement_database_entity.set_data(movement_wiki_entity.to_dict())
 
-            human_movement_database_entity = HumanMovement(
-                human_id = self.id, 
-                movement_id = movement_database_entity.id, 
-                cursor = self.cursor,
-                w=self.w 
+            human_movements.append(
+                {
+                    "human_id": self.id, 
+                    "movement_id": movement_database_entity.id
+                }
             )
 
-            if human_movement_database_entity.id is None:
-                
-                human_movement_database_entity.set_data(
-                    {
-                        "human_id": self.id, 
-                        "movement_id": movement_database_entity.id
-                    }
-                )
+        HumanMovement.bulk_upsert(
+            human_movements,
+            update_columns=[],
+            cursor=self.cursor,
+            w=self.w
+        )
             
 
 
@@ -278,6 +306,18 @@ class Human(BaseEntity):
             self.log_results("ℹ️ no locations")
             return
 
+        human_locations = []
+        known_locations = Location.get_many(
+            "qid",
+            [location.get("qid") for location in locations if location],
+            cursor=self.cursor,
+            w=self.w
+        )
+        # coordinates of the new places (and their fallback ancestors) in batches
+        resolve_coordinates_many(
+            [location.get("qid") for location in locations if location and location.get("qid") not in known_locations]
+        )
+
         for location in locations:
             if  not location:
                 continue
@@ -288,16 +328,13 @@ class Human(BaseEntity):
             if not qid:
                 continue
 
-            
-            location_database_entity = Location(
-                qid = qid,
-                cursor = self.cursor,
-                w = self.w
-            )
+            location_database_entity = known_locations.get(qid)
 
-            if location_database_entity.id is None:
+            if location_database_entity is None:
                 location_wiki_entity = LocationFromWikidata(qid)
+                location_database_entity = Location(cursor = self.cursor, w = self.w)
                 location_database_entity.set_data(location_wiki_entity.to_dict())
+                known_locations[qid] = location_database_entity
                     
             humanlocationtype_database_entity = HumanLocationType(
                 name = location["relation_type"], 
@@ -313,31 +350,37 @@ class Human(BaseEntity):
                     }
                 )
             
-            humanlocation_database_entity = HumanLocation(
-                human_id = self.id,
-                location_id = location_database_entity.id,
-                relationship_type_id = humanlocationtype_database_entity.id,
-                cursor = self.cursor,
-                w = self.w
+            human_locations.append(
+                {
+                    "human_id": self.id,
+                    "location_id": location_database_entity.id,
+                    "relationship_type_id": humanlocationtype_database_entity.id,
+                    "start_date": location["start_date"],
+                    "end_date": location["end_date"],
+                    "source_url": location["source_url"] if location["source_url"] else "",
+                }
             )
-            if humanlocation_database_entity.id is None:
-                
-                humanlocation_database_entity.set_data(
-                    {
-                        "human_id": self.id,
-                        "location_id": location_database_entity.id,
-                        "relationship_type_id": humanlocationtype_database_entity.id,
-                        "start_date": location["start_date"],
-                        "end_date": location["end_date"],
-                        "source_url": location["source_url"] if location["source_url"] else "",
-                    }
-                )
+
+        HumanLocation.bulk_upsert(
+            human_locations,
+            update_columns=[],
+            cursor=self.cursor,
+            w=self.w
+        )
 
     def update_relatives(self, relatives):
         if not relatives:
             self.log_results("ℹ️ no relatives")
             return
 
+        human_humans = []
+        known_relatives = Human.get_many(
+            "qid",
+            [relative.get("qid") for relative in relatives if relative],
+            cursor=self.cursor,
+            w=self.w
+        )
+
         for relative in relatives:
             if  not relative:
                 continue
@@ -348,14 +391,12 @@ class Human(BaseEntity):
             if not qid:
                 continue
 
-            relative_database_entity = Human(
-                qid = qid,
-                cursor = self.cursor,
-                w = self.w
-            )
+            relative_database_entity = known_relatives.get(qid)
 
-            if relative_database_entity.id is None:
+            if relative_database_entity is None:
+                relative_database_entity = Human(cursor = self.cursor, w = self.w)
                 relative_database_entity.save_from_wikidata(qid)
+                known_relatives[qid] = relative_database_entity
 
             
                 
@@ -376,25 +417,23 @@ class Human(BaseEntity):
 
             relative_database_entity.log_results(humanrelationshiptype_database_entity.name)
             
-            humanhuman_database_entity = HumanHuman(
-                human_id = self.id,
-                related_human_id = relative_database_entity.id,
-                relationship_type_id = humanrelationshiptype_database_entity.id,
-                cursor = self.cursor,
-                w = self.w
+            human_humans.append(
+                {
+                    "human_id": self.id,
+                    "related_human_id": relative_database_entity.id,
+                    "relationship_type_id": humanrelationshiptype_database_entity.id,
+                    "start_date": relative["start_date"],
+                    "end_date": relative["end_date"],
+                    "source_url": relative["source_url"] if relative["source_url"] else "",
+                }
             )
-            if humanhuman_database_entity.id is None:
-                
-                humanhuman_database_entity.set_data(
-                    {
-                        "human_id": self.id,
-                        "related_human_id": relative_database_entity.id,
-                        "relationship_type_id": humanrelationshiptype_database_entity.id,
-                        "start_date": relative["start_date"],
-                        "end_date": relative["end_date"],
-                        "source_url": relative["source_url"] if relative["source_url"] else "",
-                    }
-                )                
+
+        HumanHuman.bulk_upsert(
+            human_humans,
+            update_columns=[],
+            cursor=self.cursor,
+            w=self.w
+        )
 
 
 
@@ -449,6 +488,7 @@ class Human(BaseEntity):
             self.log_results("ℹ️ no citizenships")
             return
 
+        human_citizenships = []
         for state in citizenships:
             if  not state:
                 continue
@@ -467,20 +507,19 @@ class Human(BaseEntity):
                 state_database_entity.set_data(state_wiki_entity.to_dict())
                     
             
-            citizenship_database_entity = Citizenship(
-                human_id=self.id,
-                state_id=state_database_entity.id,
-                cursor=self.cursor,
-                w=self.w
+            human_citizenships.append(
+                {
+                    "human_id": self.id,
+                    "state_id": state_database_entity.id
+                }
             )
-            if citizenship_database_entity.id is None:
-                
-                citizenship_database_entity.set_data(
-                    {
-                        "human_id": self.id,
-                        "state_id": state_database_entity.id
-                    }
-                )
+
+        Citizenship.bulk_upsert(
+            human_citizenships,
+            update_columns=[],
+            cursor=self.cursor,
+            w=self.w
+        )
 
     def update_collections(self, collection_ids):
 
@@ -488,6 +527,7 @@ class Human(BaseEntity):
             self.log_results("❌ Failed to fetch collection_ids")
             return
 
+        human_collections = []
         for collection_id in collection_ids:
             if  not collection_id:
                 continue
@@ -503,20 +543,19 @@ class Human(BaseEntity):
                 self.log_results("❌ Failed to fetch this collection_id")
                 continue
 
-            human_collection_database_entity = HumanCollection(
-                human_id=self.id,
-                collection_id=collection_database_entity.id,
-                cursor=self.cursor,
-                w=self.w
+            human_collections.append(
+                {
+                    "human_id": self.id,
+                    "collection_id": collection_database_entity.id
+                }
             )
-            if human_collection_database_entity.id is None:
-                
-                human_collection_database_entity.set_data(
-                    {
-                        "human_id": self.id,
-                        "collection_id": collection_database_entity.id
-                    }
-                )
+
+        HumanCollection.bulk_upsert(
+            human_collections,
+            update_columns=[],
+            cursor=self.cursor,
+            w=self.w
+        )
 
     def add_collection(self, collection_id, constituent_id):
 
@@ -578,7 +617,37 @@ class Human(BaseEntity):
         
 
 
-    def save_from_wikidata(self, qid):
+    @staticmethod
+    def prefetch_from_wikidata(human_wiki_entity):
+        """
+        Loads what save_from_wikidata reads from Wikidata for this person into the
+        caches: the places, occupations, movements and states it refers to, the
+        labels their parsers ask for (country, instance of) and the ancestors a
+        place without coordinates borrows them from. Run ahead of the write, so
+        the write does not wait on the network.
+        """
+        places = [location.get("qid") for location in human_wiki_entity.locations if location]
+        places += [human_wiki_entity.birth_place, human_wiki_entity.death_place]
+        places = [qid for qid in places if isinstance(qid, str)]
+        related = [
+            (LocationFromWikidata, places),
+            (EntityFromWikidata, human_wiki_entity.occupations),
+            (MovementFromWikidata, human_wiki_entity.movements),
+            (StateFromWikidata, human_wiki_entity.citizenships),
+        ]
+
+        entities = fetch_entities([qid for _, qids in related for qid in qids if isinstance(qid, str)])
+        prefetch_labels([
+            label_qid
+            for parser, qids in related
+            for qid in qids
+            if qid in entities
+            for label_qid in parser.label_qids(entities[qid])
+        ])
+        resolve_coordinates_many(places)
+
+    def save_from_wikidata(self, qid, human_wiki_entity=None):
+        """Inserts the person and their relations; pass `human_wiki_entity` if it is already fetched."""
 
         if not qid:
             # self.log_results("", "", f"❌ {self.name}: qid id not given")
@@ -586,14 +655,15 @@ class Human(BaseEntity):
         
         self.qid = qid
 
-        try:
-            human_wiki_entity = HumanFromWikidata(self.qid)
+        if human_wiki_entity is None:
+            try:
+                human_wiki_entity = HumanFromWikidata(self.qid)
 
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Wikidata fetch failed: {str(e)}"
-            )
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Wikidata fetch failed: {str(e)}"
+                )
         
         if human_wiki_entity.instance_qid != "Q5":
             # self.log_results("", "", f"❌ {self.name} is not human")
@@ -610,7 +680,8 @@ class Human(BaseEntity):
                 "signature_url": human_wiki_entity.signature_url,
                 "birth_date": human_wiki_entity.birth_date,
                 "death_date": human_wiki_entity.death_date,
-                "num_of_identifiers": human_wiki_entity.num_of_identifiers
+                "num_of_identifiers": human_wiki_entity.num_of_identifiers,
+                "lastrevid": human_wiki_entity.lastrevid,
             }
         )  
         
@@ -625,7 +696,12 @@ class Human(BaseEntity):
         self.update_uniqueplace(5, human_wiki_entity.death_place, human_wiki_entity.death_date) 
         # self.update_relatives(human_wiki_entity.relatives)
 
-    def update_from_wikidata(self):
+    def update_from_wikidata(self, force=False, human_wiki_entity=None):
+        """
+        Re-reads the person from Wikidata. Unless `force`d, a person whose stored
+        lastrevid is still Wikidata's current revision is left alone (one cheap
+        props=info call). Returns True when the row was rewritten.
+        """
         print("update_from_wikidata---------------------------",self.name)
         qid = self.qid
 
@@ -638,15 +714,22 @@ class Human(BaseEntity):
                 self.update({
                             "qid": "NOT_FOUND_AGAIN"
                         })
-                return
+                return False
             
-        try:
-            human_wiki_entity = HumanFromWikidata(qid)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Wikidata fetch failed: {str(e)}"
-            )
+        if human_wiki_entity is None:
+            try:
+                current_revision = latest_revisions([qid]).get(qid)
+                if not force and current_revision is not None and current_revision == self.lastrevid:
+                    self.log_results(f"ℹ️ {qid} unchanged since revision {current_revision}")
+                    return False
+                # make sure an older cached copy is not parsed again
+                fetch_entities([qid], revisions={qid: current_revision})
+                human_wiki_entity = HumanFromWikidata(qid)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Wikidata fetch failed: {str(e)}"
+                )
 
         self.update(
             {
@@ -657,7 +740,8 @@ class Human(BaseEntity):
                 "description": human_wiki_entity.description,
                 "img_url": human_wiki_entity.image_url,
                 "signature_url": human_wiki_entity.signature_url,
-                "num_of_identifiers": human_wiki_entity.num_of_identifiers
+                "num_of_identifiers": human_wiki_entity.num_of_identifiers,
+                "lastrevid": human_wiki_entity.lastrevid,
             }
         )
         # self.update_nationality(human_wiki_entity.nationality)
@@ -670,6 +754,7 @@ class Human(BaseEntity):
         self.update_uniqueplace(4, human_wiki_entity.birth_place, human_wiki_entity.birth_date)
         self.update_uniqueplace(5, human_wiki_entity.death_place, human_wiki_entity.death_date) 
         self.update_relatives(human_wiki_entity.relatives)
+        return True
 
     def update_from_wikidata_birth_death_place(self):
         print("update_from_wikidata---------------------------")
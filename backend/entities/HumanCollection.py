@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanCollection(BaseEntity):
     TABLE_NAME = "human_collection"
+    UNIQUE_KEYS = ("human_id", "collection_id")
     FIELDS = [
         "id",
         "human_id",
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanHuman(BaseEntity):
     TABLE_NAME = "human_human"
+    UNIQUE_KEYS = ("human_id", "related_human_id", "relationship_type_id")
     FIELDS = [
         "id",
         "human_id",
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanLocation(BaseEntity):
     TABLE_NAME = "human_location"
+    UNIQUE_KEYS = ("human_id", "location_id", "relationship_type_id")
     FIELDS = [
         "id", 
         "human_id", 
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanLocationType(BaseEntity):
     TABLE_NAME = "human_location_types"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "name"
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanMovement(BaseEntity):
     TABLE_NAME = "human_movement"
+    UNIQUE_KEYS = ("human_id", "movement_id")
     FIELDS = [
         "id", 
         "movement_id", 
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanOccupation(BaseEntity):
     TABLE_NAME = "human_occupation"
+    UNIQUE_KEYS = ("human_id", "occupation_id")
     FIELDS = [
         "id",
         "occupation_id", 
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class HumanRelationshipType(BaseEntity):
     TABLE_NAME = "human_relationship_types"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id",
         "name",
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class LocationType(BaseEntity):
     TABLE_NAME = "location_types"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id",
         "label"
@@ -1,4 +1,8 @@
 from entities.BaseEntity import BaseEntity
+from utils.date_utils import event_years
+from utils.event_hierarchy import CLOSURE_TABLE
+from utils.event_hierarchy import recompute_depths
+from utils.event_hierarchy import recompute_hierarchy
 
 class MilitaryEvent(BaseEntity):
     TABLE_NAME = "military_events"
@@ -17,9 +21,30 @@ class MilitaryEvent(BaseEntity):
             "depth_index",
             "depth_level",
             "descendant_count",
-            "parent_id"
+            "parent_id",
+            "start_year",
+            "end_year",
     ]
 
+    TIME_FIELDS = ("start_time", "end_time", "point_in_time")
+
+    def _with_years(self, data: dict) -> dict:
+        """
+        Adds start_year / end_year whenever a time field is written, so readers
+        filter and sort on indexed integers instead of parsing dates per row.
+        """
+        if not any(key in data for key in self.TIME_FIELDS):
+            return data
+        times = {key: data.get(key, getattr(self, key, None)) for key in self.TIME_FIELDS}
+        start_year, end_year = event_years(times["start_time"], times["end_time"], times["point_in_time"])
+        return {**data, "start_year": start_year, "end_year": end_year}
+
+    def set_data(self, data):
+        super().set_data(self._with_years(data))
+
+    def update(self, data: dict):
+        super().update(self._with_years(data))
+
     def get_parent_depth_index(self) -> str | None:
         """
         '109_38_16' -> '109_38'
@@ -40,34 +65,35 @@ class MilitaryEvent(BaseEntity):
 
     def get_descendants(self) -> list[dict]:
         """
-        depth_index'i tam olarak self.depth_index'ten sonra '_' ile devam eden
-        (yani çocuk + torun + torunun çocukları vb.)
-        tüm eventleri döndürür.
+        Every event under this one (children, grandchildren, ...), from the
+        closure table: one range lookup on its primary key.
         """
-
-        # depth_index içindeki LIKE wildcardlarını kaçır
-        prefix = self.depth_index
-
-        # Önce backslash'ı, sonra '_' ve '%' yi escape edelim
-        escaped_prefix = (
-            prefix.replace("\\", "\\\\")
-                .replace("_", r"\_")
-                .replace("%", r"\%")
-        )
-
-        like_pattern = escaped_prefix + r"\_%"   # örn: '109\_3\_%'
-
-        query = """
-            SELECT id, qid, lat, lon, start_time, end_time, point_in_time, descendant_count
-            FROM military_events
-            WHERE depth_index LIKE ? ESCAPE '\\'
-            AND id != ?
+        query = f"""
+            SELECT me.id, me.qid, me.lat, me.lon, me.start_time, me.end_time, me.point_in_time, me.descendant_count
+            FROM {CLOSURE_TABLE} AS c
+            JOIN military_events AS me ON me.id = c.descendant_id
+            WHERE c.ancestor_id = ? AND c.depth > 0
         """
 
-        self.cursor.execute(query, (like_pattern, self.id))
+        self.cursor.execute(query, (self.id,))
         results = self.cursor.fetchall()
 
         return [dict(row) for row in results]
+
+    def get_ancestor_ids(self) -> list[int]:
+        """Parent first, root last."""
+        self.cursor.execute(
+            f"SELECT ancestor_id FROM {CLOSURE_TABLE} WHERE descendant_id = ? AND depth > 0 ORDER BY depth",
+            (self.id,),
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def is_ancestor_of(self, event_id) -> bool:
+        self.cursor.execute(
+            f"SELECT 1 FROM {CLOSURE_TABLE} WHERE ancestor_id = ? AND descendant_id = ? AND depth > 0",
+            (self.id, event_id),
+        )
+        return self.cursor.fetchone() is not None
     
     def fit_descendants_data(self):
         descendants = self.get_descendants()
@@ -204,67 +230,49 @@ class MilitaryEvent(BaseEntity):
             }) 
 
     def update_parent(self, data):
+        """
+        Moves the event, with its whole subtree, under `parent_id` (None: makes it
+        a root). The closure triggers re-link the subtree in two set-based
+        statements; depth_index / depth_level of the subtree and the
+        descendant_count of the old and new ancestors follow in one UPDATE each.
+        """
         parent_id = data.get("parent_id")
-        old_parent_id = self.parent_id  # mevcut parent
 
-        if parent_id is None:
-            self.update({
-                "parent_id": None,
-            })
-            if old_parent_id is not None:
-                old_parent = MilitaryEvent(
-                    id=old_parent_id,
-                    cursor=self.cursor,
-                    w=getattr(self, "w", None),
-                )
-                old_parent.update_descendant_count()
-                old_parent.update_parent_descendant_count()
-
-            self.update_descendants_data()
-            self.update_depth()
-            
-            return
+        if parent_id is not None:
+            parent_event = MilitaryEvent(
+                id = parent_id,
+                cursor = self.cursor,
+                w = getattr(self, "w", None),
+            )
 
-        parent_event = MilitaryEvent(
-            id = parent_id,
-            cursor = self.cursor,
-            w = getattr(self, "w", None),
-        )
+            if parent_event.id is None:
+                self.log_results(f"Parent event with id={parent_id} not found. update_parent skipped.")
+                return
+
+            if parent_event.id == self.id or self.is_ancestor_of(parent_event.id):
+                self.log_results(f"Event {parent_id} is in the subtree of {self.id}. update_parent skipped.")
+                return
+
+        # ancestors that lose the subtree, read before the closure table moves it
+        old_ancestor_ids = self.get_ancestor_ids()
 
-        if parent_event.id is None:
-            self.log_results(
-                getattr(self, "id", "-"),
-                f"Parent event with id={parent_id} not found.",
-                " update_parent skipped.",
-            )
-            return
-        
         self.update({
-            "parent_id": parent_event.id,
+            "parent_id": parent_id,
         })
 
-        if old_parent_id is not None:
-            old_parent = MilitaryEvent(
-                id=old_parent_id,
-                cursor=self.cursor,
-                w=getattr(self, "w", None),
-            )
-            old_parent.update_descendant_count()
-            old_parent.update_parent_descendant_count()
-        
-        self.update_descendants_data()
         self.update_depth()
-       
-        self.update_parent_descendant_count()
+        self.update_descendants_data()
+        self.update_descendant_count()
+        self.update_parent_descendant_count(old_ancestor_ids)
 
     def generate_depth_index(self):
-
-        new_depth_index = str(self.id)  # varsayılan: root ise kendi id'si
-        if self.parent_id:
-            parent_event = MilitaryEvent(id=self.parent_id, cursor=self.cursor, w=getattr(self, "w", None),)
-            new_depth_index = f"{parent_event.generate_depth_index()}_{new_depth_index}"
-
-        return new_depth_index
+        # ancestors from the root down, then the event itself: '109_38_16'
+        self.cursor.execute(
+            f"SELECT ancestor_id FROM {CLOSURE_TABLE} WHERE descendant_id = ? ORDER BY depth DESC",
+            (self.id,),
+        )
+        path = [str(row[0]) for row in self.cursor.fetchall()]
+        return "_".join(path) if path else str(self.id)
     
 
     def update_depth(self):
@@ -277,53 +285,54 @@ class MilitaryEvent(BaseEntity):
         }) 
 
     def update_descendants_data(self):
-        descendants = self.get_descendants()
+        """
+        depth_index / depth_level of every descendant, rebuilt from this event's
+        own in one recursive walk down parent_id, not one MilitaryEvent per descendant.
+        """
+        updated = recompute_depths(self.cursor, self.id)
 
-        if not descendants:
-            self.log_results(
-                getattr(self, "id", "-"),
-                "No descendants found.",
-                " update_desecendants_data skipped.",
-            )
-            return
-        
-        for descendant in descendants:
-            event = MilitaryEvent(id=descendant["id"], cursor=self.cursor, w=getattr(self, "w", None),) 
-            event.update_depth()
+        self.log_results(
+            f"✅ UPDATED in {self.TABLE_NAME} table: depth of {updated} events under {self.id}",
+        )
 
     def update_descendant_count(self):
-        descendants = self.get_descendants()
-
-        if not descendants:
-            self.log_results(
-                getattr(self, "id", "-"),
-                "No descendants found.",
-                " update_descendant_counts skipped.",
-            )
-            return
-        
+        self.cursor.execute(
+            f"SELECT COUNT(*) FROM {CLOSURE_TABLE} WHERE ancestor_id = ? AND depth > 0",
+            (self.id,),
+        )
         self.update({
-            "descendant_count": len(descendants)
+            "descendant_count": self.cursor.fetchone()[0]
         })
 
-    def update_parent_descendant_count(self):
-        print("Update parent descendant count...")
-        parent_id = self.parent_id
+    def update_parent_descendant_count(self, other_ancestor_ids=()):
+        """descendant_count of every ancestor (and of `other_ancestor_ids`, e.g. the old ones) in one UPDATE."""
+        ids = list(dict.fromkeys([*self.get_ancestor_ids(), *other_ancestor_ids]))
+        if not ids:
+            return
 
-        while parent_id:
-            parent_event = MilitaryEvent(
-                id=parent_id,
-                cursor=self.cursor,
-                w=getattr(self, "w", None),
+        placeholders = ", ".join("?" * len(ids))
+        self.cursor.execute(
+            f"""
+            UPDATE military_events
+            SET descendant_count = (
+                SELECT COUNT(*) FROM {CLOSURE_TABLE} AS c
+                WHERE c.ancestor_id = military_events.id AND c.depth > 0
             )
+            WHERE id IN ({placeholders})
+            """,
+            ids,
+        )
 
-            parent_event.update_descendant_count()
-            parent_id = parent_event.parent_id
-       
-                
-                
-               
-            
-
+        self.log_results(
+            f"✅ UPDATED in {self.TABLE_NAME} table: descendant_count of {len(ids)} ancestors of {self.id}",
+        )
 
-       
+    @classmethod
+    def recompute_hierarchy(cls, cursor, root_id=None, rebuild=False, w=None) -> dict:
+        """
+        depth_index, depth_level and descendant_count of the subtree under
+        `root_id`, or of every event, in set-based passes (utils/event_hierarchy.py).
+        """
+        stats = recompute_hierarchy(cursor, root_id=root_id, rebuild=rebuild)
+        cls._log_batch(w, f"✅ RECOMPUTED hierarchy in {cls.TABLE_NAME} table: {stats}")
+        return stats
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class Nationality(BaseEntity):
     TABLE_NAME = "nationalities"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "name"
@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class Occupation(BaseEntity):
     TABLE_NAME = "occupations"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "name"
@@ -93,46 +93,59 @@ class Work(BaseEntity):
             "type_id": work_type.id
         })
     
-    def update_location(self, location_name):
-      
-            if  not location_name:
-                return
-            print("locations-------------------------------------------------")
+    def find_location(self, location_name, before_fetch=None):
+        """
+        The stored Location for `location_name`, or when there is none, the
+        Wikidata lookup for it as (location, location_wiki_entity): the network
+        half of update_location, so it can run before the row's transaction.
+        `before_fetch` is called before the first request.
+        """
+        location_database_entity = Location(
+            name=location_name,
+            cursor=self.cursor,
+            w=self.w
+        )
+        location_wiki_entity = None
+
+        if location_database_entity.id is None:
+
+            if before_fetch is not None:
+                before_fetch()
+
+            l_qid = location_database_entity.get_wikidata_qid()
 
             location_database_entity = Location(
-                name=location_name,
+                qid=l_qid,
                 cursor=self.cursor,
                 w=self.w
             )
 
             if location_database_entity.id is None:
+                location_wiki_entity = LocationFromWikidata(l_qid)
 
-                l_qid = location_database_entity.get_wikidata_qid()
+        return location_database_entity, location_wiki_entity
 
-                location_database_entity = Location(
-                    qid=l_qid,
-                    cursor=self.cursor,
-                    w=self.w
-                )
+    def update_location(self, location_name, found_location=None):
+        """Sets location_id; pass `found_location` from find_location if it is already looked up."""
 
-                if location_database_entity.id is None:
-                
-                    location_wiki_entity = LocationFromWikidata(l_qid)
-
-                    if location_wiki_entity is None:
-                        self.log_results(
-                            self.id,
-                            location_name,
-                            "❌ Failed to fetch location"
-                        )
-                        return
-                    else:
-                        location_database_entity.set_data(location_wiki_entity.to_dict())
-
-            self.update({
-                "location_id": location_database_entity.id
-            })
-                    
+        if  not location_name:
+            return
+        print("locations-------------------------------------------------")
+
+        location_database_entity, location_wiki_entity = found_location or self.find_location(location_name)
 
-         
-   
\ No newline at end of file
+        if location_database_entity.id is None:
+
+            if location_wiki_entity is None:
+                self.log_results(
+                    self.id,
+                    location_name,
+                    "❌ Failed to fetch location"
+                )
+                return
+            else:
+                location_database_entity.set_data(location_wiki_entity.to_dict())
+
+        self.update({
+            "location_id": location_database_entity.id
+        })
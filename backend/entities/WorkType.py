@@ -3,6 +3,7 @@ from entities.BaseEntity import BaseEntity
 
 class WorkType(BaseEntity):
     TABLE_NAME = "work_types"
+    CACHE_LOOKUPS = True
     FIELDS = [
         "id", 
         "label"
@@ -2,6 +2,7 @@ import pandas as pd
 import sqlite3
 import csv  
 from entities.Human import Human
+from utils.ingest_session import IngestSession
 from entities.HumanOccupation import HumanOccupation
 
 
@@ -97,9 +98,8 @@ def log_results(w, id, name, message):
 
 def filter_occupations():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    session = IngestSession(DB_PATH, foreign_keys=False)
+    cursor = session.cursor
 
     cursor.execute(
         """SELECT id, name, num_of_identifiers, birth_date 
@@ -110,7 +110,7 @@ def filter_occupations():
     results = cursor.fetchall()
     rows = [dict(row) for row in results]
 
-    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+    with session, open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
         writer.writerow(["id", "name", "Result"])
 
@@ -147,17 +147,18 @@ def filter_occupations():
                 if found_occupations:
                     log_results(writer, id, human.name, "--------------------------------------------------------")    
                     log_results(writer, id, human.name, f"✅ Artist occupations found: {', '.join(found_occupations)}")
-                    for occupation_name in found_occupations:
-                         human.add_occupation(occupation_name, 1)
-                    conn.commit()
+                    try:
+                        with session.row():
+                            for occupation_name in found_occupations:
+                                human.add_occupation(occupation_name, 1)
+                    except Exception as e:
+                        log_results(writer, id, human.name, f"❌ rolled back: {e}")
                     continue
 
                 log_results(writer, id, human.name, "❌ No artist occupation found")
                 
                 continue
 
-        conn.close()
-
 
 def update_occupations():
 
@@ -0,0 +1,369 @@
+"""
+Offline ingest of people from a Wikidata JSON dump (latest-all.json.bz2/.gz or a
+filtered subset with one entity per line), without per-entity HTTP.
+
+    python ingest_dump.py DUMP [--humans | --qids FILE] [--ref-depth N] [--processes N]
+
+The dump is streamed line by line, and the QID sets (the people, what is stored,
+what is referenced, what the current pass wants) are kept in a temporary SQLite
+file rather than in memory, so neither the dump nor the selection has to fit:
+
+1. pass 1 picks the selected people (a QID list, or every P31=Q5) and stores them
+   in the Wikidata entity cache, collecting the items their claims refer to;
+2. each further pass (--ref-depth, default 2) stores the referenced items
+   (places, occupations, countries, ...) and the items those refer to;
+3. the people are parsed by HumanFromWikidata on a process pool, reading the
+   cache in offline mode, and written by a single writer in batched commits.
+
+Every pass, the referenced-item ones included, scans on the pool: lines are
+decoded there and each batch's ids are looked up in the wanted table, so only
+entities that are needed are json-parsed. The main process only writes the
+cache and the QID tables, one SQLite writer each. Referenced items are not
+parsed on their own; the writer parses a place when a person's
+save_from_wikidata first needs it, because whether it is parsed at all depends
+on what the database already holds.
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import deque
+
+from dataparsers import wikidata_api
+from dataparsers.HumanFromWikidata import HumanFromWikidata
+from entities.Human import Human
+from utils.ingest_session import IngestSession
+
+
+OUTPUT_CSV = "ingest_dump_report.csv"
+DB_PATH = "birdview.db"
+
+LINES_PER_BATCH = 2000    # dump lines handed to a worker at a time
+BATCHES_IN_FLIGHT = 2     # per worker; caps how much of the dump is in memory
+PARSE_BATCH_SIZE = 50     # people per parse task
+COMMIT_EVERY = 200        # people per write transaction
+
+# item-valued properties whose targets the parsers look up (people, then places)
+REF_PROPS = (
+    "P21", "P27", "P19", "P20", "P551", "P937", "P69", "P119", "P106", "P135",
+    "P31", "P17", "P131", "P361", "P36", "P749", "P276",
+)
+
+_ENTITY_ID = re.compile(r'"id"\s*:\s*"(Q\d+)"')
+_ITEM_TYPE = re.compile(r'"type"\s*:\s*"item"')
+HEAD_CHARS = 200  # type and id come first on a dump line
+_LANGUAGES = set(wikidata_api.WIKIDATA_LANGUAGES.split("|"))
+
+# QID sets of an ingest, as numeric ids in a temporary database
+QID_TABLES = ("people", "stored", "refs", "wanted")
+SQLITE_MAX_VARS = 900
+
+# set per worker by _init_worker
+_wanted = None  # read-only connection to the QID tables, when a pass filters by QID
+_select_humans = False
+
+
+def log_results(w, qid, name, message):
+    w.writerow([qid, name, message])
+    print(f"🎨 {name} ({qid}) result: {message}")
+
+
+def open_dump(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def dump_batches(path, size=LINES_PER_BATCH):
+    """Lists of raw entity lines; the dump's enclosing [ ] and trailing commas are dropped."""
+    batch = []
+    with open_dump(path) as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            batch.append(line)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _claim_ids(claims, pid):
+    for statement in claims.get(pid) or []:
+        value = ((statement.get("mainsnak") or {}).get("datavalue") or {}).get("value")
+        if isinstance(value, dict) and value.get("id"):
+            yield value["id"]
+
+
+def _is_human(claims):
+    return "Q5" in _claim_ids(claims, "P31")
+
+
+def _trim_labels(labels):
+    """Labels in our languages; an entity with none of them keeps its first label,
+    which is what the parsers fall back to for a name."""
+    kept = {k: v for k, v in labels.items() if k in _LANGUAGES}
+    if not kept and labels:
+        first = next(iter(labels))
+        kept[first] = labels[first]
+    return kept
+
+
+def _trim(entity):
+    """What the parsers read: labels and descriptions in our languages, claims, lastrevid."""
+    return {
+        "id": entity.get("id"),
+        "type": entity.get("type"),
+        "lastrevid": entity.get("lastrevid"),
+        "labels": _trim_labels(entity.get("labels") or {}),
+        "descriptions": {k: v for k, v in (entity.get("descriptions") or {}).items() if k in _LANGUAGES},
+        "claims": entity.get("claims") or {},
+    }
+
+
+def open_qid_tables(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")  # workers read `wanted` while the main process writes
+    for table in QID_TABLES:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (qid INTEGER PRIMARY KEY)")
+    conn.commit()
+    return conn
+
+
+def add_qids(conn, table, qids):
+    rows = ((int(qid[1:]),) for qid in qids if qid[:1] == "Q" and qid[1:].isdigit())
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (qid) VALUES (?)", rows)
+
+
+def count_qids(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def next_wanted(conn):
+    """Moves the references not stored yet into `wanted`; returns how many there are."""
+    conn.execute("DELETE FROM wanted")
+    conn.execute("INSERT INTO wanted SELECT qid FROM refs WHERE qid NOT IN (SELECT qid FROM stored)")
+    conn.execute("DELETE FROM refs")
+    conn.commit()
+    return count_qids(conn, "wanted")
+
+
+def people_batches(conn, size=PARSE_BATCH_SIZE):
+    cursor = conn.execute("SELECT qid FROM people ORDER BY qid")
+    while rows := cursor.fetchmany(size):
+        yield [f"Q{qid}" for qid, in rows]
+
+
+def _wanted_among(qids):
+    wanted = set()
+    for i in range(0, len(qids), SQLITE_MAX_VARS):
+        chunk = [int(qid[1:]) for qid in qids[i:i + SQLITE_MAX_VARS]]
+        placeholders = ",".join("?" * len(chunk))
+        rows = _wanted.execute(f"SELECT qid FROM wanted WHERE qid IN ({placeholders})", chunk)
+        wanted.update(f"Q{qid}" for qid, in rows)
+    return wanted
+
+
+def _init_worker(qid_db, select_humans):
+    global _wanted, _select_humans
+    _wanted = sqlite3.connect(f"file:{qid_db}?mode=ro", uri=True) if qid_db else None
+    _select_humans = select_humans
+    # forked from a process that may already hold a cache connection
+    wikidata_api.reset_process_state()
+    wikidata_api.set_offline(True)
+
+
+def _scan_batch(lines):
+    """[(qid, trimmed entity, referenced qids)] for the wanted entities among `lines`."""
+    candidates = []
+    for line in lines:
+        head = line[:HEAD_CHARS]
+        match = _ENTITY_ID.search(head)
+        if not match or not _ITEM_TYPE.search(head):
+            continue
+        if _select_humans and _wanted is None and '"Q5"' not in line:
+            continue
+        candidates.append((match.group(1), line))
+
+    if _wanted is not None:
+        wanted = _wanted_among([qid for qid, _ in candidates])
+        candidates = [(qid, line) for qid, line in candidates if qid in wanted]
+
+    found = []
+    for qid, line in candidates:
+        entity = json.loads(line)
+        claims = entity.get("claims") or {}
+        if _select_humans and _wanted is None and not _is_human(claims):
+            continue
+
+        refs = {ref for pid in REF_PROPS for ref in _claim_ids(claims, pid)}
+        found.append((qid, _trim(entity), refs))
+    return found
+
+
+def _parse_batch(qids):
+    parsed = []
+    for qid in qids:
+        try:
+            parsed.append((qid, HumanFromWikidata(qid), None))
+        except Exception as e:
+            parsed.append((qid, None, str(e)))
+    return parsed
+
+
+def bounded_map(pool, func, items, window):
+    """pool.imap without reading ahead of `window` pending tasks."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def scan_dump(path, qid_db, select_humans, processes, people=False):
+    """
+    Stores the entities in the `wanted` table of `qid_db` (or, with select_humans,
+    every person) in the cache and adds them to `stored`, and to `people` when
+    asked; what they refer to goes to `refs`. Returns how many were stored.
+    """
+    cache = wikidata_api.get_cache()
+    conn = open_qid_tables(qid_db)
+    stored = 0
+    started = time.perf_counter()
+
+    initargs = (None if select_humans else qid_db, select_humans)
+    try:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for found in bounded_map(pool, _scan_batch, dump_batches(path), processes * BATCHES_IN_FLIGHT):
+                cache.put_many((qid, entity) for qid, entity, _ in found)
+                qids = [qid for qid, _, _ in found]
+                add_qids(conn, "stored", qids)
+                if people:
+                    add_qids(conn, "people", qids)
+                add_qids(conn, "refs", (ref for _, _, entity_refs in found for ref in entity_refs))
+                conn.commit()
+                stored += len(found)
+        refs = count_qids(conn, "refs")
+    finally:
+        conn.close()
+
+    print(f"✅ stored {stored} entities in {time.perf_counter() - started:.1f}s, {refs} referenced")
+    return stored
+
+
+def read_qids(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            for m in re.finditer(r"Q\d+", line):
+                yield m.group(0)
+
+
+def ingest_dump(path, qids=None, ref_depth=2, processes=None, commit_every=COMMIT_EVERY):
+    """Ingests the people in `qids` (any iterable of QIDs), or every person when None."""
+    if wikidata_api.get_cache() is None:
+        raise RuntimeError("ingest_dump needs the entity cache (WIKIDATA_CACHE_PATH)")
+    processes = processes or multiprocessing.cpu_count()
+
+    work_dir = tempfile.mkdtemp(prefix="ingest_dump_")
+    qid_db = os.path.join(work_dir, "qids.db")
+    conn = open_qid_tables(qid_db)
+    try:
+        if qids is not None:
+            add_qids(conn, "wanted", qids)
+            conn.commit()
+
+        # pass 1: the people themselves
+        scan_dump(path, qid_db, qids is None, processes, people=True)
+
+        # further passes: what they (and their places) refer to
+        for _ in range(ref_depth):
+            if not next_wanted(conn):
+                break
+            scan_dump(path, qid_db, False, processes)
+
+        return write_people(conn, processes, commit_every)
+    finally:
+        conn.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def write_people(conn, processes, commit_every=COMMIT_EVERY):
+    """Parses the people of the `people` table from the cache and writes them."""
+    wikidata_api.set_offline(True)
+
+    session = IngestSession(DB_PATH, commit_every=commit_every)
+    cursor = session.cursor
+
+    counts = {"added": 0, "existing": 0, "skipped": 0, "error": 0}
+    started = time.perf_counter()
+
+    with session, open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["qid", "name", "Result"])
+
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(None, False)) as pool:
+            for parsed in bounded_map(pool, _parse_batch, people_batches(conn), processes * BATCHES_IN_FLIGHT):
+                existing = Human.get_many("qid", [qid for qid, _, _ in parsed], cursor=cursor, w=writer)
+
+                for qid, human_wiki_entity, error in parsed:
+                    if error:
+                        counts["error"] += 1
+                        log_results(writer, qid, "", f"❌ parse failed: {error}")
+                        continue
+                    if qid in existing:
+                        counts["existing"] += 1
+                        log_results(writer, qid, existing[qid].name, "Already exists")
+                        continue
+
+                    # a failing person is rolled back alone, not with the rest of the batch
+                    try:
+                        with session.row():
+                            human = Human(cursor=cursor, w=writer)
+                            human.save_from_wikidata(qid, human_wiki_entity=human_wiki_entity)
+                    except Exception as e:
+                        counts["error"] += 1
+                        log_results(writer, qid, human_wiki_entity.name, f"❌ write failed: {e}")
+                        continue
+
+                    if human.id is None:
+                        counts["skipped"] += 1
+                        log_results(writer, qid, human_wiki_entity.name, "Not a human")
+                        continue
+
+                    counts["added"] += 1
+                    log_results(writer, qid, human.name, "Added successfully")
+
+    print(f"✅ dump ingest finished in {time.perf_counter() - started:.1f}s: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest people from a Wikidata JSON dump.")
+    parser.add_argument("dump", help="latest-all.json.bz2 / .gz, or a filtered subset")
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument("--humans", action="store_true", help="every entity with P31=Q5")
+    selection.add_argument("--qids", help="file with the QIDs to ingest (any text; Q-ids are picked out)")
+    parser.add_argument("--ref-depth", type=int, default=2, help="dump passes for referenced items")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    qids = read_qids(args.qids) if args.qids else None
+    ingest_dump(args.dump, qids=qids, ref_depth=args.ref_depth, processes=args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
+from fastapi import Body
+from fastapi import Depends
 from fastapi import FastAPI
 from fastapi import HTTPException
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
+import datetime
 import sqlite3
 from collections import Counter
 
 import json
 
+import numpy as np
+
 from dataparsers.LocationFromWikidata import LocationFromWikidata
 from dataparsers.HumanFromWikidata import HumanFromWikidata
 from dataparsers.WorkFromWikidata import WorkFromWikidata
@@ -18,9 +24,35 @@ from entities.MilitaryEvent import MilitaryEvent
 from entities.Location import Location
 from entities.Work import Work
 
+from utils.db_version import VersionedSnapshot
+from utils.db_version import db_release
+from utils.db_version import db_version
+from utils.db_pool import PoolTimeout
+from utils.db_pool import SQLitePool
+from utils.db_schema import ensure_schema
+from utils.event_hierarchy import has_event_hierarchy
+from utils.event_hierarchy import subtree_sql
+from utils.facets import FacetIndex
+from utils.histogram import build_alive_histogram
+from utils.http_client import get_client as get_http_client
+from utils.human_snapshot import FILTER_KEYS as HUMAN_FILTER_KEYS
+from utils.human_snapshot import HumanSnapshot
+from utils.lru_cache import LRUCache
+from utils.person_details import fetch_person_detail
+from utils.person_details import fetch_person_details
+from utils.search import has_search_index
+from utils.search import search_all
+from utils.spatial_index import Area
+from utils.spatial_index import DEFAULT_RADIUS_KM
+from utils.spatial_index import has_spatial_index
+from utils.tiles import MilitaryEventPoints
+from utils.tiles import PointTileIndex
+from utils.tiles import tile_etag
+from utils.tiles import valid_tile
+
 
 import os
-import re
+import threading
 
 app = FastAPI()
 
@@ -35,110 +67,214 @@ app.add_middleware(
 
 DB_PATH = os.getenv("DB_PATH", "birdview.db")
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", str(-64 * 1024)))  # negative = KiB
 
-@app.get("/humans")
-def get_humans(request: Request):
-    qp = request.query_params
+# one pool per worker process; uvicorn workers never share it
+_pool = None
+_pool_release = None
+_pool_lock = threading.Lock()
 
-    human_id = qp.get("human_id")
-    occupation_id = qp.get("occupation_id")
-    movement_id = qp.get("movement_id")
-    gender_id = qp.get("gender_id")
-    nationality_id = qp.get("nationality_id")
-    collection_id = qp.get("collection_id")
-    location_id = qp.get("location_id")
-    relationship_type_id = qp.get("relationship_type_id")  # optional
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
 
-    base_query = """
-        SELECT 
-            h.id, h.name, h.birth_date, h.death_date,
-            n.name AS nationality, g.name AS gender,
-            l.lat AS lat, l.lon AS lon, l.name AS city, l.id AS city_id,
-            h.num_of_identifiers, h.qid, h.img_url,
-            EXISTS (
-                SELECT 1
-                FROM works w
-                WHERE w.creator_id = h.id
-                AND w.type_id = 19
-            ) AS awarded
-        FROM humans h
-        INNER JOIN human_location hl ON hl.human_id = h.id
-        INNER JOIN locations l ON hl.location_id = l.id
-        INNER JOIN genders g ON g.id = h.gender_id
-        INNER JOIN nationalities n ON n.id = h.nationality_id
-        WHERE 
-            h.birth_date IS NOT NULL
-            AND h.birth_date != 0
-            AND hl.relationship_type_id = 4
+def get_pool() -> SQLitePool:
+    """
+    The worker's pool, reopened when scripts/fetch_db.py swaps in a new DB file:
+    pooled connections would otherwise keep reading the old, unlinked one.
     """
+    global _pool, _pool_release
+    release = db_release(DB_PATH)
+    if _pool is None or release != _pool_release:
+        with _pool_lock:
+            if _pool is None or release != _pool_release:
+                old_pool = _pool
+                _pool = SQLitePool(
+                    DB_PATH,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    mmap_size=DB_MMAP_SIZE,
+                    cache_size=DB_CACHE_SIZE,
+                )
+                _pool_release = release
+                if old_pool is not None:
+                    old_pool.close()
+    return _pool
+
+
+def get_db():
+    """Read-only connection checked out of the worker pool for one request."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def get_write_db():
+    """Writable connection for the update endpoints; committed on success, always closed."""
+    # waits for an ingest script's transaction instead of failing with "database is locked"
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
-    params = []
 
-    if location_id:
-        base_query += """
-            AND h.id IN (
-                SELECT human_id FROM human_location AS filtered_hl WHERE filtered_hl.location_id = ?
-        """
-        params.append(location_id)
+HUMAN_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("HUMAN_SNAPSHOT_REFRESH_SECONDS", "60"))
 
-        if relationship_type_id:
-            base_query += " AND filtered_hl.relationship_type_id = ?"
-            params.append(relationship_type_id)
+human_snapshot = VersionedSnapshot(
+    DB_PATH,
+    lambda conn, version: HumanSnapshot.build(conn, version),
+    refresh_seconds=HUMAN_SNAPSHOT_REFRESH_SECONDS,
+)
 
-        base_query += """
-            )
-        """
-    if movement_id:
-        base_query += """
-            AND h.id IN (
-                SELECT human_id FROM human_movement WHERE movement_id = ?
-            )
-        """
-        params.append(movement_id)
+facet_index = VersionedSnapshot(
+    DB_PATH,
+    lambda conn, version: FacetIndex.build(conn, version),
+    refresh_seconds=HUMAN_SNAPSHOT_REFRESH_SECONDS,
+)
 
-    if collection_id:
-        base_query += """
-            AND h.id IN (
-                SELECT human_id FROM human_collection WHERE collection_id = ?
-            )
-        """
-        params.append(collection_id)
+military_event_points = VersionedSnapshot(
+    DB_PATH,
+    lambda conn, version: MilitaryEventPoints.build(conn, version),
+    refresh_seconds=HUMAN_SNAPSHOT_REFRESH_SECONDS,
+)
 
-    if occupation_id:
-        base_query += """
-            AND h.id IN (
-                SELECT human_id FROM human_occupation WHERE is_primary=1 AND occupation_id = ?
-            )
-        """
-        params.append(occupation_id)
 
-    if gender_id:
-        base_query += " AND h.gender_id = ?"
-        params.append(gender_id)
+@app.on_event("startup")
+def prepare_db():
+    try:
+        ensure_schema(DB_PATH)
+    except sqlite3.Error as e:
+        # a read-only deployment can still serve, just without the extra indexes
+        print(f"❌ schema setup skipped for {DB_PATH}: {e}")
 
-    if nationality_id:
-        base_query += " AND h.nationality_id = ?"
-        params.append(nationality_id)
+    human_snapshot.get()
+    facet_index.get()
 
-    if human_id:
-        base_query += " AND h.id = ?"
-        params.append(human_id)
 
-    base_query += """
-        ORDER BY city_id, h.birth_date  ASC"""
+@app.on_event("shutdown")
+def close_pool():
+    if _pool is not None:
+        _pool.close()
 
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
 
-    humans = [dict(row) for row in results]
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse({"error": str(exc)}, status_code=503)
+
+
+@app.get("/metrics/db")
+def get_db_metrics():
+    return get_pool().metrics()
+
+
+@app.get("/metrics/http")
+def get_http_metrics():
+    return get_http_client().metrics()
+
+
+def parse_year_window(qp):
+    """
+    Reads `year` or a `year_from`/`year_to` window from the query string.
+    Either bound may be omitted for an open-ended window; (None, None) means no filter.
+    """
+    values = {}
+    for key in ("year", "year_from", "year_to"):
+        raw = qp.get(key)
+        if raw is None or raw.strip() == "":
+            values[key] = None
+            continue
+        try:
+            values[key] = int(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+
+    if values["year"] is not None:
+        return values["year"], values["year"]
+
+    year_from, year_to = values["year_from"], values["year_to"]
+    if year_from is not None and year_to is not None and year_from > year_to:
+        year_from, year_to = year_to, year_from
+    return year_from, year_to
+
+
+def parse_human_filters(qp) -> dict:
+    """Integer filter ids from the /humans query string; empty values are ignored."""
+    filters = {}
+    for key in HUMAN_FILTER_KEYS:
+        raw = qp.get(key)
+        if raw is None or raw.strip() == "":
+            continue
+        try:
+            filters[key] = int(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+    return filters
+
+
+def parse_coordinates(qp, key, count) -> list[float]:
+    try:
+        values = [float(v) for v in qp.get(key).split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise HTTPException(status_code=400, detail=f"{key} must be {count} comma-separated numbers")
+    return values
+
+
+def parse_area(qp):
+    """
+    Reads `bbox=west,south,east,north` or `near=lat,lon` with a `radius` in km
+    from the query string; None means no spatial filter.
+    """
+    bbox = qp.get("bbox") or None
+    near = qp.get("near") or None
+    if bbox and near:
+        raise HTTPException(status_code=400, detail="use either bbox or near, not both")
+
+    try:
+        if bbox:
+            return Area.bbox(*parse_coordinates(qp, "bbox", 4))
+        if near:
+            radius = qp.get("radius") or DEFAULT_RADIUS_KM
+            try:
+                radius = float(radius)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="radius must be a number")
+            return Area.near(*parse_coordinates(qp, "near", 2), radius)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return None
+
+
+def location_ids_in(area) -> np.ndarray:
+    """ids of the locations inside `area`, candidates read from the R*Tree."""
+    with get_pool().connection() as conn:
+        condition, params = area.sql("id", "lat", "lon", "locations_rtree", indexed=has_spatial_index(conn))
+        rows = conn.execute(f"SELECT id FROM locations WHERE {condition}", params).fetchall()
+    return np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+
+
+@app.get("/humans")
+def get_humans(request: Request):
+    qp = request.query_params
+    year_from, year_to = parse_year_window(qp)
+    filters = parse_human_filters(qp)
+    area = parse_area(qp)
+
+    # born inside the area: the birth places come from the locations R*Tree
+    city_ids = location_ids_in(area) if area is not None else None
+
+    snapshot = human_snapshot.get()
+    humans = snapshot.rows(snapshot.filter(filters, year_from, year_to, city_ids))
+
     city_counter = Counter()
     for h in humans:
         h["entity_type"] = "human"
-        h["awarded"] = bool(h["awarded"])
         if h["city"] and h["birth_date"]:
             key = f"{h['city']}_{h['birth_date']}"
             city_counter[key] += 1
@@ -146,8 +282,137 @@ def get_humans(request: Request):
 
     return JSONResponse({"humans": humans})
 
+
+histogram_cache = LRUCache(maxsize=256)
+
+
+@app.get("/humans/histogram")
+def get_humans_histogram(request: Request):
+    """
+    Year -> alive-count histogram for the same filters as /humans.
+    `counts[i]` is the number of people alive in `range[0] + i`; year_from/year_to
+    narrow the returned range instead of filtering people out.
+    """
+    qp = request.query_params
+    year_from, year_to = parse_year_window(qp)
+    filters = parse_human_filters(qp)
+
+    snapshot = human_snapshot.get()
+    cache_key = (snapshot.version, tuple(sorted(filters.items())))
+
+    histogram = histogram_cache.get(cache_key)
+    if histogram is None:
+        indexes = snapshot.filter(filters)
+        histogram = build_alive_histogram(
+            snapshot.birth[indexes],
+            snapshot.death[indexes],
+            current_year=datetime.date.today().year,
+        )
+        histogram_cache.put(cache_key, histogram)
+
+    start, end = histogram["range"]
+    if year_from is None and year_to is None:
+        return JSONResponse(histogram)
+
+    lo = start if year_from is None else max(start, year_from)
+    hi = end if year_to is None else min(end, year_to)
+    counts = histogram["counts"][lo - start : hi - start + 1] if lo <= hi else []
+    return JSONResponse({"range": [lo, hi], "counts": counts})
+
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "4096"))
+TILE_CACHE_CONTROL = "public, max-age=60"
+
+tile_cache = LRUCache(maxsize=TILE_CACHE_SIZE)  # etag -> encoded tile
+tile_masks = LRUCache(maxsize=64)               # (layer, version, filters, window) -> row mask
+human_tile_indexes = LRUCache(maxsize=2)        # snapshot version -> PointTileIndex
+
+
+def human_tile_layer(snapshot, filters, year_from, year_to):
+    index = human_tile_indexes.get(snapshot.version)
+    if index is None:
+        index = PointTileIndex(snapshot.lat, snapshot.lon)
+        human_tile_indexes.put(snapshot.version, index)
+
+    # the dozen tiles of one viewport share the same filters: mask once
+    mask_key = ("humans", snapshot.version, tuple(sorted(filters.items())), year_from, year_to)
+    mask = tile_masks.get(mask_key)
+    if mask is None:
+        mask = np.zeros(snapshot.size, dtype=bool)
+        mask[snapshot.filter(filters, year_from, year_to)] = True
+        tile_masks.put(mask_key, mask)
+
+    def label(row):
+        return {"id": int(snapshot.id[row]), "name": snapshot.text["name"][row], "city": snapshot.text["city"][row]}
+
+    return index, mask, label
+
+
+def military_event_tile_layer(points, year_from, year_to):
+    mask_key = ("militaryevents", points.version, year_from, year_to)
+    mask = tile_masks.get(mask_key)
+    if mask is None:
+        mask = points.active_mask(year_from, year_to)
+        tile_masks.put(mask_key, mask)
+    return points.index, mask, points.label
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+@app.get("/tiles/{layer}/{z}/{x}/{y}")
+def get_tile(layer: str, z: int, x: int, y: int, request: Request):
+    """
+    Points of one map layer inside XYZ tile z/x/y, clustered into a 32x32 grid
+    per tile, for the year window (`year` or `year_from`/`year_to`) and, for
+    humans, the /humans filters. Tiles carry an ETag and are cached per worker.
+    """
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail=f"no tile {z}/{x}/{y}")
+
+    qp = request.query_params
+    year_from, year_to = parse_year_window(qp)
+
+    if layer == "humans":
+        filters = parse_human_filters(qp)
+        snapshot = human_snapshot.get()
+        version = snapshot.version
+    elif layer == "militaryevents":
+        filters = {}
+        points = military_event_points.get()
+        version = points.version
+    else:
+        raise HTTPException(status_code=404, detail=f"unknown tile layer {layer}")
+
+    etag = tile_etag(layer, version, z, x, y, year_from, year_to, sorted(filters.items()))
+    headers = {"ETag": etag, "Cache-Control": TILE_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = tile_cache.get(etag)
+    if body is None:
+        if layer == "humans":
+            index, mask, label = human_tile_layer(snapshot, filters, year_from, year_to)
+        else:
+            index, mask, label = military_event_tile_layer(points, year_from, year_to)
+
+        clusters = index.clusters(z, x, y, mask=mask, label=label)
+        body = json.dumps({
+            "layer": layer,
+            "z": z, "x": x, "y": y,
+            "count": sum(c["count"] for c in clusters),
+            "clusters": clusters,
+        }).encode("utf-8")
+        tile_cache.put(etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @app.get("/allworks")
-def get_allworks(request: Request):
+def get_allworks(request: Request, conn: sqlite3.Connection = Depends(get_db)):
     qp = request.query_params
 
     human_id = qp.get("human_id")
@@ -155,8 +420,6 @@ def get_allworks(request: Request):
     if not human_id:
         return JSONResponse({"works": []})
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     base_query ="""
@@ -175,7 +438,6 @@ def get_allworks(request: Request):
         ORDER BY w.created_date ASC"""
     
     results = cur.execute(base_query, params).fetchall()
-    conn.close()
 
     works = [dict(row) for row in results]
 
@@ -184,9 +446,7 @@ def get_allworks(request: Request):
 
 
 @app.get("/works/{creator_id}")
-def get_works(creator_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_works(creator_id: int, conn: sqlite3.Connection = Depends(get_db)):
     cur = conn.cursor()
 
     cur.execute(
@@ -201,188 +461,68 @@ def get_works(creator_id: int):
     )
 
     results = [dict(row) for row in cur.fetchall()]
-    conn.close()
     return results
 
 
-@app.get("/person/{human_id}")
-def get_person_details(human_id: int):
-    print("get_person_details")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT h.description, h.img_url, h.signature_url, g.name AS gender, n.name AS nationality 
-        FROM humans AS h
-        INNER JOIN genders g ON g.id = h.gender_id
-        INNER JOIN nationalities n ON n.id = h.nationality_id
-        WHERE h.id = ?
-    """,
-        (human_id,),
-    )
-    row = cur.fetchone()
-    if not row:
-        return {"error": "person not found"}
-
-    description, img_url, signature_url, gender, nationality = row
-
-    cur.execute(
-        """
-        SELECT l.id, l.name, hlt.name AS relationship_type_name, hl.start_date, hl.end_date, l.lat AS loc_lat, l.lon AS loc_lon, l.qid
-        FROM human_location AS hl
-        JOIN locations AS l ON l.id = hl.location_id
-        JOIN human_location_types AS hlt ON hlt.id = hl.relationship_type_id
-        WHERE hl.human_id = ?
-        ORDER BY COALESCE(hl.start_date, hl.end_date) ASC;
-    """,
-        (human_id,),
-    )
-
-    locs = [dict(row) for row in cur.fetchall()]
-
-
-    cur.execute(
-        """
-        SELECT h.id, h.name, h.num_of_identifiers, h.qid AS qid, h.birth_date, h.death_date, 
-        hrt.name AS relationship_type_name, 
-        rc.name AS relationship_category_name,
-        hh.start_date, hh.end_date, 
-        l.lat AS lat, l.lon AS lon
-        FROM human_human AS hh
-        JOIN humans AS h ON h.id = hh.related_human_id
-        JOIN human_relationship_types AS hrt ON hrt.id = hh.relationship_type_id
-        INNER JOIN relationship_categories rc ON rc.id = hrt.category_id
-        LEFT JOIN human_location hl ON hl.human_id = hh.related_human_id
-        INNER JOIN locations l ON hl.location_id = l.id
-       
-        WHERE 
-            hh.human_id = ?
-            AND hl.relationship_type_id = 4
-        ORDER BY COALESCE(hh.start_date, h.birth_date) ASC;
-    """,
-        (human_id,),
-    )
-    results = cur.fetchall()
-    allowed_categories = {"professional", "intellectual", "social", "political"}
-
-    
-    professional = [dict(row) for row in results if row["relationship_category_name"] in allowed_categories] 
-    intellectual = [dict(row) for row in results if row["relationship_category_name"] == "intellectual"]
-    social = [dict(row) for row in results if row["relationship_category_name"] == "social"]
-    political = [dict(row) for row in results if row["relationship_category_name"] == "political"]
-    family = [dict(row) for row in results if row["relationship_category_name"] == "family"]
-    
-    index = 0
-    for h in family:
-        h["entity_type"] = "human"
-        index += 1
-        h["index"] = index
-    
-    index = 0
-    for h in professional:
-        h["entity_type"] = "human"
-        index += 1
-        h["index"] = index
-
-    index = 0
-    for h in intellectual:
-        h["entity_type"] = "human"
-        index += 1
-        h["index"] = index
-
-    index = 0
-    for h in political:
-        h["entity_type"] = "human"
-        index += 1
-        h["index"] = index
-
-    index = 0
-    for h in social:
-        h["entity_type"] = "human"
-        index += 1
-        h["index"] = index
-            
-            
-
-    cur.execute(
-        """
-        SELECT o.name AS name
-        FROM human_occupation AS ho
-        JOIN occupations AS o ON o.id = ho.occupation_id
-        WHERE ho.human_id = ?
-    """,
-        (human_id,),
-    )
-
-    occs = [row["name"] for row in cur.fetchall()]
+PERSON_CACHE_SIZE = int(os.getenv("PERSON_CACHE_SIZE", "1024"))
 
-    cur.execute(
-        """
-        SELECT m.name AS name
-        FROM human_movement AS hm
-        JOIN movements AS m ON m.id = hm.movement_id
-        WHERE hm.human_id = ?
-    """,
-        (human_id,),
-    )
+# rendered /person payloads: human_id -> (db version, payload)
+person_cache = LRUCache(maxsize=PERSON_CACHE_SIZE)
 
-    movs = [row["name"] for row in cur.fetchall()]
 
-    cur.execute(
-        """
-        SELECT cl.name AS name
-        FROM human_collection AS hcl
-        JOIN collections AS cl ON cl.id = hcl.collection_id
-        WHERE hcl.human_id = ?
-    """,
-        (human_id,),
-    )
+@app.get("/person/{human_id}")
+def get_person_details(human_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    version = db_version(DB_PATH)
+    if PERSON_CACHE_SIZE > 0:
+        cached = person_cache.get(human_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    details = fetch_person_detail(conn, human_id)
+    if details is None:
+        return {"error": "person not found"}
 
-    colls = [row["name"] for row in cur.fetchall()]
+    if PERSON_CACHE_SIZE > 0:
+        person_cache.put(human_id, (version, details))
+    return details
 
 
-    cur.execute(
-        """
-        SELECT s.name AS name
-        FROM citizenships AS c
-        JOIN states AS s ON s.id = c.state_id
-        WHERE c.human_id = ?
-    """,
-        (human_id,),
-    )
+PERSONS_MAX_IDS = 500
 
-    citizs = [row["name"] for row in cur.fetchall()]
 
-    conn.close()
+@app.post("/persons")
+def get_persons_details(ids: list[int] = Body(..., embed=True), conn: sqlite3.Connection = Depends(get_db)):
+    """
+    /person payloads for many people at once: {"persons": {id: payload}, "not_found": [ids]}.
+    Cached payloads are reused; the rest come from one set-based query.
+    """
+    if len(ids) > PERSONS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {PERSONS_MAX_IDS} ids per request")
+
+    version = db_version(DB_PATH)
+    persons = {}
+    missing = []
+    for human_id in dict.fromkeys(ids):
+        cached = person_cache.get(human_id) if PERSON_CACHE_SIZE > 0 else None
+        if cached is not None and cached[0] == version:
+            persons[human_id] = cached[1]
+        else:
+            missing.append(human_id)
+
+    fetched = fetch_person_details(conn, missing)
+    for human_id, details in fetched.items():
+        persons[human_id] = details
+        if PERSON_CACHE_SIZE > 0:
+            person_cache.put(human_id, (version, details))
 
     return {
-        "description": description,
-        "gender": gender,
-        "nationality": nationality,
-        "img_url": img_url,
-        "signature_url": signature_url,
-        "locations": locs,
-        "occupations": occs,
-        "movements": movs,
-        "collections": colls,
-        "citizenships": citizs,
-        
-        "family": family,
-        "professional": professional,
-        "intellectual": intellectual,
-        "social": social,
-        "political": political
-
-
+        "persons": {human_id: persons[human_id] for human_id in dict.fromkeys(ids) if human_id in persons},
+        "not_found": [human_id for human_id in missing if human_id not in fetched],
     }
 
 
 @app.get("/location/{location_id}")
-def get_location_details(location_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_location_details(location_id: int, conn: sqlite3.Connection = Depends(get_db)):
     cur = conn.cursor()
 
     cur.execute(
@@ -394,7 +534,6 @@ def get_location_details(location_id: int):
         return {"error": "location not found"}
     qid, description, img_url, logo_url, inception, country_label = row
 
-    conn.close()
 
     return JSONResponse(
         {
@@ -410,9 +549,7 @@ def get_location_details(location_id: int):
     )
 
 @app.get("/movement/{movement_id}")
-def get_movement_details(movement_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_movement_details(movement_id: int, conn: sqlite3.Connection = Depends(get_db)):
     cur = conn.cursor()
 
     cur.execute(
@@ -424,7 +561,6 @@ def get_movement_details(movement_id: int):
         return {"error": "movement not found"}
     qid, description, image_url, inception, instance_label = row
 
-    conn.close()
 
     return JSONResponse(
         {
@@ -439,400 +575,103 @@ def get_movement_details(movement_id: int):
     )
 
 
-@app.get("/movements")
-def get_movements(request: Request):
-    qp = request.query_params
-
-    occupation_id = qp.get("occupation_id")
-    gender_id = qp.get("gender_id")
-    nationality_id = qp.get("nationality_id")
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    base_query = """
-        SELECT 
-           m.id, 
-           m.name, 
-           COUNT(hm.human_id) AS count, 
-           COALESCE(m.inception, m.start_date) AS start_date,
-           m.end_date,
-           m.instance_label
-        FROM human_movement hm
-        INNER JOIN movements m ON hm.movement_id = m.id
-    """
-
-    params = []
-    conditions = []
+FACET_FILTER_KEYS = ("movement_id", "occupation_id", "gender_id", "nationality_id", "collection_id")
 
-    if occupation_id:
-        conditions.append("""
-            hm.human_id IN (
-                SELECT human_id FROM human_occupation WHERE occupation_id = ? AND is_primary = 1
-            )
-        """)
-        params.append(occupation_id)
-
-    if gender_id:
-        conditions.append("""
-            hm.human_id IN (
-                SELECT id FROM humans WHERE gender_id = ?
-            )
-        """)
-        params.append(gender_id)
-
-    if nationality_id:
-        conditions.append("""
-            hm.human_id IN (
-                SELECT id FROM humans WHERE nationality_id = ?
-            )
-        """)
-        params.append(nationality_id)
 
-    if conditions:
-        base_query += f" WHERE {' AND '.join(conditions)}"
+def parse_facet_filters(qp) -> dict:
+    filters = {}
+    for key in FACET_FILTER_KEYS:
+        raw = qp.get(key)
+        if raw is None or raw.strip() == "":
+            continue
+        try:
+            filters[key] = int(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+    return filters
 
-    base_query += """
-        GROUP BY m.id,
-                m.name,
-                m.start_date,
-                m.inception,
-                m.end_date
-        ORDER BY m.start_date, count DESC
-        LIMIT 1000;
-    """
 
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
+@app.get("/facets")
+def get_facets(request: Request):
+    """Every filter-panel facet in one round trip, each narrowed like its own endpoint."""
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse(facet_index.get().all_facets(filters))
 
-    movements = [dict(row) for row in results]
 
-    return JSONResponse({"movements": movements})
+@app.get("/movements")
+def get_movements(request: Request):
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse({"movements": facet_index.get().facet("movements", filters)})
 
 
 @app.get("/occupations")
 def get_occupations(request: Request):
-    qp = request.query_params
-
-    movement_id = qp.get("movement_id")
-    gender_id = qp.get("gender_id")
-    nationality_id = qp.get("nationality_id")
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    base_query = """
-        SELECT 
-           o.id, o.name, COUNT(ho.human_id) AS count
-        FROM human_occupation ho
-        INNER JOIN occupations o ON ho.occupation_id = o.id AND ho.is_primary = 1
-        
-    """
-    params = []
-    conditions = []
-
-    if movement_id:
-        conditions.append("""
-            ho.human_id IN (
-                SELECT human_id FROM human_movement WHERE movement_id = ?
-            )
-        """)
-        params.append(movement_id)
-
-    if gender_id:
-        conditions.append("""
-            ho.human_id IN (
-                SELECT id FROM humans WHERE gender_id = ?
-            )
-        """)
-        params.append(gender_id)
-
-    if nationality_id:
-        conditions.append("""
-            ho.human_id IN (
-                SELECT id FROM humans WHERE nationality_id = ?
-            )
-        """)
-        params.append(nationality_id)
-
-    if conditions:
-        base_query += f" WHERE {' AND '.join(conditions)}"
-
-    base_query += """
-        GROUP BY ho.occupation_id
-        ORDER BY count DESC
-        
-    """
-
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
-
-    occupations = [dict(row) for row in results]
-
-    return JSONResponse({"occupations": occupations})
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse({"occupations": facet_index.get().facet("occupations", filters)})
 
 
 @app.get("/genders")
 def get_genders(request: Request):
-    qp = request.query_params
-
-    movement_id = qp.get("movement_id")
-    occupation_id = qp.get("occupation_id")
-    nationality_id = qp.get("nationality_id")
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    base_query = """
-       SELECT 
-           g.id, g.name, COUNT(h.gender_id) AS count
-        FROM genders g
-        INNER JOIN humans h ON h.gender_id = g.id
-       
-        
-    """
-    params = []
-    conditions = []
-
-    if movement_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_movement WHERE movement_id = ?
-            )
-        """)
-        params.append(movement_id)
-
-    if occupation_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_occupation WHERE occupation_id = ? AND is_primary = 1
-            )
-        """)
-        params.append(occupation_id)
-
-    if nationality_id:
-        conditions.append("""
-            h.id IN (
-                SELECT id FROM humans WHERE nationality_id = ?
-            )
-        """)
-        params.append(nationality_id)
-
-    if conditions:
-        base_query += f" WHERE {' AND '.join(conditions)}"
-
-    base_query += """
-        GROUP BY h.gender_id
-        ORDER BY count DESC
-    """
-
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
-
-    genders = [dict(row) for row in results]
-
-    return JSONResponse({"genders": genders})
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse({"genders": facet_index.get().facet("genders", filters)})
 
 
 @app.get("/nationalities")
 def get_nationalities(request: Request):
-    qp = request.query_params
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse({"nationalities": facet_index.get().facet("nationalities", filters)})
 
-    movement_id = qp.get("movement_id")
-    occupation_id = qp.get("occupation_id")
-    gender_id = qp.get("gender_id")
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    base_query = """
-       SELECT 
-           n.id, n.name, COUNT(h.id) AS count
-        FROM nationalities n
-        INNER JOIN humans h ON h.nationality_id = n.id
-        
-    """
-    params = []
-    conditions = []
-
-    if movement_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_movement WHERE movement_id = ?
-            )
-        """)
-        params.append(movement_id)
-
-    if occupation_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_occupation WHERE occupation_id = ? AND is_primary = 1
-            )
-        """)
-        params.append(occupation_id)
-
-    if gender_id:
-        conditions.append("""
-            h.id IN (
-                SELECT id FROM humans WHERE gender_id = ?
-            )
-        """)
-        params.append(gender_id)
-
-    
-
-    if conditions:
-        base_query += f" WHERE {' AND '.join(conditions)}"
-
-    base_query += """
-        GROUP BY n.id
-        ORDER BY count DESC
-    """
-
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
-
-    nationalities = [dict(row) for row in results]
-
-    return JSONResponse({"nationalities": nationalities})
 
 @app.get("/collections")
 def get_collections(request: Request):
-    qp = request.query_params
-
-    movement_id = qp.get("movement_id")
-    occupation_id = qp.get("occupation_id")
-    gender_id = qp.get("gender_id")
-    nationality_id = qp.get("nationality_id")
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    base_query = """
-       SELECT 
-           c.id, c.name, COUNT(hc.human_id) AS count
-        FROM human_collection hc
-        INNER JOIN collections c ON hc.collection_id = c.id
-        
-    """
-    params = []
-    conditions = []
-
-    if movement_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_movement WHERE movement_id = ?
-            )
-        """)
-        params.append(movement_id)
-
-    if occupation_id:
-        conditions.append("""
-            h.id IN (
-                SELECT human_id FROM human_occupation WHERE occupation_id = ? AND is_primary = 1
-            )
-        """)
-        params.append(occupation_id)
-
-    if gender_id:
-        conditions.append("""
-            h.id IN (
-                SELECT id FROM humans WHERE gender_id = ?
-            )
-        """)
-        params.append(gender_id)
-    
-    if nationality_id:
-        conditions.append("""
-            h.id IN (
-                SELECT id FROM humans WHERE nationality_id = ?
-            )
-        """)
-        params.append(nationality_id)
-
-    if conditions:
-        base_query += f" WHERE {' AND '.join(conditions)}"
+    filters = parse_facet_filters(request.query_params)
+    return JSONResponse({"collections": facet_index.get().facet("collections", filters)})
 
-    base_query += """
-        GROUP BY c.id
-        ORDER BY count DESC
-    """
 
-    results = cur.execute(base_query, params).fetchall()
-    conn.close()
+SEARCH_LIMIT = 10
+SEARCH_MAX_LIMIT = 100
 
-    collections = [dict(row) for row in results]
 
-    return JSONResponse({"collections": collections})
+def parse_search_limit(qp, key, default):
+    raw = qp.get(key)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+    return max(0, min(value, SEARCH_MAX_LIMIT))
 
 
 @app.get("/search")
-def search(q: str):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+def search(q: str, request: Request, conn: sqlite3.Connection = Depends(get_db)):
+    qp = request.query_params
+    limit = parse_search_limit(qp, "limit", SEARCH_LIMIT)
+    limits = {
+        "humans": parse_search_limit(qp, "humans_limit", limit),
+        "locations": parse_search_limit(qp, "locations_limit", limit),
+        "events": parse_search_limit(qp, "events_limit", limit),
+    }
+
+    area = parse_area(qp)
 
     results = {"humans": [], "locations": [], "events": []}
 
     if len(q) >= 2:
-        cur.execute(
-            """
-            SELECT id, name, birth_date, death_date, qid FROM humans
-            WHERE name LIKE ?
-            ORDER BY 
-            CASE WHEN name LIKE ? THEN 0 ELSE 1 END,
-            num_of_identifiers DESC,
-            name
-            LIMIT 10
-        """,
-            (f"%{q}%", f"{q}%"),
-        )
-        results["humans"] = [dict(r) for r in cur.fetchall()]
-
-        cur.execute(
-            """
-            SELECT id, name, lat AS loc_lat, lon AS loc_lon, qid FROM locations
-            WHERE name LIKE ?
-            ORDER BY 
-            CASE WHEN name LIKE ? THEN 0 ELSE 1 END,
-            name
-            LIMIT 10
-        """,
-            (f"%{q}%", f"{q}%"),
+        results = search_all(
+            conn, q, limits, use_fts=has_search_index(conn), area=area, use_rtree=has_spatial_index(conn)
         )
 
-        results["locations"] = [dict(r) for r in cur.fetchall()]
-
-        cur.execute(
-            """
-            SELECT * FROM military_events
-            WHERE name LIKE ?
-            ORDER BY 
-            CASE WHEN name LIKE ? THEN 0 ELSE 1 END,
-            name
-            LIMIT 10
-        """,
-            (f"%{q}%", f"{q}%"),
-        )       
-        results["events"] = [dict(r) for r in cur.fetchall()]
-
     return results
 
 
 
 @app.get("/allevents")
-def get_events(request: Request):
+def get_events(request: Request, conn: sqlite3.Connection = Depends(get_db)):
     qp = request.query_params
 
    
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     base_query = """
@@ -847,7 +686,6 @@ def get_events(request: Request):
     
 
     results = cur.execute(base_query).fetchall()
-    conn.close()
 
     events = [dict(row) for row in results]
 
@@ -872,32 +710,13 @@ def get_events(request: Request):
 
     return JSONResponse({"events": events})
 
-def extract_year(val):
-    
-    if not val:
-        return None
-
-    s = str(val).strip()
-
-    # MÖ için işaret
-    sign = -1 if s.startswith('-') else 1
-
-    # 4 rakam arka arkaya olan kısmı bul
-    m = re.search(r"\d{4}", s)
-    if m:
-        year = int(m.group(0))   # "0053" -> 53
-        return sign * year       # MÖ ise -53, değilse 53
-
-    
 
 @app.get("/militaryevents")
-def get_military_events(request: Request):
+def get_military_events(request: Request, conn: sqlite3.Connection = Depends(get_db)):
     qp = request.query_params
 
     military_event_depth_index = qp.get("military_event_depth_index")
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     base_query = """
@@ -909,6 +728,7 @@ def get_military_events(request: Request):
            me.start_time, me.end_time, me.point_in_time, 
            me.lat, me.lon, 
            me.depth_index, me.descendant_count, me.depth_level, me.parent_id, 
+           me.start_year AS start_date, me.end_year AS end_date,
            GROUP_CONCAT(et.name, ' | ') AS event_type
         FROM military_events AS me
         LEFT JOIN event_type_relation AS etr ON me.id = etr.event_id
@@ -916,18 +736,44 @@ def get_military_events(request: Request):
         
     """
 
+    conditions = []
     params = []
 
     if military_event_depth_index:
-        # depth_index içindeki '_' karakterlerini LIKE için escape et
-        escaped_prefix = military_event_depth_index.replace("_", r"\_")
-        like_pattern = escaped_prefix + r"\_%"
+        # the subtree of the event the depth_index ends with ('109_38' -> 38),
+        # itself included, read from the closure table
+        root_id = military_event_depth_index.rsplit("_", 1)[-1]
+        if not root_id.isdigit():
+            return JSONResponse({"military_events": []})
+
+        if has_event_hierarchy(conn):
+            conditions.append(subtree_sql("me.id"))
+            params.append(int(root_id))
+        else:
+            # read-only database without the closure table: prefix scan of depth_index
+            escaped_prefix = military_event_depth_index.replace("_", r"\_")
+            conditions.append("(me.depth_index = ? OR me.depth_index LIKE ? ESCAPE '\\')")
+            params.extend([military_event_depth_index, escaped_prefix + r"\_%"])
+
+    # events active in the window: started by its end, not over before its start
+    year_from, year_to = parse_year_window(qp)
+    if year_to is not None:
+        conditions.append("me.start_year <= ?")
+        params.append(year_to)
+    if year_from is not None:
+        conditions.append("me.end_year >= ?")
+        params.append(year_from)
+
+    area = parse_area(qp)
+    if area is not None:
+        condition, area_params = area.sql(
+            "me.id", "me.lat", "me.lon", "military_events_rtree", indexed=has_spatial_index(conn)
+        )
+        conditions.append(condition)
+        params.extend(area_params)
 
-        base_query += """
-            WHERE depth_index = ?
-               OR depth_index LIKE ? ESCAPE '\\'
-        """
-        params.extend([military_event_depth_index, like_pattern])
+    if conditions:
+        base_query += " WHERE " + " AND ".join(conditions)
 
     base_query += """
         GROUP BY me.id
@@ -935,18 +781,11 @@ def get_military_events(request: Request):
     """
 
     results = cur.execute(base_query, params).fetchall()
-    conn.close()
 
     military_events = [dict(row) for row in results]
 
     for e in military_events:
         e["entity_type"] = "military_event"
-        
-        start_date = extract_year(e.get("start_time"))
-        point_in_time = extract_year(e.get("point_in_time"))
-        end_date = extract_year(e.get("end_time"))
-        e["start_date"] = start_date if start_date is not None else point_in_time
-        e["end_date"] =  end_date if end_date is not None else e["start_date"]
        
     return JSONResponse({"military_events": military_events})
 
@@ -954,10 +793,8 @@ def get_military_events(request: Request):
 
 
 @app.get("/military_event/{military_event_id}")
-def get_military_event_details(military_event_id: int):
+def get_military_event_details(military_event_id: int, conn: sqlite3.Connection = Depends(get_db)):
     print("get_military_event_details")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     cur.execute(
@@ -983,7 +820,6 @@ def get_military_event_details(military_event_id: int):
         return {"error": "military_event not found"}
 
 
-    conn.close()
 
     return JSONResponse(
         {
@@ -1032,10 +868,8 @@ def to_float_or_none(value: str | None):
 
 
 @app.put("/military_event/{event_id}/update")
-def militaryevent_update(event_id: int, payload: dict):
+def militaryevent_update(event_id: int, payload: dict, conn: sqlite3.Connection = Depends(get_write_db)):
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     start_time = to_int_or_none(payload.get("start_time"))
@@ -1055,42 +889,54 @@ def militaryevent_update(event_id: int, payload: dict):
     event.update_parent({"parent_id":parent_id})
     event.update_coors({"lat":lat,"lon":lon})
     
-    conn.commit()
-    conn.close()
     return {"status": "success", "event_id": event_id}
 
 
+@app.post("/admin/militaryevents/recompute")
+def militaryevents_recompute(
+    root_id: int | None = None,
+    rebuild_closure: bool = False,
+    conn: sqlite3.Connection = Depends(get_write_db),
+):
+    """Repairs depth_index, depth_level and descendant_count of a subtree, or of every event."""
+    cur = conn.cursor()
+
+    if root_id is not None and cur.execute("SELECT 1 FROM military_events WHERE id = ?", (root_id,)).fetchone() is None:
+        raise HTTPException(status_code=404, detail=f"MilitaryEvent {root_id} not found")
+
+    stats = MilitaryEvent.recompute_hierarchy(cur, root_id=root_id, rebuild=rebuild_closure)
+    return {"status": "success", **stats}
+
+
 @app.put("/humans/{human_id}/update")
-def human_update(human_id: int):
+def human_update(human_id: int, force: bool = False, conn: sqlite3.Connection = Depends(get_write_db)):
     print("human_update---------------------------")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     human = Human(id=human_id, cursor=cur)
-    human.update_from_wikidata()
+    updated = human.update_from_wikidata(force=force)
+    if updated:
+        # commit first (get_write_db's own commit is then a no-op): dropped before
+        # the commit, a /person read in between would cache the old row again
+        conn.commit()
+        person_cache.invalidate(human_id)
 
-    conn.commit()
-    conn.close()
     return {
         "status": "success",
-        "human_id": human_id
+        "human_id": human_id,
+        "updated": bool(updated),
     }
 
 
 
 @app.put("/locations/{location_id}/update")
-def location_update(location_id: int):
+def location_update(location_id: int, conn: sqlite3.Connection = Depends(get_write_db)):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     location = Location(id=location_id, cursor=cur)
     location.update_from_wikidata()
 
-    conn.commit()
-    conn.close()
     return {
         "status": "success",
         "location_id": location_id
@@ -1098,17 +944,13 @@ def location_update(location_id: int):
 
 
 @app.put("/works/{work_id}/update")
-def work_update(work_id: int):
+def work_update(work_id: int, conn: sqlite3.Connection = Depends(get_write_db)):
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
     work = Work(id=work_id, cursor=cur)
     work.update_from_wikidata()
 
-    conn.commit()
-    conn.close()
     return {
         "status": "success",
         "work_id": work_id
@@ -0,0 +1,188 @@
+"""
+Incremental refresh of people from Wikidata.
+
+Current revision ids are requested in bulk (props=info, 50 QIDs per call) and
+only people whose revision moved since they were last parsed are downloaded and
+rewritten, so a nightly run costs bandwidth in proportion to what changed.
+
+    python refresh_humans.py [--dry-run] [--limit N] [--force] [--stamp-only]
+
+--dry-run     parse the changed people and report which fields would change, write nothing
+--force       re-parse everyone, revision or not
+--stamp-only  record the current revision of people that have none, without re-parsing
+              (for a DB that is known to be up to date)
+"""
+import argparse
+import csv
+import time
+from contextlib import closing
+
+from dataparsers.HumanFromWikidata import HumanFromWikidata
+from dataparsers.wikidata_api import BATCH_SIZE
+from dataparsers.wikidata_api import fetch_entities
+from dataparsers.wikidata_api import latest_revisions
+from entities.Human import Human
+from utils.db_pool import connect_readonly
+from utils.ingest_session import IngestSession
+
+
+OUTPUT_CSV = "refresh_humans_report.csv"
+DB_PATH = "birdview.db"
+COMMIT_EVERY = 50
+
+# humans columns compared in the dry-run report, with the parser attribute they come from
+COMPARED_FIELDS = {
+    "name": "name",
+    "birth_date": "birth_date",
+    "death_date": "death_date",
+    "description": "description",
+    "img_url": "image_url",
+    "signature_url": "signature_url",
+    "num_of_identifiers": "num_of_identifiers",
+}
+
+
+def log_results(w, human_id, qid, name, stored, current, status, changes=""):
+    w.writerow([human_id, qid, name, stored, current, status, changes])
+    print(f"🔄 {name} ({qid}) {stored} → {current}: {status} {changes}")
+
+
+def field_changes(row, human_wiki_entity):
+    changes = []
+    for column, attribute in COMPARED_FIELDS.items():
+        old, new = row[column], getattr(human_wiki_entity, attribute)
+        if (old or None) != (new or None):
+            changes.append(f"{column}: {old!r} → {new!r}")
+    return "; ".join(changes)
+
+
+def refresh_humans(dry_run=False, force=False, stamp_only=False, limit=None):
+    # the column comes with the schema migration, which this script leaves alone
+    conn = connect_readonly(DB_PATH)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(humans)")}
+    if "lastrevid" not in columns:
+        conn.close()
+        print(f"❌ {DB_PATH} has no humans.lastrevid yet: run python scripts/migrate_db.py (or start the API) first")
+        return None
+
+    if dry_run:
+        # a dry run leaves the file as it is: no WAL switch
+        session = None
+        cursor = conn.cursor()
+    else:
+        conn.close()
+        session = IngestSession(DB_PATH, commit_every=COMMIT_EVERY)
+        cursor = session.cursor
+
+    query = f"""
+        SELECT id, qid, lastrevid, {", ".join(COMPARED_FIELDS)}
+        FROM humans
+        WHERE qid LIKE 'Q%'
+        ORDER BY id
+    """
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    rows = [dict(row) for row in cursor.execute(query).fetchall()]
+
+    started = time.perf_counter()
+    qids = [row["qid"] for row in rows]
+    revisions = {}
+    unchecked = set()
+    for start in range(0, len(qids), BATCH_SIZE):
+        batch = qids[start:start + BATCH_SIZE]
+        # a failing batch is reported and skipped, the rest of the run goes on
+        try:
+            revisions.update(latest_revisions(batch))
+        except Exception as e:
+            print(f"❌ Error checking revisions of {batch[0]}..{batch[-1]}: {e}")
+            unchecked.update(batch)
+    print(f"✅ {len(revisions)} revisions checked in {time.perf_counter() - started:.1f}s")
+
+    counts = {"unchanged": 0, "changed": 0, "missing": 0, "updated": 0, "stamped": 0, "error": 0}
+
+    with session or closing(conn), open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["id", "qid", "name", "stored_lastrevid", "current_lastrevid", "status", "changes"])
+
+        changed = []
+        for row in rows:
+            current = revisions.get(row["qid"])
+            if row["qid"] in unchecked:
+                counts["error"] += 1
+                log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], "", "error", "revision check failed")
+            elif current is None:
+                counts["missing"] += 1
+                log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], "", "missing")
+            elif stamp_only and row["lastrevid"] is None:
+                counts["stamped"] += 1
+                if not dry_run:
+                    with session.row():
+                        cursor.execute("UPDATE humans SET lastrevid = ? WHERE id = ?", (current, row["id"]))
+                log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], current, "stamped")
+            elif force or current != row["lastrevid"]:
+                changed.append(row)
+            else:
+                counts["unchanged"] += 1
+
+        if stamp_only:
+            changed = []
+        if session:
+            session.commit()
+
+        for start in range(0, len(changed), BATCH_SIZE):
+            batch = changed[start:start + BATCH_SIZE]
+            if session:
+                # the previous batch is committed before waiting on Wikidata
+                session.commit()
+            # one wbgetentities call for the batch; cached copies of older revisions are skipped
+            fetch_entities(
+                [row["qid"] for row in batch],
+                revisions={row["qid"]: revisions[row["qid"]] for row in batch},
+            )
+
+            for row in batch:
+                current = revisions[row["qid"]]
+                try:
+                    human_wiki_entity = HumanFromWikidata(row["qid"])
+                except Exception as e:
+                    counts["error"] += 1
+                    log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], current, "error", str(e))
+                    continue
+
+                changes = field_changes(row, human_wiki_entity)
+                if dry_run:
+                    counts["changed"] += 1
+                    log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], current, "changed", changes)
+                    continue
+
+                # a failing person is rolled back alone, not with the rest of the batch
+                try:
+                    with session.row():
+                        human = Human(id=row["id"], cursor=cursor, w=writer)
+                        human.update_from_wikidata(force=True, human_wiki_entity=human_wiki_entity)
+                except Exception as e:
+                    counts["error"] += 1
+                    log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], current, "error", str(e))
+                    continue
+
+                counts["updated"] += 1
+                log_results(writer, row["id"], row["qid"], row["name"], row["lastrevid"], current, "updated", changes)
+    print(f"✅ refresh finished in {time.perf_counter() - started:.1f}s: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse people whose Wikidata revision changed.")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change, write nothing")
+    parser.add_argument("--force", action="store_true", help="re-parse everyone")
+    parser.add_argument("--stamp-only", action="store_true", help="record current revisions without re-parsing")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    counts = refresh_humans(dry_run=args.dry_run, force=args.force, stamp_only=args.stamp_only, limit=args.limit)
+    if counts is None:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Maintenance cost of the military_events hierarchy on a synthetic forest: the old
+per-event walk (one MilitaryEvent and one ancestor walk per descendant, a LIKE
+scan per ancestor count) against the closure table and the recursive-CTE
+recompute in utils/event_hierarchy.py.
+
+    python scripts/bench_hierarchy.py [events] [db path]
+
+Events default to 100,000 in wars of up to ~2,000 events, four levels deep;
+the DB is built once and reused (each run works on a copy).
+"""
+import random
+import shutil
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from entities.MilitaryEvent import MilitaryEvent  # noqa: E402
+from utils.event_hierarchy import ensure_event_hierarchy  # noqa: E402
+from utils.event_hierarchy import recompute_hierarchy  # noqa: E402
+
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+DB_PATH = Path(sys.argv[2] if len(sys.argv) > 2 else f"/tmp/bench_hierarchy_{EVENTS}.db")
+WORK_PATH = DB_PATH.with_suffix(".work.db")
+
+# children per event at each level below a war: campaigns, battles, engagements
+FANOUT = [(5, 30), (3, 20), (0, 8)]
+
+# the legacy subtree walk is timed on this many descendants at most
+LEGACY_LIMIT = 2_000
+
+
+def build_db():
+    print(f"Building {DB_PATH} with {EVENTS:,} events ...")
+    rnd = random.Random(0)
+    rows = []
+
+    def add(parent_id, parent_index, level):
+        event_id = len(rows) + 1
+        depth_index = f"{parent_index}_{event_id}" if parent_index else str(event_id)
+        rows.append([event_id, f"Event {event_id}", parent_id, depth_index, level, 0])
+        return event_id, depth_index, level
+
+    while len(rows) < EVENTS:
+        stack = [add(None, None, 1)]
+        while stack and len(rows) < EVENTS:
+            event_id, depth_index, level = stack.pop()
+            if level > len(FANOUT):
+                continue
+            low, high = FANOUT[level - 1]
+            for _ in range(rnd.randint(low, high)):
+                if len(rows) >= EVENTS:
+                    break
+                stack.append(add(event_id, depth_index, level + 1))
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        """
+        CREATE TABLE military_events(id INTEGER PRIMARY KEY, qid TEXT, name TEXT, image_url TEXT,
+            description TEXT, start_time TEXT, end_time TEXT, point_in_time TEXT, wiki_url TEXT,
+            lat REAL, lon REAL, depth_index TEXT, depth_level INTEGER, descendant_count INTEGER,
+            parent_id INTEGER)
+        """
+    )
+    conn.executemany(
+        "INSERT INTO military_events(id, name, parent_id, depth_index, depth_level, descendant_count) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    started = time.perf_counter()
+    ensure_event_hierarchy(conn)
+    recompute_hierarchy(conn)
+    conn.commit()
+    print(f"✅ closure table built in {time.perf_counter() - started:.1f}s")
+    conn.close()
+
+
+def legacy_depth_index(cur, event_id):
+    # MilitaryEvent.generate_depth_index before the closure table: one SELECT per ancestor
+    parent_id = cur.execute("SELECT parent_id FROM military_events WHERE id = ?", (event_id,)).fetchone()[0]
+    if parent_id:
+        return f"{legacy_depth_index(cur, parent_id)}_{event_id}"
+    return str(event_id)
+
+
+def legacy_descendants(cur, depth_index):
+    pattern = depth_index.replace("_", r"\_") + r"\_%"
+    return cur.execute(
+        "SELECT id FROM military_events WHERE depth_index LIKE ? ESCAPE '\\'", (pattern,)
+    ).fetchall()
+
+
+def legacy_update_subtree(cur, root_id, limit):
+    """update_descendants_data + update_parent_descendant_count as they were, on `limit` descendants."""
+    root_index = cur.execute("SELECT depth_index FROM military_events WHERE id = ?", (root_id,)).fetchone()[0]
+    descendants = legacy_descendants(cur, root_index)[:limit]
+    for (event_id,) in descendants:
+        depth_index = legacy_depth_index(cur, event_id)
+        cur.execute(
+            "UPDATE military_events SET depth_index = ?, depth_level = ? WHERE id = ?",
+            (depth_index, depth_index.count("_") + 1, event_id),
+        )
+    for ancestor in root_index.split("_"):
+        index = cur.execute("SELECT depth_index FROM military_events WHERE id = ?", (int(ancestor),)).fetchone()[0]
+        count = len(legacy_descendants(cur, index))
+        cur.execute("UPDATE military_events SET descendant_count = ? WHERE id = ?", (count, int(ancestor)))
+    return len(descendants)
+
+
+def timed(name, run, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:>40}: {elapsed * 1000:9.1f}ms {result if result is not None else ''}")
+    return result
+
+
+def main() -> None:
+    if not DB_PATH.exists():
+        build_db()
+    shutil.copy(DB_PATH, WORK_PATH)
+
+    conn = sqlite3.connect(WORK_PATH)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+
+    wars = cur.execute(
+        "SELECT id, descendant_count FROM military_events WHERE parent_id IS NULL ORDER BY descendant_count DESC"
+    ).fetchall()
+    largest, other = wars[0]["id"], wars[1]["id"]
+    print(f"{EVENTS:,} events in {len(wars)} wars, largest {wars[0]['descendant_count']:,} descendants")
+
+    index = cur.execute("SELECT depth_index FROM military_events WHERE id = ?", (largest,)).fetchone()[0]
+    timed("subtree read, depth_index LIKE", lambda: len(legacy_descendants(cur, index)), repeat=20)
+    timed("subtree read, closure table", lambda: len(MilitaryEvent(id=largest, cursor=cur).get_descendants()), repeat=20)
+
+    timed(
+        f"legacy subtree update ({LEGACY_LIMIT:,} events)",
+        lambda: legacy_update_subtree(cur, largest, LEGACY_LIMIT),
+    )
+    conn.rollback()
+
+    event = MilitaryEvent(id=largest, cursor=cur)
+    timed("update_parent, largest war", lambda: event.update_parent({"parent_id": other}))
+    timed("recompute_hierarchy, one war", lambda: recompute_hierarchy(cur, root_id=other)["total_ms"])
+    timed("recompute_hierarchy, whole table", lambda: recompute_hierarchy(cur)["total_ms"])
+    timed("recompute_hierarchy, rebuild closure", lambda: recompute_hierarchy(cur, rebuild=True)["total_ms"])
+    conn.rollback()
+
+    conn.close()
+    WORK_PATH.unlink()
+
+
+if __name__ == "__main__":
+    main()
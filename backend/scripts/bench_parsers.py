@@ -0,0 +1,141 @@
+"""
+Parsing throughput of the *FromWikidata parsers on entity JSON, without network:
+labels come from a DictLabelResolver (a place's coordinates from a
+DictCoordinateResolver), entities from a JSON-lines file (one
+entity per line, e.g. a dump subset) or are generated.
+
+    python scripts/bench_parsers.py [entities] [jsonl path] [processes]
+
+Entities default to 20,000 generated people; processes to the CPU count.
+"""
+import json
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dataparsers.HumanFromWikidata import HumanFromWikidata  # noqa: E402
+from dataparsers.LocationFromWikidata import LocationFromWikidata  # noqa: E402
+from dataparsers.coordinate_resolver import DictCoordinateResolver  # noqa: E402
+from dataparsers.label_resolver import DictLabelResolver  # noqa: E402
+
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+JSONL_PATH = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "-" else None
+PROCESSES = int(sys.argv[3]) if len(sys.argv) > 3 else multiprocessing.cpu_count()
+
+CHUNK = 500
+
+LABELS = {
+    "Q5": "human", "Q6581072": "female", "Q6581097": "male", "Q142": "France",
+    "Q29": "Spain", "Q38": "Italy", "Q515": "city", "Q6256": "country",
+}
+
+
+def _item(pid, qid, **qualifiers):
+    statement = {"mainsnak": {"snaktype": "value", "property": pid, "datatype": "wikibase-item",
+                              "datavalue": {"type": "wikibase-entityid", "value": {"entity-type": "item", "id": qid}}}}
+    if qualifiers:
+        statement["qualifiers"] = {
+            p: [{"datavalue": {"value": {"time": t}}}] for p, t in qualifiers.items()
+        }
+    return statement
+
+
+def _time(pid, year):
+    return {"mainsnak": {"snaktype": "value", "property": pid, "datatype": "time",
+                         "datavalue": {"value": {"time": f"+{year}-00-00T00:00:00Z"}}}}
+
+
+def _external_ids(rnd):
+    return {f"P{2000 + i}": [{"mainsnak": {"datatype": "external-id", "datavalue": {"value": str(i)}}}]
+            for i in range(rnd.randint(5, 120))}
+
+
+def make_human(i, rnd):
+    born = rnd.randint(1400, 1950)
+    claims = {
+        "P31": [_item("P31", "Q5")],
+        "P21": [_item("P21", rnd.choice(["Q6581072", "Q6581097"]))],
+        "P27": [_item("P27", rnd.choice(["Q142", "Q29", "Q38"]))],
+        "P569": [_time("P569", born)],
+        "P570": [_time("P570", born + rnd.randint(20, 90))],
+        "P19": [_item("P19", f"Q{7_000_000 + rnd.randint(0, 999)}")],
+        "P20": [_item("P20", f"Q{7_000_000 + rnd.randint(0, 999)}")],
+        "P551": [_item("P551", f"Q{7_000_000 + rnd.randint(0, 999)}", P580=f"+{born + 20}-00-00T00:00:00Z")],
+        "P106": [_item("P106", f"Q{8_000_000 + rnd.randint(0, 50)}") for _ in range(rnd.randint(1, 4))],
+        "P135": [_item("P135", f"Q{9_000_000 + rnd.randint(0, 30)}")],
+        "P1066": [_item("P1066", f"Q{6_000_000 + rnd.randint(0, 10_000)}")],
+        **_external_ids(rnd),
+    }
+    return {
+        "id": f"Q{5_000_000 + i}",
+        "lastrevid": rnd.randint(1, 10**9),
+        "labels": {"en": {"language": "en", "value": f"Person {i}"}},
+        "descriptions": {"en": {"language": "en", "value": "painter"}},
+        "claims": claims,
+    }
+
+
+def make_location(i, rnd):
+    return {
+        "id": f"Q{7_000_000 + i}",
+        "labels": {"en": {"language": "en", "value": f"Town {i}"}},
+        "descriptions": {"en": {"language": "en", "value": "town"}},
+        "claims": {
+            "P31": [_item("P31", "Q515")],
+            "P17": [_item("P17", rnd.choice(["Q142", "Q29", "Q38"]))],
+            "P625": [{"mainsnak": {"datatype": "globe-coordinate", "datavalue": {
+                "value": {"latitude": rnd.uniform(-60, 60), "longitude": rnd.uniform(-180, 180)}}}}],
+            "P571": [_time("P571", rnd.randint(800, 1900))],
+        },
+    }
+
+
+def load_entities():
+    if JSONL_PATH:
+        with open(JSONL_PATH, encoding="utf-8") as f:
+            entities = [json.loads(line.rstrip().rstrip(",")) for line in f if line.strip() not in ("", "[", "]")]
+        return entities[:COUNT], []
+    rnd = random.Random(0)
+    return [make_human(i, rnd) for i in range(COUNT)], [make_location(i, rnd) for i in range(COUNT // 10)]
+
+
+def _parse_lines(lines):
+    # workers get raw JSON lines, as from a dump: pickling nested dicts costs more than parsing them
+    entities = [json.loads(line) for line in lines]
+    return len(HumanFromWikidata.from_entities_json(entities, DictLabelResolver(LABELS)))
+
+
+def timed(name, count, run):
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    print(f"{name:>28}: {count:,} entities in {elapsed:.2f}s, {count / elapsed:,.0f}/s, {elapsed / count * 1e6:.1f}µs each")
+
+
+def main() -> None:
+    humans, locations = load_entities()
+    labels = DictLabelResolver(LABELS)
+
+    timed("HumanFromWikidata", len(humans), lambda: HumanFromWikidata.from_entities_json(humans, labels))
+    if locations:
+        places = DictCoordinateResolver({location["id"]: location for location in locations})
+        timed(
+            "LocationFromWikidata",
+            len(locations),
+            lambda: LocationFromWikidata.from_entities_json(locations, labels, coordinate_resolver=places),
+        )
+
+    lines = [json.dumps(entity) for entity in humans]
+    chunks = [lines[i:i + CHUNK] for i in range(0, len(lines), CHUNK)]
+    timed("json + HumanFromWikidata", len(humans), lambda: sum(map(_parse_lines, chunks)))
+    with multiprocessing.Pool(PROCESSES) as pool:
+        timed(f"same on {PROCESSES} processes", len(humans), lambda: sum(pool.imap_unordered(_parse_lines, chunks)))
+
+
+if __name__ == "__main__":
+    main()
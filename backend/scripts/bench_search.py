@@ -0,0 +1,147 @@
+"""
+Keystroke latency of /search: the old three LIKE '%q%' scans against the
+FTS5-backed search in utils/search.py, on a synthetic DB.
+
+    python scripts/bench_search.py [rows] [db path]
+
+Rows default to 1,000,000 per searched table; the DB is built once and reused.
+"""
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.search import ensure_search_index  # noqa: E402
+from utils.search import search_all  # noqa: E402
+
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DB_PATH = Path(sys.argv[2] if len(sys.argv) > 2 else f"/tmp/bench_search_{ROWS}.db")
+
+FIRST = ["Anna", "Pablo", "Claude", "Frida", "Henri", "Maria", "Georgia", "Paul", "Edvard", "Berthe"]
+LAST = ["Picasso", "Monet", "Kahlo", "Matisse", "Munch", "Morisot", "O'Keeffe", "Klee", "Cassatt", "Rivera"]
+PLACES = ["Paris", "Madrid", "Vienna", "Oslo", "Florence", "Antwerp", "Kyoto", "Lima", "Prague", "Delft"]
+EVENTS = ["Battle of", "Siege of", "Campaign of", "Raid on", "Treaty of"]
+
+# what FilterList sends while someone types "picasso" and "siege of vi"
+TYPED = ["picasso", "siege of vi", "flor", "munch 12"]
+
+LEGACY = [
+    (
+        "humans",
+        """
+        SELECT id, name, birth_date, death_date, qid FROM humans
+        WHERE name LIKE ?
+        ORDER BY CASE WHEN name LIKE ? THEN 0 ELSE 1 END, num_of_identifiers DESC, name
+        LIMIT 10
+        """,
+    ),
+    (
+        "locations",
+        """
+        SELECT id, name, lat AS loc_lat, lon AS loc_lon, qid FROM locations
+        WHERE name LIKE ?
+        ORDER BY CASE WHEN name LIKE ? THEN 0 ELSE 1 END, name
+        LIMIT 10
+        """,
+    ),
+    (
+        "events",
+        """
+        SELECT * FROM military_events
+        WHERE name LIKE ?
+        ORDER BY CASE WHEN name LIKE ? THEN 0 ELSE 1 END, name
+        LIMIT 10
+        """,
+    ),
+]
+
+
+def build_db():
+    print(f"Building {DB_PATH} with {ROWS:,} rows per table ...")
+    rnd = random.Random(0)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(
+        """
+        CREATE TABLE humans (id INTEGER PRIMARY KEY, name TEXT, birth_date INTEGER,
+                             death_date INTEGER, qid TEXT, num_of_identifiers INTEGER);
+        CREATE TABLE locations (id INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL, qid TEXT);
+        CREATE TABLE military_events (id INTEGER PRIMARY KEY, qid TEXT, name TEXT, image_url TEXT,
+            description TEXT, start_time TEXT, end_time TEXT, point_in_time TEXT, wiki_url TEXT,
+            lat REAL, lon REAL, depth_index TEXT, depth_level INTEGER, descendant_count INTEGER,
+            parent_id INTEGER);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO humans VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {i}", 1800 + i % 200, 1870 + i % 200, f"Q{i}", rnd.randint(0, 300))
+            for i in range(1, ROWS + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO locations VALUES (?, ?, ?, ?, ?)",
+        ((i, f"{rnd.choice(PLACES)} {i}", rnd.uniform(-80, 80), rnd.uniform(-180, 180), f"Q{i}") for i in range(1, ROWS + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO military_events (id, name, start_time, qid) VALUES (?, ?, ?, ?)",
+        ((i, f"{rnd.choice(EVENTS)} {rnd.choice(PLACES)} {i}", "1800", f"Q{i}") for i in range(1, ROWS + 1)),
+    )
+    conn.commit()
+
+    started = time.perf_counter()
+    ensure_search_index(conn)
+    conn.commit()
+    print(f"✅ search index built in {time.perf_counter() - started:.1f}s")
+    conn.close()
+
+
+def legacy_search(conn, q):
+    results = {}
+    for kind, query in LEGACY:
+        results[kind] = [dict(r) for r in conn.execute(query, (f"%{q}%", f"{q}%")).fetchall()]
+    return results
+
+
+def fts_search(conn, q):
+    return search_all(conn, q, {"humans": 10, "locations": 10, "events": 10})
+
+
+def time_keystrokes(conn, search):
+    timings = []
+    for word in TYPED:
+        for end in range(2, len(word) + 1):
+            started = time.perf_counter()
+            search(conn, word[:end])
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "keystrokes": len(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95)],
+        "max_ms": timings[-1],
+    }
+
+
+def main() -> None:
+    if not DB_PATH.exists():
+        build_db()
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+
+    for name, search in [("LIKE '%q%'", legacy_search), ("FTS5 trigram", fts_search)]:
+        stats = time_keystrokes(conn, search)
+        print(
+            f"{name:>14}: {stats['keystrokes']} keystrokes, "
+            f"p50 {stats['p50_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms, max {stats['max_ms']:.1f}ms"
+        )
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+bbox= / near= filters of /humans, /militaryevents and /search: the R*Tree
+candidates of utils/spatial_index.py against the full scan of lat/lon the same
+filters run without the index, on a synthetic DB.
+
+    python scripts/bench_spatial.py [rows] [db path]
+
+Rows default to 1,000,000 locations, military events and humans (one birth place
+each); the DB is built once and reused.
+"""
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.search import ensure_search_index  # noqa: E402
+from utils.search import search_all  # noqa: E402
+from utils.spatial_index import Area  # noqa: E402
+from utils.spatial_index import ensure_spatial_index  # noqa: E402
+from utils.spatial_index import register_spatial_functions  # noqa: E402
+
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DB_PATH = Path(sys.argv[2] if len(sys.argv) > 2 else f"/tmp/bench_spatial_{ROWS}.db")
+
+FIRST = ["Anna", "Pablo", "Claude", "Frida", "Henri", "Maria", "Georgia", "Paul", "Edvard", "Berthe"]
+LAST = ["Picasso", "Monet", "Kahlo", "Matisse", "Munch", "Morisot", "O'Keeffe", "Klee", "Cassatt", "Rivera"]
+
+# half the points around a few dense centres, like the real data around Europe
+CENTRES = [(48.86, 2.35), (41.90, 12.50), (52.52, 13.40), (40.71, -74.01), (35.68, 139.69)]
+
+AREAS = [
+    ("bbox, a city", Area.bbox(2.0, 48.6, 2.7, 49.1)),
+    ("bbox, a country", Area.bbox(-5.0, 42.0, 8.0, 51.0)),
+    ("bbox, over the antimeridian", Area.bbox(170.0, -50.0, -170.0, -30.0)),
+    ("near Paris, 50 km", Area.near(48.86, 2.35, 50)),
+    ("near Rome, 500 km", Area.near(41.90, 12.50, 500)),
+]
+
+
+def point(rnd):
+    if rnd.random() < 0.5:
+        lat, lon = rnd.choice(CENTRES)
+        return lat + rnd.gauss(0, 2), lon + rnd.gauss(0, 2)
+    return rnd.uniform(-60, 70), rnd.uniform(-180, 180)
+
+
+def build_db():
+    print(f"Building {DB_PATH} with {ROWS:,} rows per table ...")
+    rnd = random.Random(0)
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(
+        """
+        CREATE TABLE locations (id INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL, qid TEXT);
+        CREATE TABLE military_events (id INTEGER PRIMARY KEY, qid TEXT, name TEXT, image_url TEXT,
+            description TEXT, start_time TEXT, end_time TEXT, point_in_time TEXT, wiki_url TEXT,
+            lat REAL, lon REAL, depth_index TEXT, depth_level INTEGER, descendant_count INTEGER,
+            parent_id INTEGER);
+        CREATE TABLE humans (id INTEGER PRIMARY KEY, name TEXT, birth_date INTEGER,
+                             death_date INTEGER, qid TEXT, num_of_identifiers INTEGER);
+        CREATE TABLE human_location (id INTEGER PRIMARY KEY, human_id INTEGER, location_id INTEGER,
+                                     relationship_type_id INTEGER);
+        -- as in utils/db_schema.py
+        CREATE INDEX idx_human_location_location_type ON human_location(location_id, relationship_type_id);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO locations VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Place {i}", *point(rnd), f"Q{i}") for i in range(1, ROWS + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO military_events (id, name, lat, lon, qid) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Battle of Place {i}", *point(rnd), f"Q{i}") for i in range(1, ROWS + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO humans VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {i}", 1800 + i % 200, 1870 + i % 200, f"Q{i}", rnd.randint(0, 300))
+            for i in range(1, ROWS + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO human_location VALUES (?, ?, ?, 4)",
+        ((i, i, rnd.randint(1, ROWS)) for i in range(1, ROWS + 1)),
+    )
+    conn.commit()
+
+    ensure_search_index(conn)
+    started = time.perf_counter()
+    ensure_spatial_index(conn)
+    conn.commit()
+    print(f"✅ R*Tree indexes built in {time.perf_counter() - started:.1f}s")
+    conn.close()
+
+
+def location_ids(conn, area, indexed):
+    """The birth places /humans filters the snapshot on."""
+    condition, params = area.sql("id", "lat", "lon", "locations_rtree", indexed)
+    return len(conn.execute(f"SELECT id FROM locations WHERE {condition}", params).fetchall())
+
+
+def military_events(conn, area, indexed):
+    condition, params = area.sql("id", "lat", "lon", "military_events_rtree", indexed)
+    return len(conn.execute(f"SELECT * FROM military_events WHERE {condition}", params).fetchall())
+
+
+def search(conn, area, indexed):
+    results = search_all(conn, "picasso", {"humans": 10, "locations": 10, "events": 10}, area=area, use_rtree=indexed)
+    return sum(len(rows) for rows in results.values())
+
+
+def timed(run, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main() -> None:
+    if not DB_PATH.exists():
+        build_db()
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    register_spatial_functions(conn)
+
+    for endpoint, query in [("/humans", location_ids), ("/militaryevents", military_events), ("/search", search)]:
+        print(endpoint)
+        for name, area in AREAS:
+            scan_ms, scan_rows = timed(lambda: query(conn, area, False))
+            rtree_ms, rtree_rows = timed(lambda: query(conn, area, True))
+            assert scan_rows == rtree_rows, (endpoint, name, scan_rows, rtree_rows)
+            print(
+                f"{name:>30}: {rtree_rows:>7,} rows, "
+                f"full scan {scan_ms:8.1f}ms, R*Tree {rtree_ms:7.1f}ms ({scan_ms / max(rtree_ms, 1e-3):.0f}x)"
+            )
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
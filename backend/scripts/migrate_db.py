@@ -0,0 +1,46 @@
+"""
+Brings a database up to the schema the API and the ingest scripts expect:
+columns, indexes, search / closure / R*Tree tables (utils/db_schema.py).
+
+    python scripts/migrate_db.py [--merge-duplicates] [db path]
+
+The API runs the same at startup; the ingest and maintenance scripts expect a
+database that has been through it and do not change the schema themselves.
+
+--merge-duplicates is the one-time step for databases written before the link
+tables had unique keys: rows repeating a key are merged into the oldest copy
+before the unique indexes are created.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.db_schema import ensure_schema  # noqa: E402
+from utils.db_schema import merge_duplicate_links  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply the schema additions to a BirdView database.")
+    parser.add_argument("db_path", nargs="?", default=os.getenv("DB_PATH", "birdview.db"))
+    parser.add_argument("--merge-duplicates", action="store_true", help="merge link rows repeating a key first")
+    args = parser.parse_args()
+
+    if args.merge_duplicates:
+        conn = sqlite3.connect(args.db_path)
+        try:
+            removed = merge_duplicate_links(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✅ {sum(removed.values())} duplicate link rows merged")
+
+    ensure_schema(args.db_path)
+    print(f"✅ {args.db_path} is up to date")
+
+
+if __name__ == "__main__":
+    main()
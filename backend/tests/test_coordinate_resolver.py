@@ -0,0 +1,61 @@
+"""dataparsers/coordinate_resolver.py and the places parsed with an injected resolver."""
+import pytest
+
+from dataparsers import coordinate_resolver
+from dataparsers.LocationFromWikidata import LocationFromWikidata
+from dataparsers.coordinate_resolver import DictCoordinateResolver
+from dataparsers.label_resolver import DictLabelResolver
+
+
+def item_claim(qid):
+    return [{"mainsnak": {"snaktype": "value", "datavalue": {"value": {"id": qid}}}}]
+
+
+def coordinate_claim(lat, lon):
+    return [{"mainsnak": {"datatype": "globe-coordinate", "datavalue": {"value": {"latitude": lat, "longitude": lon}}}}]
+
+
+def place(qid, name, **claims):
+    return {"id": qid, "labels": {"en": {"value": name}}, "claims": claims}
+
+
+ENTITIES = {
+    # a village without coordinates, in a district without them, in a country with them
+    "Q1": place("Q1", "Village", P131=item_claim("Q2"), P17=item_claim("Q3"), P31=item_claim("Q9")),
+    "Q2": place("Q2", "District", P131=item_claim("Q3")),
+    "Q3": place("Q3", "Country", P625=coordinate_claim(39.0, 35.0)),
+    # its only ancestor is not in the mapping
+    "Q4": place("Q4", "Lost", P131=item_claim("Q404")),
+}
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    def fetch_entities(qids, *args, **kwargs):
+        raise AssertionError(f"went online for {qids}")
+
+    monkeypatch.setattr(coordinate_resolver, "fetch_entities", fetch_entities)
+
+
+def test_dict_resolver_walks_the_fallbacks_it_holds():
+    resolver = DictCoordinateResolver(ENTITIES)
+
+    resolved = resolver.resolve("Q1")
+    assert (resolved.lat, resolved.lon) == (39.0, 35.0)
+    assert resolved.source_chain == ("Q1", "Q2", "Q3")
+    assert resolver.resolve("Q4") is None
+    assert resolver.resolve_many(["Q1", "Q2", "Q4"])["Q2"].source_chain == ("Q2", "Q3")
+
+
+def test_location_from_entity_json_parses_without_io():
+    location = LocationFromWikidata.from_entity_json(
+        ENTITIES["Q1"],
+        label_resolver=DictLabelResolver({"Q3": "Country", "Q9": "village"}),
+        coordinate_resolver=DictCoordinateResolver(ENTITIES),
+    )
+
+    assert (location.lat, location.lon) == (39.0, 35.0)
+    assert location.coordinate_source == "Q3"
+    assert location.country_label == "Country"
+    assert location.instance_label == "village"
+    assert "_coordinate_resolver" not in location.to_dict()
@@ -0,0 +1,70 @@
+"""utils/db_schema.py: unique keys of the link tables and the duplicate merge."""
+import sqlite3
+
+import pytest
+
+from entities.HumanOccupation import HumanOccupation
+from utils.db_schema import ensure_unique_keys
+from utils.db_schema import merge_duplicate_links
+from utils.db_schema import unique_index_name
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE human_occupation (id INTEGER PRIMARY KEY, occupation_id INTEGER, human_id INTEGER, is_primary INTEGER)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE human_location (id INTEGER PRIMARY KEY, human_id INTEGER, location_id INTEGER,
+                                     relationship_type_id INTEGER, start_date TEXT, end_date TEXT, source_url TEXT)
+        """
+    )
+    conn.executemany(
+        "INSERT INTO human_occupation (id, human_id, occupation_id, is_primary) VALUES (?, ?, ?, ?)",
+        [(1, 10, 1, 0), (2, 10, 1, 1), (3, 10, 2, 0), (4, 11, 1, 0)],
+    )
+    conn.executemany(
+        "INSERT INTO human_location VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(1, 10, 5, 4, None, None, ""), (2, 10, 5, 4, "1900", None, "https://example.org/a")],
+    )
+    yield conn
+    conn.close()
+
+
+def has_index(conn, table, keys):
+    name = unique_index_name(table, keys)
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone() is not None
+
+
+def test_duplicates_are_left_alone_without_the_migration(conn):
+    ensure_unique_keys(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM human_occupation").fetchone()[0] == 4
+    assert not has_index(conn, "human_occupation", ("human_id", "occupation_id"))
+    with pytest.raises(RuntimeError, match="no unique index"):
+        HumanOccupation.bulk_upsert([{"human_id": 12, "occupation_id": 1, "is_primary": 0}], cursor=conn.cursor())
+    assert conn.execute("SELECT COUNT(*) FROM human_occupation WHERE human_id = 12").fetchone()[0] == 0
+
+
+def test_merge_keeps_the_oldest_row_with_the_merged_values(conn):
+    removed = merge_duplicate_links(conn)
+    ensure_unique_keys(conn)
+
+    assert removed == {"human_occupation": 1, "human_location": 1}
+    assert conn.execute("SELECT id, is_primary FROM human_occupation WHERE human_id = 10 ORDER BY id").fetchall() == [
+        (1, 1),
+        (3, 0),
+    ]
+    assert conn.execute("SELECT id, start_date, source_url FROM human_location").fetchall() == [
+        (1, "1900", "https://example.org/a"),
+    ]
+    assert has_index(conn, "human_occupation", ("human_id", "occupation_id"))
+    assert has_index(conn, "human_location", ("human_id", "location_id", "relationship_type_id"))
+
+    ids = HumanOccupation.bulk_upsert(
+        [{"human_id": 10, "occupation_id": 1, "is_primary": 1}, {"human_id": 12, "occupation_id": 1, "is_primary": 0}],
+        cursor=conn.cursor(),
+    )
+    assert ids[0] == 1
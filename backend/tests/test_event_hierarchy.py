@@ -0,0 +1,71 @@
+"""utils/event_hierarchy.py: the closure triggers agree with a rebuild from parent_id."""
+import sqlite3
+
+import pytest
+
+from utils.event_hierarchy import CLOSURE_TABLE
+from utils.event_hierarchy import ensure_event_hierarchy
+from utils.event_hierarchy import rebuild_closure
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE military_events (id INTEGER PRIMARY KEY, name TEXT, parent_id INTEGER)")
+    ensure_event_hierarchy(conn)
+    # 1 > 2 > 3 > 4, and 2 > 5
+    for id, parent_id in [(1, None), (2, 1), (3, 2), (4, 3), (5, 2)]:
+        conn.execute("INSERT INTO military_events (id, parent_id) VALUES (?, ?)", (id, parent_id))
+    yield conn
+    conn.close()
+
+
+def closure(conn):
+    return set(conn.execute(f"SELECT ancestor_id, descendant_id, depth FROM {CLOSURE_TABLE}"))
+
+
+def rebuilt(conn):
+    kept = closure(conn)
+    rebuild_closure(conn)
+    expected = closure(conn)
+    conn.execute(f"DELETE FROM {CLOSURE_TABLE}")
+    conn.executemany(f"INSERT INTO {CLOSURE_TABLE} VALUES (?, ?, ?)", kept)
+    return expected
+
+
+def test_deleting_an_inner_event_drops_the_pairs_through_it(conn):
+    conn.execute("DELETE FROM military_events WHERE id = 2")
+
+    assert closure(conn) == rebuilt(conn)
+    # 3 and 5 are roots now, 3 > 4 stays
+    assert (1, 3, 2) not in closure(conn)
+    assert (1, 4, 3) not in closure(conn)
+    assert (3, 4, 1) in closure(conn)
+
+
+def test_reparenting_matches_a_rebuild(conn):
+    conn.execute("UPDATE military_events SET parent_id = 5 WHERE id = 3")
+
+    assert closure(conn) == rebuilt(conn)
+    assert (1, 4, 4) in closure(conn)
+
+
+def test_old_delete_trigger_is_replaced_and_the_table_rebuilt(conn):
+    conn.execute(f"DROP TRIGGER {CLOSURE_TABLE}_bd")
+    conn.execute(
+        f"""
+        CREATE TRIGGER {CLOSURE_TABLE}_ad AFTER DELETE ON military_events BEGIN
+            DELETE FROM {CLOSURE_TABLE} WHERE descendant_id = old.id;
+            DELETE FROM {CLOSURE_TABLE} WHERE ancestor_id = old.id;
+        END
+        """
+    )
+    conn.execute("DELETE FROM military_events WHERE id = 2")
+    assert (1, 4, 3) in closure(conn)
+
+    ensure_event_hierarchy(conn)
+
+    assert closure(conn) == rebuilt(conn)
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert f"{CLOSURE_TABLE}_ad" not in triggers
+    assert f"{CLOSURE_TABLE}_bd" in triggers
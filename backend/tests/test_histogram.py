@@ -0,0 +1,57 @@
+"""utils/histogram.py against the frontend's getFullRange + buildAliveCounts (maxAge 100)."""
+import random
+
+import numpy as np
+
+from utils.date_utils import HUMAN_MAX_AGE
+from utils.histogram import build_alive_histogram
+
+CURRENT_YEAR = 2026
+
+
+def client_histogram(people):
+    """frontend/src/utils: getFullRange(list, ..., "humans"), then buildAliveCounts(list, range, {maxAge})."""
+    births = [b for b, _ in people]
+    deaths = [d for _, d in people if d is not None]
+    someone_alive = any(d is None and b + 100 > CURRENT_YEAR for b, d in people)
+    start = max(min(births), -10000)
+    end = CURRENT_YEAR if someone_alive or not deaths else max(deaths)
+
+    counts = []
+    for year in range(start, end + 1):
+        alive = 0
+        for b, d in people:
+            cap = b + HUMAN_MAX_AGE
+            last = cap if d is None else min(d, cap)
+            alive += b <= year <= last
+        counts.append(alive)
+    return [start, end], counts
+
+
+def server_histogram(people):
+    births = np.array([b for b, _ in people])
+    deaths = np.array([0 if d is None else d for _, d in people])
+    histogram = build_alive_histogram(births, deaths, CURRENT_YEAR)
+    return histogram["range"], histogram["counts"]
+
+
+def test_lifetimes_end_at_the_cap_inclusive():
+    # born 1900 without a death year: alive 1900..2000 on the client
+    people = [(1900, None), (1950, 2010)]
+    assert server_histogram(people) == client_histogram(people)
+    (start, _), counts = server_histogram(people)
+    assert counts[2000 - start] == 2
+    assert counts[2001 - start] == 1
+
+
+def test_matches_the_client_on_random_people():
+    rnd = random.Random(0)
+    for _ in range(20):
+        people = []
+        for _ in range(rnd.randint(1, 30)):
+            birth = rnd.randint(1850, CURRENT_YEAR)
+            death = rnd.choice([None, birth + rnd.randint(0, 130)])
+            people.append((birth, death))
+        # the edges of the range test: exactly HUMAN_MAX_AGE years ago
+        people.append((CURRENT_YEAR - HUMAN_MAX_AGE, rnd.choice([None, CURRENT_YEAR - 1])))
+        assert server_histogram(people) == client_histogram(people)
@@ -0,0 +1,74 @@
+"""ingest_dump.py: the dump passes and the QID tables they fill."""
+import json
+
+import pytest
+
+import ingest_dump
+from dataparsers import wikidata_api
+
+
+def item(qid, **claims):
+    return {
+        "type": "item",
+        "id": qid,
+        "labels": {"en": {"language": "en", "value": f"Item {qid}"}},
+        "claims": {
+            pid: [{"mainsnak": {"datavalue": {"value": {"id": target}}}} for target in targets]
+            for pid, targets in claims.items()
+        },
+    }
+
+
+DUMP = [
+    item("Q1", P31=["Q5"], P19=["Q10"]),   # a selected person, born in a town
+    item("Q2", P31=["Q5"], P106=["Q40"]),  # a person nobody asked for
+    item("Q10", P17=["Q20"]),              # the town, in a country
+    item("Q20"),
+    item("Q30"),
+    item("Q40"),
+]
+
+
+@pytest.fixture
+def dump(tmp_path, monkeypatch):
+    monkeypatch.setattr(wikidata_api, "WIKIDATA_CACHE_PATH", str(tmp_path / "wikidata_cache.db"))
+    wikidata_api.reset_process_state()
+    path = tmp_path / "dump.json"
+    path.write_text("[\n" + ",\n".join(json.dumps(entity) for entity in DUMP) + "\n]\n", encoding="utf-8")
+    yield str(path)
+    wikidata_api.reset_process_state()
+
+
+def qids(conn, table):
+    return [f"Q{qid}" for qid, in conn.execute(f"SELECT qid FROM {table} ORDER BY qid")]
+
+
+def test_passes_follow_the_references_of_the_selection(dump, tmp_path):
+    qid_db = str(tmp_path / "qids.db")
+    conn = ingest_dump.open_qid_tables(qid_db)
+    ingest_dump.add_qids(conn, "wanted", ["Q1"])
+    conn.commit()
+
+    assert ingest_dump.scan_dump(dump, qid_db, False, 2, people=True) == 1
+    assert ingest_dump.next_wanted(conn) == 2  # Q5 is not in the dump
+    assert ingest_dump.scan_dump(dump, qid_db, False, 2) == 1
+    assert ingest_dump.next_wanted(conn) == 1
+    assert ingest_dump.scan_dump(dump, qid_db, False, 2) == 1
+    assert ingest_dump.next_wanted(conn) == 0
+
+    assert qids(conn, "people") == ["Q1"]
+    assert qids(conn, "stored") == ["Q1", "Q10", "Q20"]
+    cache = wikidata_api.get_cache()
+    assert [qid for qid in ("Q1", "Q2", "Q10", "Q20", "Q30") if cache.get(qid)] == ["Q1", "Q10", "Q20"]
+    assert list(ingest_dump.people_batches(conn, size=1)) == [["Q1"]]
+    conn.close()
+
+
+def test_humans_are_selected_without_a_wanted_table(dump, tmp_path):
+    qid_db = str(tmp_path / "qids.db")
+    conn = ingest_dump.open_qid_tables(qid_db)
+
+    assert ingest_dump.scan_dump(dump, qid_db, True, 2, people=True) == 2
+    assert qids(conn, "people") == ["Q1", "Q2"]
+    assert qids(conn, "refs") == ["Q5", "Q10", "Q40"]
+    conn.close()
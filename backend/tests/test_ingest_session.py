@@ -0,0 +1,56 @@
+"""utils/ingest_session.py: a row whose entity write fails is rolled back alone."""
+import sqlite3
+
+import pytest
+
+from entities.WorkType import WorkType
+from utils.ingest_session import IngestSession
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "ingest.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE work_types (id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL)")
+    conn.close()
+    return path
+
+
+def labels(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT label FROM work_types ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_failed_entity_write_rolls_back_its_row_only(db_path):
+    with IngestSession(db_path) as session:
+        with session.row() as cursor:
+            WorkType(cursor=cursor).set_data({"label": "painting"})
+
+        with pytest.raises(sqlite3.IntegrityError):
+            with session.row() as cursor:
+                WorkType(cursor=cursor).set_data({"label": "print"})
+                # the duplicate fails: "print" goes with it, "painting" stays
+                WorkType(cursor=cursor).set_data({"label": "painting"})
+
+        with session.row() as cursor:
+            WorkType(cursor=cursor).set_data({"label": "drawing"})
+
+        assert session.failed == 1
+
+    assert labels(db_path) == ["painting", "drawing"]
+
+
+def test_entity_errors_outside_a_session_are_only_logged(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    WorkType(cursor=cursor).set_data({"label": "painting"})
+    duplicate = WorkType(cursor=cursor)
+    duplicate.set_data({"label": "painting"})
+    conn.commit()
+    conn.close()
+
+    assert duplicate.id is None
+    assert labels(db_path) == ["painting"]
@@ -0,0 +1,30 @@
+"""utils/search.py: the /search payload."""
+import sqlite3
+
+from utils.search import ensure_search_index
+from utils.search import search_all
+
+EVENT_FIELDS = [
+    "id", "qid", "name", "image_url", "description", "start_time", "end_time", "point_in_time",
+    "wiki_url", "lat", "lon", "depth_index", "depth_level", "descendant_count", "parent_id",
+]
+
+
+def test_events_keep_their_fields_when_the_table_grows():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        f"""
+        CREATE TABLE humans (id INTEGER PRIMARY KEY, name TEXT, birth_date INTEGER, death_date INTEGER,
+                             qid TEXT, num_of_identifiers INTEGER);
+        CREATE TABLE locations (id INTEGER PRIMARY KEY, name TEXT, lat REAL, lon REAL, qid TEXT);
+        CREATE TABLE military_events ({", ".join(EVENT_FIELDS)}, start_year INTEGER, end_year INTEGER);
+        INSERT INTO military_events (id, qid, name, start_time, start_year) VALUES (1, 'Q1', 'Battle of Lepanto', '1571', 1571);
+        """
+    )
+    ensure_search_index(conn)
+
+    results = search_all(conn, "lepanto", {"humans": 10, "locations": 10, "events": 10})
+
+    assert [list(event) for event in results["events"]] == [EVENT_FIELDS]
+    conn.close()
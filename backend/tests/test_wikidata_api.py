@@ -0,0 +1,200 @@
+"""dataparsers/wikidata_api.py against a local stub of api.php?action=wbgetentities."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import pytest
+
+from dataparsers import wikidata_api
+
+
+def entity(qid, labels, lastrevid=1):
+    return {
+        "id": qid,
+        "lastrevid": lastrevid,
+        "labels": {lang: {"language": lang, "value": value} for lang, value in labels.items()},
+        "descriptions": {},
+        "claims": {"P31": [{"mainsnak": {"datavalue": {"value": {"id": "Q5"}}}}]},
+    }
+
+
+class StubWikidata:
+    """Entities by id, redirects (from -> to) and every request's query parameters."""
+
+    def __init__(self):
+        self.entities = {f"Q{i}": entity(f"Q{i}", {"en": f"Person {i}"}) for i in range(1, 200)}
+        self.entities["Q500"] = entity("Q500", {"ko": "오직 한국어"})
+        self.redirects = {"Q600": "Q1"}
+        self.requests = []
+
+    def respond(self, params):
+        self.requests.append(params)
+        props = params["props"].split("|")
+        languages = params["languages"].split("|") if "languages" in params else None
+
+        found = {}
+        for qid in params["ids"].split("|"):
+            target = self.redirects.get(qid, qid)
+            if target not in self.entities:
+                found[qid] = {"id": qid, "missing": ""}
+                continue
+            ent = {"id": target, "lastrevid": self.entities[target]["lastrevid"]}
+            for prop in ("labels", "descriptions", "claims"):
+                if prop in props:
+                    values = self.entities[target][prop]
+                    if languages and prop != "claims":
+                        values = {k: v for k, v in values.items() if k in languages}
+                    ent[prop] = values
+            if qid != target:
+                ent["redirects"] = {"from": qid, "to": target}
+            found[target] = ent
+        return {"entities": found}
+
+    def ids_requested(self):
+        return [params["ids"].split("|") for params in self.requests]
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    wikidata = StubWikidata()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+            body = json.dumps(wikidata.respond(params)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(wikidata_api, "WIKIDATA_API_URL", f"http://127.0.0.1:{server.server_port}/w/api.php")
+    monkeypatch.setattr(wikidata_api, "WIKIDATA_CACHE_PATH", str(tmp_path / "wikidata_cache.db"))
+    monkeypatch.setattr(wikidata_api, "WIKIDATA_OFFLINE", False)
+    wikidata_api.reset_process_state()
+
+    yield wikidata
+
+    server.shutdown()
+    server.server_close()
+    wikidata_api.reset_process_state()
+
+
+def test_ids_are_fetched_in_batches_of_fifty(stub):
+    qids = [f"Q{i}" for i in range(1, 121)]
+
+    found = wikidata_api.fetch_entities(qids + qids[:10])
+
+    assert set(found) == set(qids)
+    assert [len(ids) for ids in stub.ids_requested()] == [50, 50, 20]
+
+
+def test_redirected_ids_come_back_under_the_requested_id(stub):
+    found = wikidata_api.fetch_entities(["Q600", "Q2"])
+
+    assert found["Q600"]["id"] == "Q1"
+    assert found["Q2"]["id"] == "Q2"
+
+
+def test_missing_ids_are_left_out(stub):
+    found = wikidata_api.fetch_entities(["Q3", "Q99999"])
+
+    assert set(found) == {"Q3"}
+    assert wikidata_api.fetch_entity("Q99999") is None
+
+
+def test_cached_entities_are_not_downloaded_again(stub):
+    wikidata_api.fetch_entities(["Q1", "Q2"])
+    assert len(stub.requests) == 1
+
+    # from this process's memory
+    assert wikidata_api.fetch_entity("Q1")["id"] == "Q1"
+    # from the on-disk cache after a restart
+    wikidata_api.reset_process_state()
+    assert set(wikidata_api.fetch_entities(["Q1", "Q2"])) == {"Q1", "Q2"}
+    # label lookups are answered by the full entities
+    assert wikidata_api.fetch_label("Q2") == "Person 2"
+
+    assert len(stub.requests) == 1
+
+
+def test_stale_entities_are_revalidated_with_one_info_call(stub, monkeypatch):
+    wikidata_api.fetch_entities(["Q1", "Q2"])
+    stub.entities["Q2"]["lastrevid"] = 2
+    stub.entities["Q2"]["labels"]["en"]["value"] = "Person 2, edited"
+
+    monkeypatch.setattr(wikidata_api, "WIKIDATA_CACHE_TTL", 0)
+    wikidata_api.reset_process_state()
+    found = wikidata_api.fetch_entities(["Q1", "Q2"])
+
+    assert [params["props"] for params in stub.requests[1:]] == ["info", wikidata_api.FULL_PROPS]
+    assert stub.ids_requested()[2] == ["Q2"]
+    assert found["Q2"]["labels"]["en"]["value"] == "Person 2, edited"
+
+
+def test_full_entities_keep_labels_in_every_language(stub):
+    ent = wikidata_api.fetch_entity("Q500")
+
+    assert "languages" not in stub.requests[0]
+    assert ent["labels"]["ko"]["value"] == "오직 한국어"
+
+
+def test_label_lookups_ask_for_the_configured_languages(stub):
+    wikidata_api.prefetch_labels(["Q3", "Q4"])
+    assert wikidata_api.fetch_label("Q3") == "Person 3"
+
+    assert len(stub.requests) == 1
+    assert stub.requests[0]["props"] == wikidata_api.LABEL_PROPS
+    assert stub.requests[0]["languages"] == wikidata_api.WIKIDATA_LANGUAGES
+
+
+def test_prefetch_covers_what_save_from_wikidata_reads(stub):
+    from dataparsers.EntityFromWikidata import EntityFromWikidata
+    from dataparsers.HumanFromWikidata import HumanFromWikidata
+    from dataparsers.LocationFromWikidata import LocationFromWikidata
+    from dataparsers.MovementFromWikidata import MovementFromWikidata
+    from dataparsers.StateFromWikidata import StateFromWikidata
+    from dataparsers.coordinate_resolver import resolve_coordinates_many
+    from entities.Human import Human
+
+    def claim(qid):
+        return [{"mainsnak": {"snaktype": "value", "datavalue": {"value": {"id": qid}}}}]
+
+    def add(qid, label, **claims):
+        stub.entities[qid] = entity(qid, {"en": label})
+        stub.entities[qid]["claims"] = claims
+
+    add("Q1000", "Painter", P31=claim("Q5"), P19=claim("Q1001"), P106=claim("Q1005"), P135=claim("Q1006"), P27=claim("Q1003"))
+    # a birth place without coordinates, in a district with them
+    add("Q1001", "Village", P131=claim("Q1002"), P17=claim("Q1003"), P31=claim("Q1004"))
+    add("Q1002", "District", P625=[{"mainsnak": {"datatype": "globe-coordinate", "datavalue": {"value": {"latitude": 1.0, "longitude": 2.0}}}}])
+    add("Q1003", "Country", P31=claim("Q1008"))
+    add("Q1004", "village")
+    add("Q1005", "painter")
+    add("Q1006", "Impressionism", P31=claim("Q1007"))
+    add("Q1007", "art movement")
+    add("Q1008", "sovereign state")
+
+    human_wiki_entity = HumanFromWikidata("Q1000")
+    Human.prefetch_from_wikidata(human_wiki_entity)
+    requests = len(stub.requests)
+
+    # the lookups save_from_wikidata makes, now answered by the caches
+    assert resolve_coordinates_many([human_wiki_entity.birth_place])["Q1001"].source_chain == ("Q1001", "Q1002")
+    place = LocationFromWikidata(human_wiki_entity.birth_place)
+    assert (place.country_label, place.instance_label, place.lat) == ("Country", "village", 1.0)
+    assert EntityFromWikidata("Q1005").name == "painter"
+    assert MovementFromWikidata("Q1006").instance_label == "art movement"
+    assert StateFromWikidata("Q1003").type == "sovereign state"
+
+    assert len(stub.requests) == requests
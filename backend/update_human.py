@@ -3,6 +3,7 @@ import sqlite3
 import csv  
 import time
 from entities.Human import Human
+from utils.ingest_session import IngestSession
 from entities.HumanLocation import HumanLocation
 from dataparsers.HumanFromWikidata import HumanFromWikidata
 
@@ -17,10 +18,8 @@ def log_results(w, id, name, message):
 
 def update_humans():
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    cursor = conn.cursor()
+    session = IngestSession(DB_PATH)
+    cursor = session.cursor
 
     cursor.execute(
         """SELECT 
@@ -36,7 +35,7 @@ def update_humans():
     rows = [dict(row) for row in results]
 
 
-    with open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
+    with session, open(OUTPUT_CSV, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
         writer.writerow(["id", "name", "Result"])
 
@@ -49,12 +48,16 @@ def update_humans():
                 continue
 
             log_results(writer, row["qid"],human.name, "relatives are updating...")
-            human_wiki_entity = HumanFromWikidata(row["qid"])
-            print(human_wiki_entity.relatives)
-            human.update_relatives(human_wiki_entity.relatives)  
-            conn.commit()
+            try:
+                # the rows so far are committed before waiting on Wikidata
+                session.commit()
+                human_wiki_entity = HumanFromWikidata(row["qid"])
+                print(human_wiki_entity.relatives)
+                with session.row():
+                    human.update_relatives(human_wiki_entity.relatives)  
+            except Exception as e:
+                log_results(writer, row["qid"], human.name, f"❌ rolled back: {e}")
 
-        conn.close()
 
 def update_human_location_sources():
     conn = sqlite3.connect(DB_PATH)
@@ -1,3 +1,6 @@
+import re
+
+
 def year_from_time(t: str | None) -> int | None:
     try:
         if not t:
@@ -7,3 +10,43 @@ def year_from_time(t: str | None) -> int | None:
     except Exception:
         return None
     
+
+
+def extract_year(val) -> int | None:
+    """
+    Year of a stored date in any of the shapes military_events holds:
+    '+1590-01-01T00:00:00Z' -> 1590, '-0058-01-01T00:00:00Z' -> -58, '1590' -> 1590.
+    """
+    if not val:
+        return None
+
+    s = str(val).strip()
+
+    # MÖ için işaret
+    sign = -1 if s.startswith('-') else 1
+
+    # 4 rakam arka arkaya olan kısmı bul
+    m = re.search(r"\d{4}", s)
+    if m:
+        year = int(m.group(0))   # "0053" -> 53
+        return sign * year       # MÖ ise -53, değilse 53
+    return None
+
+
+def event_years(start_time, end_time, point_in_time) -> tuple[int | None, int | None]:
+    """
+    (start_year, end_year) of an event: start_time, else point_in_time; end_time,
+    else the start year. What /militaryevents used to derive per row on every request.
+    """
+    start_year = extract_year(start_time)
+    if start_year is None:
+        start_year = extract_year(point_in_time)
+    end_year = extract_year(end_time)
+    if end_year is None:
+        end_year = start_year
+    return start_year, end_year
+
+
+# Upper bound on a lifetime; guards against missing or bogus death dates.
+HUMAN_MAX_AGE = 100
+
@@ -0,0 +1,155 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.spatial_index import register_spatial_functions
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def connect_readonly(db_path, mmap_size=None, cache_size=None):
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    register_spatial_functions(conn)
+    if mmap_size is not None:
+        conn.execute(f"PRAGMA mmap_size = {int(mmap_size)};")
+    if cache_size is not None:
+        conn.execute(f"PRAGMA cache_size = {int(cache_size)};")
+    return conn
+
+
+class SQLitePool:
+    """
+    Read-only SQLite connection pool shared by the request handlers of one worker.
+
+    Connections are opened once with mode=ro and the query_only / mmap / cache
+    pragmas already applied, so a request only pays for a queue checkout.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        size=8,
+        timeout=10.0,
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64 * 1024,
+    ):
+        self.db_path = str(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+        # metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._in_use = 0
+        self._checkout_seconds = 0.0
+        self._checkout_max = 0.0
+        self._wait_seconds = 0.0
+        self._wait_max = 0.0
+
+    def _open(self):
+        return connect_readonly(self.db_path, self.mmap_size, self.cache_size)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait(), False
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open(), False
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        # pool exhausted: wait for a connection to come back
+        try:
+            return self._idle.get(timeout=self.timeout), True
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(
+                f"no SQLite connection available after {self.timeout}s (pool size {self.size})"
+            )
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        conn, waited = self._acquire()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._checkout_seconds += elapsed
+            self._checkout_max = max(self._checkout_max, elapsed)
+            if waited:
+                self._waits += 1
+                self._wait_seconds += elapsed
+                self._wait_max = max(self._wait_max, elapsed)
+
+        try:
+            yield conn
+        finally:
+            # drop any half-read cursor state before handing the connection back
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._in_use -= 1
+            self._release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    def metrics(self):
+        with self._lock:
+            checkouts = self._checkouts or 1
+            waits = self._waits or 1
+            return {
+                "db_path": self.db_path,
+                "size": self.size,
+                "open": self._opened,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "checkout_ms_avg": round(self._checkout_seconds / checkouts * 1000, 3),
+                "checkout_ms_max": round(self._checkout_max * 1000, 3),
+                "wait_ms_avg": round(self._wait_seconds / waits * 1000, 3) if self._waits else 0.0,
+                "wait_ms_max": round(self._wait_max * 1000, 3),
+            }
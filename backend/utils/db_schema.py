@@ -0,0 +1,182 @@
+import sqlite3
+
+from utils.date_utils import event_years
+from utils.event_hierarchy import ensure_event_hierarchy
+from utils.search import ensure_search_index
+from utils.spatial_index import ensure_spatial_index
+
+
+# Idempotent schema additions the API relies on. They are applied with a
+# writable connection before the read-only pool starts serving.
+INDEXES = [
+    # interval index for "alive in year" lookups: birth_date is range-scanned,
+    # death_date is checked from the index without touching the table
+    "CREATE INDEX IF NOT EXISTS idx_humans_birth_death ON humans(birth_date, death_date)",
+    "CREATE INDEX IF NOT EXISTS idx_human_location_human_type ON human_location(human_id, relationship_type_id)",
+    # people born in a set of places: bbox= / near= on /search (utils/spatial_index.py)
+    "CREATE INDEX IF NOT EXISTS idx_human_location_location_type ON human_location(location_id, relationship_type_id)",
+    # per-person lookups of the person panel (utils/person_details.py)
+    "CREATE INDEX IF NOT EXISTS idx_human_human_human ON human_human(human_id)",
+    "CREATE INDEX IF NOT EXISTS idx_human_occupation_human ON human_occupation(human_id)",
+    "CREATE INDEX IF NOT EXISTS idx_human_movement_human ON human_movement(human_id)",
+    "CREATE INDEX IF NOT EXISTS idx_human_collection_human ON human_collection(human_id)",
+    "CREATE INDEX IF NOT EXISTS idx_citizenships_human ON citizenships(human_id)",
+    # "active in year window" lookups of /militaryevents
+    "CREATE INDEX IF NOT EXISTS idx_military_events_years ON military_events(start_year, end_year)",
+]
+
+
+# natural keys of the link tables: the conflict targets of BaseEntity.bulk_upsert()
+# (the entities' UNIQUE_KEYS), enforced by ux_<table>_<keys> unique indexes
+UNIQUE_KEYS = [
+    ("human_occupation", ("human_id", "occupation_id")),
+    ("human_movement", ("human_id", "movement_id")),
+    ("human_location", ("human_id", "location_id", "relationship_type_id")),
+    ("human_human", ("human_id", "related_human_id", "relationship_type_id")),
+    ("citizenships", ("human_id", "state_id")),
+    ("human_collection", ("human_id", "collection_id")),
+]
+
+
+# how merge_duplicate_links() combines a column over rows repeating a key; other
+# columns keep the oldest row's value, filled from a newer copy when it is empty
+MERGED_COLUMNS = {
+    "human_occupation": {"is_primary": "MAX"},
+}
+
+MIGRATE_COMMAND = "python scripts/migrate_db.py --merge-duplicates"
+
+
+def unique_index_name(table, keys) -> str:
+    return f"ux_{table}_{'_'.join(keys)}"
+
+
+# (table, column, type) added to databases created before the column existed
+COLUMNS = [
+    # Wikidata revision a person was last parsed from (refresh_humans.py)
+    ("humans", "lastrevid", "INTEGER"),
+    # years of start_time / end_time / point_in_time, written with them (MilitaryEvent)
+    ("military_events", "start_year", "INTEGER"),
+    ("military_events", "end_year", "INTEGER"),
+]
+
+
+def ensure_columns(conn):
+    for table, column, column_type in COLUMNS:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if existing and column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def _duplicate_keys(conn, table, keys) -> int:
+    """Number of keys of `table` held by more than one row."""
+    key_list = ", ".join(keys)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {key_list} HAVING COUNT(*) > 1)"
+    ).fetchone()[0]
+
+
+def merge_duplicate_links(conn) -> dict:
+    """
+    One-time migration for databases written before the unique indexes existed:
+    rows repeating a link table key are merged into the oldest one, the row the
+    lookups by key already returned, and the newer copies deleted. Returns the
+    rows removed per table.
+    """
+    removed = {}
+    for table, keys in UNIQUE_KEYS:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if not columns or not _duplicate_keys(conn, table, keys):
+            continue
+
+        same_key = " AND ".join(f"o.{k} = {table}.{k}" for k in keys)
+        merged = MERGED_COLUMNS.get(table, {})
+        assignments = []
+        for column in columns:
+            if column == "id" or column in keys:
+                continue
+            if column in merged:
+                value = f"(SELECT {merged[column]}(o.{column}) FROM {table} AS o WHERE {same_key})"
+            else:
+                value = (
+                    f"COALESCE(NULLIF({column}, ''), (SELECT o.{column} FROM {table} AS o WHERE {same_key} "
+                    f"AND NULLIF(o.{column}, '') IS NOT NULL ORDER BY o.id LIMIT 1), {column})"
+                )
+            assignments.append(f"{column} = {value}")
+
+        key_list = ", ".join(keys)
+        if assignments:
+            conn.execute(
+                f"""
+                UPDATE {table} SET {", ".join(assignments)}
+                WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY {key_list} HAVING COUNT(*) > 1)
+                """
+            )
+        removed[table] = conn.execute(
+            f"DELETE FROM {table} WHERE EXISTS (SELECT 1 FROM {table} AS o WHERE {same_key} AND o.id < {table}.id)"
+        ).rowcount
+        print(f"🧹 merged {removed[table]} duplicate ({', '.join(keys)}) rows of {table} into their oldest copy")
+    return removed
+
+
+def ensure_unique_keys(conn):
+    """
+    Unique indexes on the link tables' natural keys. A table still holding rows
+    that repeat a key is left without its index (and BaseEntity.bulk_upsert()
+    refuses to write to it) until merge_duplicate_links() has run.
+    """
+    for table, keys in UNIQUE_KEYS:
+        if not conn.execute(f"PRAGMA table_info({table})").fetchall():
+            continue
+        name = unique_index_name(table, keys)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+            continue
+        duplicates = _duplicate_keys(conn, table, keys)
+        if duplicates:
+            print(f"❌ {table} has {duplicates} duplicate ({', '.join(keys)}) keys, no unique index: run {MIGRATE_COMMAND}")
+            continue
+        conn.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(keys)})")
+
+
+def backfill_military_event_years(conn):
+    """start_year / end_year of events written before the columns existed, or by raw SQL."""
+    conn.create_function("event_start_year", 2, lambda s, p: event_years(s, None, p)[0], deterministic=True)
+    conn.create_function("event_end_year", 3, lambda s, e, p: event_years(s, e, p)[1], deterministic=True)
+    conn.execute(
+        """
+        UPDATE military_events
+        SET start_year = event_start_year(start_time, point_in_time),
+            end_year = event_end_year(start_time, end_time, point_in_time)
+        WHERE start_year IS NULL
+          AND COALESCE(start_time, end_time, point_in_time) IS NOT NULL
+        """
+    )
+
+
+def enable_wal(conn):
+    """
+    WAL lets the API's read-only connections keep reading the last committed state
+    while a script writes; synchronous=NORMAL syncs at checkpoints instead of on
+    every commit. The journal mode is stored in the file, so it is set once.
+    """
+    mode = conn.execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    return mode
+
+
+def ensure_schema(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        # readers keep serving while an ingest script writes (utils/ingest_session.py)
+        enable_wal(conn)
+        ensure_columns(conn)
+        backfill_military_event_years(conn)
+        for statement in INDEXES:
+            conn.execute(statement)
+        ensure_unique_keys(conn)
+        ensure_search_index(conn)
+        ensure_event_hierarchy(conn)
+        ensure_spatial_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
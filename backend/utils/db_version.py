@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from utils.db_pool import connect_readonly
+
+
+def _read_release_file(db_path: Path) -> str:
+    try:
+        return (db_path.parent / "db_version.txt").read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def _stat_token(path: Path) -> str:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "-"
+    return f"{st.st_ino}.{st.st_mtime_ns}.{st.st_size}"
+
+
+def db_release(db_path) -> str:
+    """
+    Identity of the installed database: the release written by scripts/fetch_db.py
+    and the inode of the file it swapped into place. Changes only on a new install.
+    """
+    db_path = Path(db_path)
+    try:
+        inode = os.stat(db_path).st_ino
+    except OSError:
+        inode = "-"
+    return f"{_read_release_file(db_path)}:{inode}"
+
+
+def db_version(db_path) -> str:
+    """
+    Cheap token that changes whenever the database does: the installed release plus
+    the mtime of the DB file and its WAL. Anything derived from the DB can be cached
+    under this token.
+    """
+    db_path = Path(db_path)
+    return ":".join(
+        [
+            _read_release_file(db_path),
+            _stat_token(db_path),
+            _stat_token(Path(f"{db_path}-wal")),
+        ]
+    )
+
+
+class VersionedSnapshot:
+    """
+    Holds an in-memory structure built from the database and swaps in a rebuilt one
+    when the database changes. A new release is picked up on the next call; plain
+    writes to the live file at most once every `refresh_seconds`, so an ingest
+    running next to the API does not trigger a rebuild per commit.
+
+    Readers always get a complete snapshot: the new one is built on the side and
+    replaces the old reference in one assignment.
+    """
+
+    def __init__(self, db_path, build, refresh_seconds=60.0):
+        self.db_path = db_path
+        self.build = build
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._current = None
+        self._release = None
+        self._version = None
+        self._built_at = 0.0
+
+    def _is_fresh(self, release, version):
+        if self._current is None or release != self._release:
+            return False
+        if version == self._version:
+            return True
+        return time.monotonic() - self._built_at < self.refresh_seconds
+
+    def get(self):
+        release = db_release(self.db_path)
+        version = db_version(self.db_path)
+        if self._is_fresh(release, version):
+            return self._current
+
+        # someone else is rebuilding: keep serving the previous snapshot meanwhile
+        if not self._lock.acquire(blocking=self._current is None):
+            return self._current
+        try:
+            if self._is_fresh(release, version):
+                return self._current
+
+            started = time.perf_counter()
+            conn = connect_readonly(self.db_path)
+            try:
+                snapshot = self.build(conn, version)
+            finally:
+                conn.close()
+
+            self._current = snapshot
+            self._release = release
+            self._version = version
+            self._built_at = time.monotonic()
+            print(f"✅ rebuilt {type(snapshot).__name__} in {time.perf_counter() - started:.2f}s ({version})")
+            return snapshot
+        finally:
+            self._lock.release()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import NamedTuple
+
+
+class CachedEntity(NamedTuple):
+    entity: dict
+    lastrevid: int | None
+    fetched_at: float
+    fresh: bool
+
+
+class EntityCache:
+    """
+    On-disk cache of Wikidata entity JSON, keyed by QID.
+
+    Bodies are stored once per content hash (zlib-compressed, canonical JSON), so
+    the many QIDs that redirect to one entity, or an entity re-fetched without
+    changes, share a blob. Each QID remembers the lastrevid it was fetched at;
+    after `ttl_seconds` an entry is stale and should be revalidated against the
+    current revision before it is used again.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entity_blobs (hash TEXT PRIMARY KEY, body BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                qid TEXT PRIMARY KEY,
+                lastrevid INTEGER,
+                fetched_at REAL NOT NULL,
+                hash TEXT NOT NULL
+            )
+            """
+        )
+
+    def get(self, qid) -> CachedEntity | None:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT e.lastrevid, e.fetched_at, b.body
+                FROM entities e JOIN entity_blobs b ON b.hash = e.hash
+                WHERE e.qid = ?
+                """,
+                (qid,),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            lastrevid, fetched_at, body = row
+            fresh = time.time() - fetched_at < self.ttl_seconds
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+
+        return CachedEntity(json.loads(zlib.decompress(body)), lastrevid, fetched_at, fresh)
+
+    def put(self, qid, entity: dict):
+        self.put_many([(qid, entity)])
+
+    def put_many(self, items):
+        """Stores (qid, entity) pairs in one transaction."""
+        rows = []
+        for qid, entity in items:
+            body = json.dumps(entity, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            rows.append((qid, entity.get("lastrevid"), hashlib.sha1(body).hexdigest(), body))
+        if not rows:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for qid, lastrevid, content_hash, body in rows:
+                    old = self._conn.execute("SELECT hash FROM entities WHERE qid = ?", (qid,)).fetchone()
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO entity_blobs (hash, body) VALUES (?, ?)",
+                        (content_hash, zlib.compress(body, 6)),
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO entities (qid, lastrevid, fetched_at, hash) VALUES (?, ?, ?, ?)",
+                        (qid, lastrevid, now, content_hash),
+                    )
+                    if old and old[0] != content_hash:
+                        self._conn.execute(
+                            "DELETE FROM entity_blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM entities WHERE hash = ?)",
+                            (old[0], old[0]),
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.writes += len(rows)
+
+    def touch(self, qids):
+        """Marks entries as fresh again, e.g. after their revision was found unchanged."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("UPDATE entities SET fetched_at = ? WHERE qid = ?", [(now, qid) for qid in qids])
+
+    def metrics(self) -> dict:
+        with self._lock:
+            entities, blobs = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM entities), (SELECT COUNT(*) FROM entity_blobs)"
+            ).fetchone()
+            return {
+                "path": self.path,
+                "entities": entities,
+                "blobs": blobs,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,224 @@
+# Closure table of the military_events hierarchy: one row per (ancestor, descendant)
+# pair, the event itself included at depth 0. Subtrees, ancestors and descendant
+# counts become range lookups on its primary key instead of LIKE scans over
+# depth_index. Triggers keep it in step with every insert, delete and re-parenting.
+import time
+
+CLOSURE_TABLE = "military_event_closure"
+
+# cuts off a parent_id cycle already present in the data when the table is filled
+MAX_DEPTH = 64
+
+# the earlier delete trigger, which kept ancestor -> descendant pairs through a
+# deleted inner event
+LEGACY_TRIGGERS = [f"{CLOSURE_TABLE}_ad"]
+
+STATEMENTS = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {CLOSURE_TABLE} (
+        ancestor_id INTEGER NOT NULL,
+        descendant_id INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor_id, descendant_id)
+    ) WITHOUT ROWID
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{CLOSURE_TABLE}_descendant ON {CLOSURE_TABLE}(descendant_id, depth)",
+    "CREATE INDEX IF NOT EXISTS idx_military_events_parent ON military_events(parent_id)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CLOSURE_TABLE}_ai AFTER INSERT ON military_events BEGIN
+        INSERT OR IGNORE INTO {CLOSURE_TABLE}(ancestor_id, descendant_id, depth)
+        SELECT new.id, new.id, 0
+        UNION ALL
+        SELECT ancestor_id, new.id, depth + 1 FROM {CLOSURE_TABLE} WHERE descendant_id = new.parent_id;
+    END
+    """,
+    # deleting an event leaves its children as roots: every pair running through
+    # it goes, from its ancestors and itself to its descendants and itself
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CLOSURE_TABLE}_bd BEFORE DELETE ON military_events BEGIN
+        DELETE FROM {CLOSURE_TABLE}
+        WHERE descendant_id IN (SELECT descendant_id FROM {CLOSURE_TABLE} WHERE ancestor_id = old.id)
+          AND ancestor_id IN (SELECT ancestor_id FROM {CLOSURE_TABLE} WHERE descendant_id = old.id);
+    END
+    """,
+    # an event cannot move under itself or one of its own descendants
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CLOSURE_TABLE}_bu BEFORE UPDATE OF parent_id ON military_events
+    WHEN new.parent_id IS NOT NULL BEGIN
+        SELECT RAISE(ABORT, 'military_events.parent_id would create a cycle')
+        WHERE EXISTS (
+            SELECT 1 FROM {CLOSURE_TABLE} WHERE ancestor_id = new.id AND descendant_id = new.parent_id
+        );
+    END
+    """,
+    # re-parenting: detach the subtree from its old ancestors, attach it under the
+    # new parent's; two set-based statements whatever the size of the subtree
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CLOSURE_TABLE}_au AFTER UPDATE OF parent_id ON military_events
+    WHEN old.parent_id IS NOT new.parent_id BEGIN
+        DELETE FROM {CLOSURE_TABLE}
+        WHERE descendant_id IN (SELECT descendant_id FROM {CLOSURE_TABLE} WHERE ancestor_id = new.id)
+          AND ancestor_id IN (SELECT ancestor_id FROM {CLOSURE_TABLE} WHERE descendant_id = new.id AND depth > 0);
+        INSERT INTO {CLOSURE_TABLE}(ancestor_id, descendant_id, depth)
+        SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1
+        FROM {CLOSURE_TABLE} AS a, {CLOSURE_TABLE} AS d
+        WHERE a.descendant_id = new.parent_id AND d.ancestor_id = new.id;
+    END
+    """,
+]
+
+
+def rebuild_closure(conn):
+    """Refills the closure table from military_events.parent_id."""
+    conn.execute(f"DELETE FROM {CLOSURE_TABLE}")
+    conn.execute(
+        f"""
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM military_events
+            UNION ALL
+            SELECT tree.ancestor_id, me.id, tree.depth + 1
+            FROM tree JOIN military_events AS me ON me.parent_id = tree.descendant_id
+            WHERE tree.depth < ?
+        )
+        INSERT OR IGNORE INTO {CLOSURE_TABLE}(ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        """,
+        (MAX_DEPTH,),
+    )
+
+
+def ensure_event_hierarchy(conn):
+    """Creates the closure table and its triggers; a new table is filled once."""
+    exists = has_event_hierarchy(conn)
+    stale = False
+    for trigger in LEGACY_TRIGGERS:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (trigger,)).fetchone():
+            conn.execute(f"DROP TRIGGER {trigger}")
+            stale = True
+    for statement in STATEMENTS:
+        conn.execute(statement)
+    if not exists or stale:
+        if stale:
+            print(f"🧹 {CLOSURE_TABLE}: replaced the old delete trigger, rebuilding")
+        rebuild_closure(conn)
+
+
+def has_event_hierarchy(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (CLOSURE_TABLE,)
+    ).fetchone() is not None
+
+
+def subtree_sql(column="id") -> str:
+    """`column IN (...)` condition matching an event (the ? parameter) and all its descendants."""
+    return f"{column} IN (SELECT descendant_id FROM {CLOSURE_TABLE} WHERE ancestor_id = ?)"
+
+
+def _path(conn, event_id):
+    """(depth_index, depth_level) of an event from its ancestors in the closure table."""
+    path = [
+        str(row[0])
+        for row in conn.execute(
+            f"SELECT ancestor_id FROM {CLOSURE_TABLE} WHERE descendant_id = ? ORDER BY depth DESC",
+            (event_id,),
+        )
+    ]
+    path = path or [str(event_id)]
+    return "_".join(path), len(path)
+
+
+def recompute_depths(conn, root_id=None) -> int:
+    """
+    depth_index and depth_level of the subtree under `root_id` (every tree when
+    None) in one recursive CTE walking down parent_id. Events whose parent does
+    not exist count as roots. Returns the number of rows written.
+    """
+    if root_id is None:
+        seed = """
+            SELECT id, CAST(id AS TEXT), 1 FROM military_events AS me
+            WHERE parent_id IS NULL
+               OR NOT EXISTS (SELECT 1 FROM military_events AS p WHERE p.id = me.parent_id)
+        """
+        params = ()
+    else:
+        seed = "SELECT ?, ?, ?"
+        params = (root_id, *_path(conn, root_id))
+
+    # rowcount is not reported for statements that start with WITH
+    db = getattr(conn, "connection", conn)
+    changes = db.total_changes
+    conn.execute(
+        f"""
+        WITH RECURSIVE tree(id, depth_index, depth_level) AS (
+            {seed}
+            UNION ALL
+            SELECT me.id, tree.depth_index || '_' || me.id, tree.depth_level + 1
+            FROM military_events AS me JOIN tree ON me.parent_id = tree.id
+            WHERE tree.depth_level < ?
+        )
+        UPDATE military_events
+        SET depth_index = tree.depth_index, depth_level = tree.depth_level
+        FROM tree
+        WHERE military_events.id = tree.id
+          AND (military_events.depth_index IS NOT tree.depth_index
+               OR military_events.depth_level IS NOT tree.depth_level)
+        """,
+        (*params, MAX_DEPTH),
+    )
+    return db.total_changes - changes
+
+
+def recompute_descendant_counts(conn, root_id=None) -> int:
+    """descendant_count of the subtree under `root_id` (every event when None), one grouped UPDATE."""
+    scope = ""
+    params = ()
+    if root_id is not None:
+        scope = f"WHERE c.ancestor_id IN (SELECT descendant_id FROM {CLOSURE_TABLE} WHERE ancestor_id = ?)"
+        params = (root_id,)
+
+    cursor = conn.execute(
+        f"""
+        UPDATE military_events
+        SET descendant_count = counts.n
+        FROM (
+            SELECT c.ancestor_id AS id, COUNT(*) - 1 AS n
+            FROM {CLOSURE_TABLE} AS c
+            {scope}
+            GROUP BY c.ancestor_id
+        ) AS counts
+        WHERE military_events.id = counts.id
+          AND military_events.descendant_count IS NOT counts.n
+        """,
+        params,
+    )
+    return cursor.rowcount
+
+
+def recompute_hierarchy(conn, root_id=None, rebuild=False) -> dict:
+    """
+    Brings depth_index, depth_level and descendant_count of a subtree (or of the
+    whole table) back in line with parent_id. `rebuild` refills the closure
+    table first, for a database whose parent_id was edited with the triggers
+    missing.
+    """
+    timings = {}
+    started = time.perf_counter()
+    if rebuild:
+        rebuild_closure(conn)
+        timings["closure_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    step = time.perf_counter()
+    depths = recompute_depths(conn, root_id)
+    timings["depths_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    step = time.perf_counter()
+    counts = recompute_descendant_counts(conn, root_id)
+    timings["counts_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    return {
+        "root_id": root_id,
+        "depths_updated": depths,
+        "counts_updated": counts,
+        **timings,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
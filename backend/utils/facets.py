@@ -0,0 +1,157 @@
+import numpy as np
+
+from utils.human_snapshot import Postings
+
+
+# facet -> (membership query, filters that narrow it). The filter sets are the ones
+# the individual /movements, /occupations, ... endpoints have always applied.
+FACETS = {
+    "movements": (
+        "SELECT movement_id, human_id FROM human_movement",
+        ("occupation_id", "gender_id", "nationality_id"),
+    ),
+    "occupations": (
+        "SELECT occupation_id, human_id FROM human_occupation WHERE is_primary = 1",
+        ("movement_id", "gender_id", "nationality_id"),
+    ),
+    "genders": (
+        "SELECT gender_id, id FROM humans",
+        ("movement_id", "occupation_id", "nationality_id"),
+    ),
+    "nationalities": (
+        "SELECT nationality_id, id FROM humans",
+        ("movement_id", "occupation_id", "gender_id"),
+    ),
+    "collections": (
+        "SELECT collection_id, human_id FROM human_collection",
+        ("movement_id", "occupation_id", "gender_id", "nationality_id"),
+    ),
+}
+
+# query-string filter -> facet whose posting list it selects
+FILTER_FACETS = {
+    "movement_id": "movements",
+    "occupation_id": "occupations",
+    "gender_id": "genders",
+    "nationality_id": "nationalities",
+    "collection_id": "collections",
+}
+
+META_QUERIES = {
+    "movements": """
+        SELECT id, name, COALESCE(inception, start_date) AS start_date, end_date,
+               instance_label, start_date AS sort_date
+        FROM movements
+    """,
+    "occupations": "SELECT id, name FROM occupations",
+    "genders": "SELECT id, name FROM genders",
+    "nationalities": "SELECT id, name FROM nationalities",
+    "collections": "SELECT id, name FROM collections",
+}
+
+MOVEMENT_LIMIT = 1000
+
+
+def _sqlite_sort_key(value):
+    # ORDER BY on a mixed-type column: NULLs, then numbers, then text
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+class FacetIndex:
+    """
+    Facet counts for the filter panel. Every facet value keeps the sorted set of
+    humans it applies to (a sparse, posting-list encoded bitmap over a dense human
+    index). A request ANDs the selected values into one dense filter bitmap and
+    counts every value of every facet against it in a single vectorized pass.
+    """
+
+    def __init__(self, human_ids: np.ndarray, postings: dict, meta: dict, version: str):
+        self.version = version
+        self.human_ids = human_ids
+        self.postings = postings
+        self.meta = meta
+
+    @classmethod
+    def build(cls, conn, version="") -> "FacetIndex":
+        raw = {}
+        for facet, (query, _) in FACETS.items():
+            pairs = [r for r in conn.execute(query).fetchall() if r[0] is not None and r[1] is not None]
+            keys = np.fromiter((r[0] for r in pairs), dtype=np.int64, count=len(pairs))
+            humans = np.fromiter((r[1] for r in pairs), dtype=np.int64, count=len(pairs))
+            raw[facet] = (keys, humans)
+
+        human_ids = np.unique(np.concatenate([humans for _, humans in raw.values()]))
+
+        postings = {}
+        for facet, (keys, humans) in raw.items():
+            # a human counts once per value, whatever duplicates the join tables hold
+            pairs = np.unique(np.stack([keys, np.searchsorted(human_ids, humans)], axis=1), axis=0)
+            postings[facet] = Postings.build(pairs[:, 0], pairs[:, 1])
+
+        meta = {}
+        for facet, query in META_QUERIES.items():
+            meta[facet] = {row["id"]: dict(row) for row in conn.execute(query).fetchall()}
+
+        return cls(human_ids, postings, meta, version)
+
+    def _filter_bitmap(self, filters: dict, dimensions) -> np.ndarray | None:
+        bitmap = None
+        for key in dimensions:
+            value = filters.get(key)
+            if value is None:
+                continue
+            selected = np.zeros(len(self.human_ids), dtype=bool)
+            selected[self.postings[FILTER_FACETS[key]].get(value)] = True
+            bitmap = selected if bitmap is None else bitmap & selected
+        return bitmap
+
+    def counts(self, facet: str, filters: dict) -> dict:
+        """{value id: number of matching humans} for one facet; zero counts are dropped."""
+        _, dimensions = FACETS[facet]
+        postings = self.postings[facet]
+        if len(postings.keys) == 0:
+            return {}
+
+        bitmap = self._filter_bitmap(filters, dimensions)
+        if bitmap is None:
+            per_key = np.diff(postings.indptr)
+        else:
+            per_key = np.add.reduceat(bitmap[postings.values].astype(np.int64), postings.indptr[:-1])
+
+        nonzero = np.flatnonzero(per_key)
+        return dict(zip(postings.keys[nonzero].tolist(), per_key[nonzero].tolist()))
+
+    def facet(self, facet: str, filters: dict) -> list[dict]:
+        """Rows in the shape the per-facet endpoints return, in their order."""
+        meta = self.meta[facet]
+        rows = []
+        for value_id, count in self.counts(facet, filters).items():
+            row = meta.get(value_id)
+            if row is None:
+                continue
+            rows.append({**row, "count": count})
+
+        if facet == "movements":
+            rows.sort(key=lambda r: -r["count"])
+            rows.sort(key=lambda r: _sqlite_sort_key(r["sort_date"]))
+            return [
+                {
+                    "id": r["id"],
+                    "name": r["name"],
+                    "count": r["count"],
+                    "start_date": r["start_date"],
+                    "end_date": r["end_date"],
+                    "instance_label": r["instance_label"],
+                }
+                for r in rows[:MOVEMENT_LIMIT]
+            ]
+
+        rows.sort(key=lambda r: -r["count"])
+        return [{"id": r["id"], "name": r["name"], "count": r["count"]} for r in rows]
+
+    def all_facets(self, filters: dict) -> dict:
+        return {facet: self.facet(facet, filters) for facet in FACETS}
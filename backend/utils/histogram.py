@@ -0,0 +1,45 @@
+import numpy as np
+
+from utils.date_utils import HUMAN_MAX_AGE
+
+MIN_YEAR = -10000
+
+
+def build_alive_histogram(births: np.ndarray, deaths: np.ndarray, current_year: int) -> dict:
+    """
+    Alive-count per year via a difference array: +1 at birth, -1 the year after the
+    person was last alive, then a prefix sum. A death year of 0 means "unknown";
+    a lifetime ends at birth + HUMAN_MAX_AGE at the latest, both years counted,
+    as in buildAliveCounts in the frontend.
+
+    The range follows getFullRange in the frontend: earliest birth up to the latest
+    death, or up to the current year when someone without a death year was born
+    less than HUMAN_MAX_AGE years ago.
+    """
+    if births.size == 0:
+        return {"range": [current_year - 10, current_year], "counts": [0] * 11}
+
+    has_death = deaths != 0
+    last_alive = births + HUMAN_MAX_AGE
+    last_alive = np.where(has_death, np.minimum(deaths, last_alive), last_alive)
+
+    start = max(int(births.min()), MIN_YEAR)
+    # getFullRange's own test (strict), so the range is the client's too
+    someone_alive = bool(np.any(~has_death & (births + HUMAN_MAX_AGE > current_year)))
+    if someone_alive or not has_death.any():
+        end = current_year
+    else:
+        end = int(deaths[has_death].max())
+    if end < start:
+        end = start
+
+    size = end - start + 1
+    first = np.maximum(births, start)
+    last = np.minimum(last_alive, end)
+    valid = last >= first
+
+    diff = np.bincount(first[valid] - start, minlength=size + 1)
+    diff -= np.bincount(last[valid] - start + 1, minlength=size + 1)
+    counts = np.cumsum(diff[:size])
+
+    return {"range": [start, end], "counts": counts.tolist()}
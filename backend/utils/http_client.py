@@ -0,0 +1,259 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "BirdView/1.0 (gulsenyilmaz9@gmail.com)"
+
+# requests per second (and burst) each host gets from this process. Wikidata asks
+# bots to stay polite and the query service allows ~60s of query time per minute;
+# the MET API documents 80 requests per second.
+HOST_RATES = {
+    "www.wikidata.org": (10.0, 20),
+    "query.wikidata.org": (2.0, 5),
+    "collectionapi.metmuseum.org": (40.0, 80),
+}
+DEFAULT_RATE = (10.0, 10)
+
+# "host=rate[:burst],..." overrides the table above, e.g. "www.wikidata.org=20:40"
+HTTP_RATE_LIMITS = os.getenv("HTTP_RATE_LIMITS", "")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.8
+MAX_WAIT_SECONDS = 120
+REQUEST_TIMEOUT = 30
+POOL_SIZE = 32
+
+# upper bounds (ms) of the latency histogram buckets; the last one catches the rest
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class TokenBucket:
+    """`rate` requests per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Blocks until a request may go out; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+                else:
+                    delay = self._paused_until - now
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Holds every caller back for `seconds` (the server asked us to slow down)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.latency_ms_total = 0.0
+        self.wait_ms_total = 0.0
+        self.statuses = {}
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def observe(self, latency_ms, status, size):
+        self.requests += 1
+        self.latency_ms_total += latency_ms
+        self.bytes += size
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.latency_buckets[i] += 1
+                break
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "bytes": self.bytes,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "latency_ms_avg": round(self.latency_ms_total / self.requests, 3) if self.requests else 0.0,
+            "rate_limit_wait_ms": round(self.wait_ms_total, 3),
+            "latency_ms_histogram": {
+                ("+Inf" if bound == float("inf") else f"le_{bound}"): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.latency_buckets)
+            },
+        }
+
+
+def _parse_rate_limits(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        rates[host.strip()] = (float(rate), int(burst) if burst else max(1, int(float(rate))))
+    return rates
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """
+    One pooled requests.Session for every outbound call of the process, with a
+    token bucket per host, retries with backoff (honouring Retry-After on 429 /
+    503) and per-host request metrics. Thread-safe.
+    """
+
+    def __init__(self, host_rates=None, default_rate=DEFAULT_RATE, pool_size=POOL_SIZE):
+        self.host_rates = {**HOST_RATES, **_parse_rate_limits(HTTP_RATE_LIMITS), **(host_rates or {})}
+        self.default_rate = default_rate
+
+        self.session = requests.Session()
+        # retries are ours (they need the rate limiter), the adapter only pools
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT})
+
+        self._buckets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_rates.get(host, self.default_rate)
+                bucket = self._buckets[host] = TokenBucket(rate, burst)
+                self._metrics[host] = HostMetrics()
+            return bucket, self._metrics[host]
+
+    def request(
+        self,
+        method,
+        url,
+        *,
+        retry_statuses=RETRY_STATUSES,
+        max_retries=MAX_RETRIES,
+        timeout=REQUEST_TIMEOUT,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Like requests.request. The response of the last attempt is returned (check
+        its status as usual); network errors are raised once retries run out.
+        """
+        host = urlsplit(url).netloc
+        bucket, metrics = self._host_state(host)
+
+        for attempt in range(max_retries + 1):
+            waited = bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                with self._lock:
+                    metrics.errors += 1
+                    metrics.wait_ms_total += waited * 1000
+                    if attempt < max_retries:
+                        metrics.retries += 1
+                if attempt >= max_retries:
+                    raise
+                wait = self._backoff(attempt)
+                print(f"⚠️ {host} network error (try {attempt + 1}/{max_retries + 1}): {e} → {wait:.2f}s")
+                time.sleep(wait)
+                continue
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            size = len(response.content) if not kwargs.get("stream") else int(response.headers.get("Content-Length") or 0)
+            with self._lock:
+                metrics.observe(latency_ms, response.status_code, size)
+                metrics.wait_ms_total += waited * 1000
+                if response.status_code == 429:
+                    metrics.throttled += 1
+
+            if response.status_code not in retry_statuses or attempt >= max_retries:
+                return response
+
+            retry_after = _retry_after_seconds(response)
+            wait = min(MAX_WAIT_SECONDS, retry_after if retry_after is not None else self._backoff(attempt))
+            with self._lock:
+                metrics.retries += 1
+            print(f"⏳ {host} answered {response.status_code}, retrying in {wait:.2f}s ({attempt + 1}/{max_retries})")
+            response.close()
+            if response.status_code in (429, 503):
+                # the whole host is asking for a break, not just this request;
+                # the next acquire() waits it out
+                bucket.pause(wait)
+            else:
+                time.sleep(wait)
+
+        return response
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(MAX_WAIT_SECONDS, BACKOFF_SECONDS * (2 ** attempt) + random.uniform(0, 0.5))
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                host: {
+                    **metrics.as_dict(),
+                    "rate_per_second": self._buckets[host].rate,
+                    "burst": int(self._buckets[host].capacity),
+                }
+                for host, metrics in sorted(self._metrics.items())
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,239 @@
+import numpy as np
+
+from utils.date_utils import HUMAN_MAX_AGE
+
+
+# One row per (human, birth place), the same rows /humans used to join for.
+SNAPSHOT_QUERY = """
+    SELECT
+        h.id, h.name, h.birth_date, h.death_date,
+        n.name AS nationality, g.name AS gender,
+        l.lat AS lat, l.lon AS lon, l.name AS city, l.id AS city_id,
+        h.num_of_identifiers, h.qid, h.img_url,
+        h.gender_id, h.nationality_id
+    FROM humans h
+    INNER JOIN human_location hl ON hl.human_id = h.id
+    INNER JOIN locations l ON hl.location_id = l.id
+    INNER JOIN genders g ON g.id = h.gender_id
+    INNER JOIN nationalities n ON n.id = h.nationality_id
+    WHERE
+        h.birth_date IS NOT NULL
+        AND h.birth_date != 0
+        AND hl.relationship_type_id = 4
+    ORDER BY l.id, h.birth_date, h.id
+"""
+
+AWARDED_QUERY = "SELECT DISTINCT creator_id FROM works WHERE type_id = 19 AND creator_id IS NOT NULL"
+
+POSTING_QUERIES = {
+    "movement": "SELECT movement_id, human_id FROM human_movement",
+    "collection": "SELECT collection_id, human_id FROM human_collection",
+    "occupation": "SELECT occupation_id, human_id FROM human_occupation WHERE is_primary = 1",
+    "location": "SELECT location_id, human_id FROM human_location",
+}
+
+# (location_id, relationship_type_id) pairs are folded into one integer key
+_LOCATION_TYPE_SHIFT = 16
+
+FILTER_KEYS = (
+    "human_id",
+    "occupation_id",
+    "movement_id",
+    "gender_id",
+    "nationality_id",
+    "collection_id",
+    "location_id",
+    "relationship_type_id",
+)
+
+
+class Postings:
+    """
+    CSR posting lists: for every key, the dense human indexes attached to it.
+    values[indptr[i]:indptr[i + 1]] belongs to keys[i].
+    """
+
+    def __init__(self, keys: np.ndarray, indptr: np.ndarray, values: np.ndarray):
+        self.keys = keys
+        self.indptr = indptr
+        self.values = values
+
+    @classmethod
+    def build(cls, keys: np.ndarray, values: np.ndarray) -> "Postings":
+        order = np.lexsort((values, keys))
+        keys = keys[order]
+        values = values[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        indptr = np.append(starts, len(keys)).astype(np.int64)
+        return cls(unique_keys, indptr, values)
+
+    def get(self, key) -> np.ndarray:
+        i = np.searchsorted(self.keys, key)
+        if i >= len(self.keys) or self.keys[i] != key:
+            return self.values[:0]
+        return self.values[self.indptr[i] : self.indptr[i + 1]]
+
+
+class HumanSnapshot:
+    """
+    Array-backed copy of the humans map layer, filtered with vectorized masks
+    instead of re-running the five-table join on every request.
+    """
+
+    def __init__(self, columns: dict, human_ids: np.ndarray, postings: dict, version: str):
+        self.version = version
+        self.size = len(columns["id"])
+
+        self.id = columns["id"]
+        self.birth = columns["birth"]
+        self.death = columns["death"]  # 0 = unknown
+        self.lat = columns["lat"]
+        self.lon = columns["lon"]
+        self.city_id = columns["city_id"]
+        self.gender_id = columns["gender_id"]
+        self.nationality_id = columns["nationality_id"]
+        self.awarded = columns["awarded"]
+        self.text = columns["text"]  # per-row payload fields that are never filtered on
+
+        # dense index of every human that appears in any posting list
+        self.human_ids = human_ids
+        self.row_human = np.searchsorted(human_ids, self.id)
+        self.postings = postings
+
+    @classmethod
+    def build(cls, conn, version="") -> "HumanSnapshot":
+        rows = conn.execute(SNAPSHOT_QUERY).fetchall()
+        awarded_ids = np.array(
+            sorted(row[0] for row in conn.execute(AWARDED_QUERY).fetchall()), dtype=np.int64
+        )
+
+        n = len(rows)
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        columns = {
+            "id": ids,
+            "birth": np.fromiter((r[2] for r in rows), dtype=np.int64, count=n),
+            "death": np.fromiter((r[3] or 0 for r in rows), dtype=np.int64, count=n),
+            "lat": np.fromiter((np.nan if r[6] is None else r[6] for r in rows), dtype=np.float64, count=n),
+            "lon": np.fromiter((np.nan if r[7] is None else r[7] for r in rows), dtype=np.float64, count=n),
+            "city_id": np.fromiter((r[9] for r in rows), dtype=np.int64, count=n),
+            "gender_id": np.fromiter((r[13] or 0 for r in rows), dtype=np.int64, count=n),
+            "nationality_id": np.fromiter((r[14] or 0 for r in rows), dtype=np.int64, count=n),
+            "awarded": np.isin(ids, awarded_ids),
+            "text": {
+                "name": [r[1] for r in rows],
+                "death_date": [r[3] for r in rows],
+                "nationality": [r[4] for r in rows],
+                "gender": [r[5] for r in rows],
+                "city": [r[8] for r in rows],
+                "num_of_identifiers": [r[10] for r in rows],
+                "qid": [r[11] for r in rows],
+                "img_url": [r[12] for r in rows],
+            },
+        }
+
+        raw = {}
+        for name, query in POSTING_QUERIES.items():
+            pairs = [r for r in conn.execute(query).fetchall() if r[0] is not None and r[1] is not None]
+            raw[name] = (
+                np.fromiter((r[0] for r in pairs), dtype=np.int64, count=len(pairs)),
+                np.fromiter((r[1] for r in pairs), dtype=np.int64, count=len(pairs)),
+            )
+
+        location_types = conn.execute(
+            "SELECT location_id, relationship_type_id, human_id FROM human_location "
+            "WHERE location_id IS NOT NULL AND relationship_type_id IS NOT NULL AND human_id IS NOT NULL"
+        ).fetchall()
+        raw["location_type"] = (
+            np.fromiter(
+                ((r[0] << _LOCATION_TYPE_SHIFT) | r[1] for r in location_types),
+                dtype=np.int64,
+                count=len(location_types),
+            ),
+            np.fromiter((r[2] for r in location_types), dtype=np.int64, count=len(location_types)),
+        )
+
+        human_ids = np.unique(np.concatenate([ids] + [humans for _, humans in raw.values()]))
+        postings = {
+            name: Postings.build(keys, np.searchsorted(human_ids, humans))
+            for name, (keys, humans) in raw.items()
+        }
+
+        return cls(columns, human_ids, postings, version)
+
+    def _member(self, posting: str, key: int) -> np.ndarray:
+        members = np.zeros(len(self.human_ids), dtype=bool)
+        members[self.postings[posting].get(key)] = True
+        return members[self.row_human]
+
+    def alive_mask(self, year_from=None, year_to=None) -> np.ndarray:
+        """Same rule as the map slider: born, not yet dead, younger than HUMAN_MAX_AGE."""
+        mask = np.ones(self.size, dtype=bool)
+        if year_from is not None:
+            mask &= self.birth > year_from - HUMAN_MAX_AGE
+            mask &= (self.death == 0) | (self.death >= year_from)
+        if year_to is not None:
+            mask &= self.birth <= year_to
+        return mask
+
+    def filter(self, filters: dict, year_from=None, year_to=None, city_ids=None) -> np.ndarray:
+        """
+        Row indexes matching `filters` (integer ids keyed like the /humans query
+        string, missing keys are ignored) alive somewhere in [year_from, year_to],
+        born in one of `city_ids` when given.
+        """
+        mask = self.alive_mask(year_from, year_to)
+
+        if city_ids is not None:
+            mask &= np.isin(self.city_id, city_ids)
+
+        if filters.get("human_id") is not None:
+            mask &= self.id == filters["human_id"]
+        if filters.get("gender_id") is not None:
+            mask &= self.gender_id == filters["gender_id"]
+        if filters.get("nationality_id") is not None:
+            mask &= self.nationality_id == filters["nationality_id"]
+        if filters.get("movement_id") is not None:
+            mask &= self._member("movement", filters["movement_id"])
+        if filters.get("collection_id") is not None:
+            mask &= self._member("collection", filters["collection_id"])
+        if filters.get("occupation_id") is not None:
+            mask &= self._member("occupation", filters["occupation_id"])
+        if filters.get("location_id") is not None:
+            if filters.get("relationship_type_id") is not None:
+                key = (filters["location_id"] << _LOCATION_TYPE_SHIFT) | filters["relationship_type_id"]
+                mask &= self._member("location_type", key)
+            else:
+                mask &= self._member("location", filters["location_id"])
+
+        return np.flatnonzero(mask)
+
+    def rows(self, indexes: np.ndarray) -> list[dict]:
+        """/humans payload for the given row indexes, in snapshot (city, birth) order."""
+        text = self.text
+        idx = indexes.tolist()
+        lats = self.lat[indexes]
+        lons = self.lon[indexes]
+
+        out = []
+        for pos, i in enumerate(idx):
+            lat = lats[pos]
+            lon = lons[pos]
+            out.append(
+                {
+                    "id": int(self.id[i]),
+                    "name": text["name"][i],
+                    "birth_date": int(self.birth[i]),
+                    "death_date": text["death_date"][i],
+                    "nationality": text["nationality"][i],
+                    "gender": text["gender"][i],
+                    "lat": None if np.isnan(lat) else float(lat),
+                    "lon": None if np.isnan(lon) else float(lon),
+                    "city": text["city"][i],
+                    "city_id": int(self.city_id[i]),
+                    "num_of_identifiers": text["num_of_identifiers"][i],
+                    "qid": text["qid"][i],
+                    "img_url": text["img_url"][i],
+                    "awarded": bool(self.awarded[i]),
+                }
+            )
+        return out
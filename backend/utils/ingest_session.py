@@ -0,0 +1,127 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from entities.BaseEntity import BaseEntity
+from utils.db_schema import enable_wal
+
+
+COMMIT_EVERY = 200        # rows per transaction
+COMMIT_SECONDS = 5.0      # rows keep being added to a transaction until it is this old
+BUSY_TIMEOUT = 30.0       # seconds to wait for another writer's lock
+
+
+class IngestSession:
+    """
+    Writable connection for the ingest scripts, in WAL mode, that batches rows
+    into transactions:
+
+        with IngestSession(DB_PATH) as session:
+            for row in rows:
+                try:
+                    with session.row():
+                        ...  # entity calls on session.cursor
+                except Exception as e:
+                    log_results(...)
+
+    Each row runs in a savepoint, so a failing row is rolled back alone and the
+    rows before it in the same transaction are kept. The transaction is committed
+    after `commit_every` rows or `commit_seconds`, whichever comes first, and when
+    the session closes, also after an error or Ctrl-C: completed rows are never lost.
+
+    Both limits are only checked when a row ends, and the transaction (with the
+    write lock) stays open between rows. Fetch outside `row()` and call `commit()`
+    before waiting on the network, so the lock is only held while rows are written.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        commit_every=COMMIT_EVERY,
+        commit_seconds=COMMIT_SECONDS,
+        busy_timeout=BUSY_TIMEOUT,
+        foreign_keys=True,
+        check_same_thread=True,
+    ):
+        self.db_path = str(db_path)
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+
+        # autocommit at the driver level: transactions are begun and ended here only
+        self.conn = sqlite3.connect(
+            self.db_path,
+            timeout=busy_timeout,
+            isolation_level=None,
+            check_same_thread=check_same_thread,
+        )
+        self.conn.row_factory = sqlite3.Row
+        enable_wal(self.conn)
+        if foreign_keys:
+            self.conn.execute("PRAGMA foreign_keys = ON;")
+        self.cursor = self.conn.cursor()
+        # a failed write must reach row() to roll the row back
+        BaseEntity.raise_errors_on(self.cursor)
+
+        self.pending = 0
+        self.committed = 0
+        self.failed = 0
+        self.commits = 0
+        self._started = time.perf_counter()
+        self._transaction_started = None
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            # IMMEDIATE takes the write lock now rather than failing on the first write
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._transaction_started = time.monotonic()
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+            self.commits += 1
+        self.committed += self.pending
+        self.pending = 0
+        self._transaction_started = None
+
+    def _due(self):
+        if self.pending >= self.commit_every:
+            return True
+        return (
+            self._transaction_started is not None
+            and time.monotonic() - self._transaction_started >= self.commit_seconds
+        )
+
+    @contextmanager
+    def row(self):
+        """One row of work; rolled back alone (and re-raised) if it fails."""
+        self._begin()
+        self.cursor.execute("SAVEPOINT ingest_row")
+        try:
+            yield self.cursor
+        except BaseException:
+            self.cursor.execute("ROLLBACK TO ingest_row")
+            self.cursor.execute("RELEASE ingest_row")
+            # the identity map may remember rows that no longer exist
+            BaseEntity.forget_cursor(self.cursor)
+            self.failed += 1
+            raise
+        self.cursor.execute("RELEASE ingest_row")
+        self.pending += 1
+        if self._due():
+            self.commit()
+            elapsed = time.perf_counter() - self._started
+            print(f"✅ committed {self.committed} rows ({self.committed / elapsed:.1f} rows/s)")
+
+    def close(self):
+        try:
+            self.commit()
+        finally:
+            BaseEntity.forget_cursor(self.cursor)
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,184 @@
+import json
+
+
+# Every section of the person panel as one UNION ALL statement over the requested
+# ids (a JSON array bound to a single parameter), so a person costs one round trip
+# and a list of people costs the same. Rows are tagged with their section and owner
+# and padded to a common width; SECTION_COLUMNS names the payload columns.
+SECTION_COLUMNS = {
+    "person": ("description", "gender", "nationality", "img_url", "signature_url"),
+    "locations": ("id", "name", "relationship_type_name", "start_date", "end_date", "loc_lat", "loc_lon", "qid"),
+    "relatives": (
+        "id", "name", "num_of_identifiers", "qid", "birth_date", "death_date",
+        "relationship_type_name", "relationship_category_name",
+        "start_date", "end_date", "lat", "lon",
+    ),
+    "occupations": ("name",),
+    "movements": ("name",),
+    "collections": ("name",),
+    "citizenships": ("name",),
+}
+
+_WIDTH = max(len(columns) for columns in SECTION_COLUMNS.values())
+
+# section -> (owner id, sort key, tie breaker, payload expressions, FROM ... WHERE ...)
+_SECTIONS = {
+    "person": (
+        "h.id", "NULL", "h.id",
+        ("h.description", "g.name", "n.name", "h.img_url", "h.signature_url"),
+        """
+        FROM humans AS h
+        INNER JOIN genders g ON g.id = h.gender_id
+        INNER JOIN nationalities n ON n.id = h.nationality_id
+        WHERE h.id IN (SELECT id FROM ids)
+        """,
+    ),
+    "locations": (
+        "hl.human_id", "COALESCE(hl.start_date, hl.end_date)", "hl.rowid",
+        ("l.id", "l.name", "hlt.name", "hl.start_date", "hl.end_date", "l.lat", "l.lon", "l.qid"),
+        """
+        FROM human_location AS hl
+        JOIN locations AS l ON l.id = hl.location_id
+        JOIN human_location_types AS hlt ON hlt.id = hl.relationship_type_id
+        WHERE hl.human_id IN (SELECT id FROM ids)
+        """,
+    ),
+    "relatives": (
+        "hh.human_id", "COALESCE(hh.start_date, h.birth_date)", "hh.rowid",
+        (
+            "h.id", "h.name", "h.num_of_identifiers", "h.qid", "h.birth_date", "h.death_date",
+            "hrt.name", "rc.name", "hh.start_date", "hh.end_date", "l.lat", "l.lon",
+        ),
+        """
+        FROM human_human AS hh
+        JOIN humans AS h ON h.id = hh.related_human_id
+        JOIN human_relationship_types AS hrt ON hrt.id = hh.relationship_type_id
+        INNER JOIN relationship_categories rc ON rc.id = hrt.category_id
+        INNER JOIN human_location hl ON hl.human_id = hh.related_human_id
+        INNER JOIN locations l ON hl.location_id = l.id
+        WHERE hh.human_id IN (SELECT id FROM ids)
+          AND hl.relationship_type_id = 4
+        """,
+    ),
+    "occupations": (
+        "ho.human_id", "NULL", "ho.rowid",
+        ("o.name",),
+        """
+        FROM human_occupation AS ho
+        JOIN occupations AS o ON o.id = ho.occupation_id
+        WHERE ho.human_id IN (SELECT id FROM ids)
+        """,
+    ),
+    "movements": (
+        "hm.human_id", "NULL", "hm.rowid",
+        ("m.name",),
+        """
+        FROM human_movement AS hm
+        JOIN movements AS m ON m.id = hm.movement_id
+        WHERE hm.human_id IN (SELECT id FROM ids)
+        """,
+    ),
+    "collections": (
+        "hcl.human_id", "NULL", "hcl.rowid",
+        ("cl.name",),
+        """
+        FROM human_collection AS hcl
+        JOIN collections AS cl ON cl.id = hcl.collection_id
+        WHERE hcl.human_id IN (SELECT id FROM ids)
+        """,
+    ),
+    "citizenships": (
+        "c.human_id", "NULL", "c.rowid",
+        ("s.name",),
+        """
+        FROM citizenships AS c
+        JOIN states AS s ON s.id = c.state_id
+        WHERE c.human_id IN (SELECT id FROM ids)
+        """,
+    ),
+}
+
+
+def _section_select(position: int, section: str) -> str:
+    owner, sort_key, tie, expressions, body = _SECTIONS[section]
+    padded = list(expressions) + ["NULL"] * (_WIDTH - len(expressions))
+    payload = ", ".join(f"{expr} AS c{i}" for i, expr in enumerate(padded))
+    return f"SELECT {position} AS section, {owner} AS owner_id, {sort_key} AS sort_key, {tie} AS tie, {payload} {body}"
+
+
+SECTION_ORDER = tuple(_SECTIONS)
+
+PERSON_DETAILS_QUERY = (
+    "WITH ids(id) AS (SELECT DISTINCT value FROM json_each(?))\n"
+    + "\nUNION ALL\n".join(_section_select(i, section) for i, section in enumerate(SECTION_ORDER))
+    + "\nORDER BY section, owner_id, sort_key, tie"
+)
+
+# every non-family tie is listed under "professional" as well as its own category
+PROFESSIONAL_CATEGORIES = {"professional", "intellectual", "social", "political"}
+OWN_LIST_CATEGORIES = {"family", "intellectual", "social", "political"}
+
+
+def _empty_payload(person_row: dict) -> dict:
+    return {
+        **person_row,
+        "locations": [],
+        "occupations": [],
+        "movements": [],
+        "collections": [],
+        "citizenships": [],
+        "family": [],
+        "professional": [],
+        "intellectual": [],
+        "social": [],
+        "political": [],
+    }
+
+
+def _add_relative(payload: dict, relative: dict):
+    category = relative["relationship_category_name"]
+    targets = []
+    if category in PROFESSIONAL_CATEGORIES:
+        targets.append("professional")
+    if category in OWN_LIST_CATEGORIES:
+        targets.append(category)
+
+    for target in targets:
+        listed = payload[target]
+        listed.append({**relative, "entity_type": "human", "index": len(listed) + 1})
+
+
+def fetch_person_details(conn, human_ids) -> dict:
+    """
+    {human_id: /person payload} for the given ids in one query. Ids without a
+    person row (or without gender / nationality) are left out.
+    """
+    ids = sorted({int(i) for i in human_ids})
+    if not ids:
+        return {}
+
+    payloads = {}
+    for row in conn.execute(PERSON_DETAILS_QUERY, (json.dumps(ids),)):
+        section = SECTION_ORDER[row[0]]
+        owner_id = row[1]
+        values = dict(zip(SECTION_COLUMNS[section], row[4:]))
+
+        if section == "person":
+            payloads[owner_id] = _empty_payload(values)
+            continue
+
+        payload = payloads.get(owner_id)
+        if payload is None:
+            continue
+        if section == "relatives":
+            _add_relative(payload, values)
+        elif section == "locations":
+            payload["locations"].append(values)
+        else:
+            payload[section].append(values["name"])
+
+    return payloads
+
+
+def fetch_person_detail(conn, human_id: int) -> dict | None:
+    return fetch_person_details(conn, [human_id]).get(human_id)
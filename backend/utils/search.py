@@ -0,0 +1,196 @@
+# Trigram FTS5 indexes over the searchable names. External-content tables: the
+# text lives in the base table, triggers keep the index in step with every write.
+FTS_TABLES = {
+    "humans_fts": ("humans", "id", "name"),
+    "locations_fts": ("locations", "id", "name"),
+    "military_events_fts": ("military_events", "id", "name"),
+}
+
+# plain NOCASE indexes serve the "prefix match first" half of the ranking
+PREFIX_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_humans_name_nocase ON humans(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_locations_name_nocase ON locations(name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_military_events_name_nocase ON military_events(name COLLATE NOCASE)",
+]
+
+# the trigram tokenizer needs at least three characters to match anything
+MIN_TRIGRAM_LENGTH = 3
+
+SEARCHES = {
+    "humans": {
+        "table": "humans",
+        "fts": "humans_fts",
+        "columns": "t.id, t.name, t.birth_date, t.death_date, t.qid",
+        "order": "t.num_of_identifiers DESC, t.name",
+    },
+    "locations": {
+        "table": "locations",
+        "fts": "locations_fts",
+        "columns": "t.id, t.name, t.lat AS loc_lat, t.lon AS loc_lon, t.qid",
+        "order": "t.name",
+    },
+    "events": {
+        "table": "military_events",
+        "fts": "military_events_fts",
+        # the fields /search has always returned; columns added to the table later
+        # (start_year, end_year) stay out of the payload
+        "columns": (
+            "t.id, t.qid, t.name, t.image_url, t.description, t.start_time, t.end_time, t.point_in_time, "
+            "t.wiki_url, t.lat, t.lon, t.depth_index, t.depth_level, t.descendant_count, t.parent_id"
+        ),
+        "order": "t.name",
+    },
+}
+
+
+def ensure_search_index(conn):
+    """Creates the FTS tables and their sync triggers; a new table is filled once."""
+    for statement in PREFIX_INDEXES:
+        conn.execute(statement)
+
+    for fts, (table, key, column) in FTS_TABLES.items():
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).fetchone()
+
+        conn.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column}, content='{table}', content_rowid='{key}', tokenize='trigram'
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.{key}, new.{column});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.{key}, old.{column});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.{key}, old.{column});
+                INSERT INTO {fts}(rowid, {column}) VALUES (new.{key}, new.{column});
+            END
+            """
+        )
+
+        if not exists:
+            conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def has_search_index(conn) -> bool:
+    placeholders = ", ".join("?" * len(FTS_TABLES))
+    found = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        tuple(FTS_TABLES),
+    ).fetchone()[0]
+    return found == len(FTS_TABLES)
+
+
+# human_location.relationship_type_id of a birth place, as on the map
+BIRTH_PLACE_TYPE_ID = 4
+
+
+def _area_condition(kind: str, area, indexed: bool):
+    """(sql, params) restricting a result type to a utils.spatial_index.Area; humans by birth place."""
+    if kind == "events":
+        return area.sql("t.id", "t.lat", "t.lon", "military_events_rtree", indexed)
+    if kind == "locations":
+        return area.sql("t.id", "t.lat", "t.lon", "locations_rtree", indexed)
+    located, params = area.sql("l.id", "l.lat", "l.lon", "locations_rtree", indexed)
+    return (
+        f"""t.id IN (
+            SELECT hl.human_id FROM human_location AS hl
+            JOIN locations AS l ON l.id = hl.location_id
+            WHERE hl.relationship_type_id = {BIRTH_PLACE_TYPE_ID} AND {located}
+        )""",
+        params,
+    )
+
+
+def _like_escape(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_phrase(q: str) -> str:
+    return '"' + q.replace('"', '""') + '"'
+
+
+def search_type(
+    conn, kind: str, q: str, limit: int, use_fts: bool = True, area=None, use_rtree: bool = True
+) -> list[dict]:
+    """
+    Name search for one result type, ranked like the original LIKE query: names
+    starting with `q` first, then the rest, each group in the type's own order.
+    Prefix hits come from the NOCASE index, the remainder from the trigram index.
+    `area` (a utils.spatial_index.Area) keeps only results inside it.
+    """
+    spec = SEARCHES[kind]
+    prefix = _like_escape(q) + "%"
+
+    where, where_params = "", ()
+    if area is not None:
+        condition, params = _area_condition(kind, area, use_rtree)
+        where, where_params = f"AND {condition}", tuple(params)
+
+    results = conn.execute(
+        f"""
+        SELECT {spec["columns"]} FROM {spec["table"]} AS t
+        WHERE t.name LIKE ? ESCAPE '\\'
+          {where}
+        ORDER BY {spec["order"]}
+        LIMIT ?
+        """,
+        (prefix, *where_params, limit),
+    ).fetchall()
+
+    remaining = limit - len(results)
+    if remaining <= 0:
+        return [dict(r) for r in results]
+
+    if use_fts and len(q) >= MIN_TRIGRAM_LENGTH:
+        rest = conn.execute(
+            f"""
+            SELECT {spec["columns"]} FROM {spec["fts"]} AS f
+            JOIN {spec["table"]} AS t ON t.id = f.rowid
+            WHERE {spec["fts"]} MATCH ?
+              AND t.name NOT LIKE ? ESCAPE '\\'
+              {where}
+            ORDER BY {spec["order"]}
+            LIMIT ?
+            """,
+            (_fts_phrase(q), prefix, *where_params, remaining),
+        ).fetchall()
+    else:
+        # too short for trigrams (or no index yet): scan
+        rest = conn.execute(
+            f"""
+            SELECT {spec["columns"]} FROM {spec["table"]} AS t
+            WHERE t.name LIKE ? ESCAPE '\\'
+              AND t.name NOT LIKE ? ESCAPE '\\'
+              {where}
+            ORDER BY {spec["order"]}
+            LIMIT ?
+            """,
+            ("%" + _like_escape(q) + "%", prefix, *where_params, remaining),
+        ).fetchall()
+
+    return [dict(r) for r in results] + [dict(r) for r in rest]
+
+
+def search_all(conn, q: str, limits: dict, use_fts: bool = True, area=None, use_rtree: bool = True) -> dict:
+    """`limits` maps result type -> max rows; types with a limit of 0 are skipped."""
+    return {
+        kind: search_type(conn, kind, q, limits[kind], use_fts, area, use_rtree) if limits.get(kind) else []
+        for kind in SEARCHES
+    }
+
@@ -0,0 +1,196 @@
+# R*Tree indexes over the coordinates of locations and military events: one
+# degenerate box (lat, lat, lon, lon) per located row, keyed by its id. Triggers
+# keep them in step with every write, so the Location and MilitaryEvent entities
+# (set_data, update, delete, bulk_upsert) and plain SQL in the scripts all stay
+# indexed. A bbox= or near= filter reads candidate ids from the tree and re-checks
+# them against the real columns: the tree stores 32-bit floats, rounded outwards.
+import math
+
+import numpy as np
+
+RTREE_TABLES = {
+    "locations_rtree": "locations",
+    "military_events_rtree": "military_events",
+}
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 50.0
+MAX_RADIUS_KM = 5000.0
+
+# rows outside these ranges (or with text in lat/lon) are left out of the tree
+_LOCATED = "{row}.lat BETWEEN -90 AND 90 AND {row}.lon BETWEEN -180 AND 180"
+
+
+def ensure_spatial_index(conn):
+    """Creates the R*Tree tables and their sync triggers; a new table is filled once."""
+    for rtree, table in RTREE_TABLES.items():
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (rtree,)
+        ).fetchone()
+
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_ai AFTER INSERT ON {table}
+            WHEN {_LOCATED.format(row="new")} BEGIN
+                INSERT OR REPLACE INTO {rtree} VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {rtree}_au AFTER UPDATE OF id, lat, lon ON {table} BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+                INSERT OR REPLACE INTO {rtree}
+                SELECT new.id, new.lat, new.lat, new.lon, new.lon
+                WHERE {_LOCATED.format(row="new")};
+            END
+            """
+        )
+
+        if not exists:
+            rebuild_spatial_index(conn, rtree)
+
+
+def rebuild_spatial_index(conn, rtree):
+    table = RTREE_TABLES[rtree]
+    conn.execute(f"DELETE FROM {rtree}")
+    conn.execute(
+        f"""
+        INSERT INTO {rtree}
+        SELECT id, lat, lat, lon, lon FROM {table} AS t
+        WHERE {_LOCATED.format(row="t")}
+        """
+    )
+
+
+def has_spatial_index(conn) -> bool:
+    placeholders = ", ".join("?" * len(RTREE_TABLES))
+    found = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        tuple(RTREE_TABLES),
+    ).fetchone()[0]
+    return found == len(RTREE_TABLES)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance; None when a coordinate is missing."""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def register_spatial_functions(conn):
+    """distance_km(lat1, lon1, lat2, lon2) for the near= filters."""
+    conn.create_function("distance_km", 4, distance_km, deterministic=True)
+
+
+def _lon_ranges(west, east):
+    """[west, east] in degrees as ranges inside [-180, 180], split at the antimeridian."""
+    if east - west >= 360:
+        return [(-180.0, 180.0)]
+    if west < -180:
+        return [(west + 360, 180.0), (-180.0, east)]
+    if east > 180:
+        return [(west, 180.0), (-180.0, east - 360)]
+    if west > east:  # a bbox drawn across the antimeridian
+        return [(west, 180.0), (-180.0, east)]
+    return [(west, east)]
+
+
+class Area:
+    """
+    A bbox= or near= filter: boxes of (south, north, west, east) in degrees that
+    cover it, plus, for near=, the circle the boxes are checked against.
+    """
+
+    def __init__(self, boxes, center=None, radius_km=None):
+        self.boxes = boxes
+        self.center = center
+        self.radius_km = radius_km
+
+    @classmethod
+    def bbox(cls, west, south, east, north) -> "Area":
+        if not (-90 <= south <= north <= 90):
+            raise ValueError("bbox latitudes must be south <= north within [-90, 90]")
+        if not (-180 <= west <= 180 and -180 <= east <= 180):
+            raise ValueError("bbox longitudes must be within [-180, 180]")
+        return cls([(south, north, w, e) for w, e in _lon_ranges(west, east)])
+
+    @classmethod
+    def near(cls, lat, lon, radius_km=DEFAULT_RADIUS_KM) -> "Area":
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("near must be lat,lon within [-90, 90] and [-180, 180]")
+        if not (0 < radius_km <= MAX_RADIUS_KM):
+            raise ValueError(f"radius must be in (0, {MAX_RADIUS_KM:g}] km")
+
+        angle = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angle)
+        south, north = lat - dlat, lat + dlat
+        if south <= -90 or north >= 90:
+            # the circle contains a pole: every longitude
+            ranges = [(-180.0, 180.0)]
+        else:
+            dlon = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+            ranges = _lon_ranges(lon - dlon, lon + dlon)
+        south, north = max(south, -90.0), min(north, 90.0)
+        return cls([(south, north, w, e) for w, e in ranges], center=(lat, lon), radius_km=radius_km)
+
+    def _boxes_sql(self, south, north, west, east):
+        clauses = [f"({north} >= ? AND {south} <= ? AND {east} >= ? AND {west} <= ?)" for _ in self.boxes]
+        params = [value for s, n, w, e in self.boxes for value in (s, n, w, e)]
+        return "(" + " OR ".join(clauses) + ")", params
+
+    def exact_sql(self, lat, lon):
+        """The filter on real lat/lon columns, as a full scan would apply it."""
+        clauses = [f"({lat} BETWEEN ? AND ? AND {lon} BETWEEN ? AND ?)" for _ in self.boxes]
+        params = [value for box in self.boxes for value in box]
+        sql = "(" + " OR ".join(clauses) + ")"
+        if self.center is not None:
+            sql += f" AND distance_km(?, ?, {lat}, {lon}) <= ?"
+            params += [*self.center, self.radius_km]
+        return sql, params
+
+    def sql(self, id_column, lat, lon, rtree, indexed=True):
+        """
+        Condition matching the rows of `rtree`'s table inside the area: candidate
+        ids from the R*Tree (`indexed`) narrowed by the exact test.
+        """
+        exact, exact_params = self.exact_sql(lat, lon)
+        if not indexed:
+            return exact, exact_params
+        boxes, box_params = self._boxes_sql("min_lat", "max_lat", "min_lon", "max_lon")
+        return (
+            f"{id_column} IN (SELECT id FROM {rtree} WHERE {boxes}) AND {exact}",
+            box_params + exact_params,
+        )
+
+    def mask(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """The exact test over coordinate arrays (NaN = not located)."""
+        mask = np.zeros(len(lat), dtype=bool)
+        for south, north, west, east in self.boxes:
+            mask |= (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        if self.center is not None:
+            c_lat, c_lon = np.radians(self.center[0]), np.radians(self.center[1])
+            phi = np.radians(lat)
+            a = (
+                np.sin((phi - c_lat) / 2) ** 2
+                + np.cos(c_lat) * np.cos(phi) * np.sin((np.radians(lon) - c_lon) / 2) ** 2
+            )
+            with np.errstate(invalid="ignore"):
+                mask &= 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a))) <= self.radius_km
+        return mask
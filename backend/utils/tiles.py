@@ -0,0 +1,163 @@
+import hashlib
+import json
+import math
+
+import numpy as np
+
+
+# Points are indexed by the Morton (Z-order) code of their Web Mercator position at
+# CODE_LEVEL: sorted by code, the points of any XYZ tile at zoom <= CODE_LEVEL form
+# one contiguous run, found with two binary searches. That sorted array is the
+# quadtree; clusters are its nodes CLUSTER_BITS levels below the tile.
+CODE_LEVEL = 24
+MAX_ZOOM = 20
+
+# a tile is cut into 2^CLUSTER_BITS x 2^CLUSTER_BITS cells (8px on a 256px tile)
+CLUSTER_BITS = 5
+
+MAX_LAT = 85.05112878  # Web Mercator cuts the poles off here
+
+_SPREAD_MASKS = (
+    (16, 0x0000FFFF0000FFFF),
+    (8, 0x00FF00FF00FF00FF),
+    (4, 0x0F0F0F0F0F0F0F0F),
+    (2, 0x3333333333333333),
+    (1, 0x5555555555555555),
+)
+
+
+def _spread(v: np.ndarray) -> np.ndarray:
+    """Bits of v (up to 32) moved to the even bit positions of a uint64."""
+    v = v.astype(np.uint64)
+    for shift, mask in _SPREAD_MASKS:
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return _spread(x) | (_spread(y) << np.uint64(1))
+
+
+def mercator_xy(lat: np.ndarray, lon: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Web Mercator position in [0, 1): x eastwards from -180, y southwards from the top."""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LAT, MAX_LAT)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = (lon + 180.0) / 360.0
+    rad = np.radians(lat)
+    y = (1.0 - np.log(np.tan(rad) + 1.0 / np.cos(rad)) / math.pi) / 2.0
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+
+def tile_code_range(z: int, x: int, y: int) -> tuple[int, int]:
+    """[first, last) Morton codes of the points inside tile z/x/y."""
+    prefix = int(morton(np.array([x]), np.array([y]))[0])
+    shift = 2 * (CODE_LEVEL - z)
+    return prefix << shift, (prefix + 1) << shift
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+class PointTileIndex:
+    """
+    Points of one map layer sorted by Morton code. `rows` maps sorted position ->
+    row of the layer's own arrays, so masks and payloads stay in layer order.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray):
+        located = ~(np.isnan(lat) | np.isnan(lon))
+        rows = np.flatnonzero(located)
+        mx, my = mercator_xy(lat[rows], lon[rows])
+        scale = float(1 << CODE_LEVEL)
+        codes = morton((mx * scale).astype(np.uint64), (my * scale).astype(np.uint64))
+
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.rows = rows[order]
+        self.lat = lat
+        self.lon = lon
+
+    def tile_rows(self, z: int, x: int, y: int) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, codes) of the points in tile z/x/y."""
+        first, last = tile_code_range(z, x, y)
+        lo = np.searchsorted(self.codes, np.uint64(first), side="left")
+        hi = np.searchsorted(self.codes, np.uint64(last), side="left")
+        return self.rows[lo:hi], self.codes[lo:hi]
+
+    def clusters(self, z: int, x: int, y: int, mask: np.ndarray | None = None, label=None) -> list[dict]:
+        """
+        The tile's points (only rows where `mask` holds) merged per cell: count,
+        mean position and the first row of the cell. A cell of one point carries
+        that point's id and `label(row)` payload.
+        """
+        rows, codes = self.tile_rows(z, x, y)
+        if mask is not None and len(rows):
+            keep = mask[rows]
+            rows, codes = rows[keep], codes[keep]
+        if not len(rows):
+            return []
+
+        cell_level = min(z + CLUSTER_BITS, CODE_LEVEL)
+        cells = codes >> np.uint64(2 * (CODE_LEVEL - cell_level))
+        # codes are sorted, so each cell is a contiguous run
+        _, starts, counts = np.unique(cells, return_index=True, return_counts=True)
+        lat_sum = np.add.reduceat(self.lat[rows], starts)
+        lon_sum = np.add.reduceat(self.lon[rows], starts)
+
+        clusters = []
+        for start, count, lat, lon in zip(starts.tolist(), counts.tolist(), lat_sum.tolist(), lon_sum.tolist()):
+            row = int(rows[start])
+            cluster = {"lat": lat / count, "lon": lon / count, "count": count}
+            if count == 1 and label is not None:
+                cluster.update(label(row))
+            clusters.append(cluster)
+        return clusters
+
+
+class MilitaryEventPoints:
+    """Located military events with the years the tiles filter on."""
+
+    QUERY = """
+        SELECT id, name, lat, lon, start_year, end_year, depth_level
+        FROM military_events
+        WHERE lat IS NOT NULL AND lon IS NOT NULL
+        ORDER BY id
+    """
+
+    def __init__(self, rows, version):
+        n = len(rows)
+        self.version = version
+        self.id = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        self.name = [r[1] for r in rows]
+        self.lat = np.fromiter((r[2] for r in rows), dtype=np.float64, count=n)
+        self.lon = np.fromiter((r[3] for r in rows), dtype=np.float64, count=n)
+        # no year: never active in a year window
+        self.start_year = np.fromiter((np.iinfo(np.int64).max if r[4] is None else r[4] for r in rows), dtype=np.int64, count=n)
+        self.end_year = np.fromiter((np.iinfo(np.int64).min if r[5] is None else r[5] for r in rows), dtype=np.int64, count=n)
+        self.depth_level = [r[6] for r in rows]
+        self.index = PointTileIndex(self.lat, self.lon)
+
+    @classmethod
+    def build(cls, conn, version="") -> "MilitaryEventPoints":
+        return cls(conn.execute(cls.QUERY).fetchall(), version)
+
+    def active_mask(self, year_from=None, year_to=None):
+        """Events active somewhere in [year_from, year_to]; None when the window is open."""
+        if year_from is None and year_to is None:
+            return None
+        mask = np.ones(len(self.id), dtype=bool)
+        if year_to is not None:
+            mask &= self.start_year <= year_to
+        if year_from is not None:
+            mask &= self.end_year >= year_from
+        return mask
+
+    def label(self, row):
+        return {"id": int(self.id[row]), "name": self.name[row], "depth_level": self.depth_level[row]}
+
+
+def tile_etag(*parts) -> str:
+    """Validator of a tile: changes with the data version or any request parameter."""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'